@@ -0,0 +1,210 @@
+"""
+End-to-end latency, per-node latency, LLM calls, tokens and peak memory of the real graph
+(`create_graph()`, async path as served by the API) for 1-, 5- and 20-ticker queries.
+
+Runs fully offline: the chat model is the scripted tool-calling fake from fake_llm.py
+with a configurable latency, and yfinance / DuckDuckGo are replayed from fixtures
+(fixtures.py; generated deterministically unless --fixtures points at a fixture directory),
+or from recorded responses with --cassettes (MARKET_DATA_MODE=replay, see src/tools/cassette.py).
+Every run starts cold (empty DATA_DIR, no cached market data or news).
+
+Results are saved as JSON (--output); with --baseline, they are compared with an earlier
+result file and the command exits with status 1 if a metric regressed by more than
+--threshold.
+
+    uv run python -m benchmarks.bench_e2e [--tickers 1 5 20] [--repeat 3] [--baseline benchmarks/results/bench_e2e.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench-e2e-")
+# Replayed fixtures are not rate limited; every run fetches its data (no fresh cache or news index)
+os.environ["YAHOO_RATE_LIMIT"] = os.environ["DUCKDUCKGO_RATE_LIMIT"] = "0"
+os.environ["MARKET_INFO_TTL"] = os.environ["MARKET_HISTORY_TTL"] = os.environ["MARKET_STALE_TTL"] = "0"
+os.environ["NEWS_INDEX_TTL"] = "0"
+os.environ["TRACE_EXPORTER"] = "none"
+os.environ.pop("LLM_CACHE_NODES", None)
+os.environ.pop("MARKET_DATA_MODE", None)
+
+from src import utils
+from src.graph import create_graph, graph_mode, initial_state
+from src.telemetry import LLMUsageHandler
+from src.tools import cassette, market_data, news_index, price_store, upstream
+from src.tools.run_scope import run_scope
+from benchmarks import fixtures
+from benchmarks.fake_llm import ScriptedToolModel
+
+UNIVERSE = [
+    "NVDA", "AMD", "INTC", "TSM", "AVGO", "QCOM", "MU", "ARM", "ASML", "SMCI",
+    "AAPL", "MSFT", "GOOGL", "AMZN", "META", "TSLA", "ORCL", "CRM", "ADBE", "UMC",
+]
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "bench_e2e.json")
+# Metrics compared against the baseline (higher is worse)
+COMPARED = ("wall_p50", "llm_calls", "prompt_tokens", "completion_tokens", "peak_mb")
+
+def query_for(tickers):
+    return f"Compare {', '.join(tickers)}" if len(tickers) > 1 else f"Analyze {tickers[0]}"
+
+def reset():
+    # Cold start: a fresh data directory and no process-wide caches or clients
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench-e2e-")
+    utils.clear_client_caches()
+    market_data._cache = None
+    price_store._store = None
+    news_index.close_news_index()
+    upstream.close_upstreams()
+    cassette.close_cassette()
+
+def run_once(graph, tickers, trace_memory=False):
+    reset()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with run_scope():
+        state = asyncio.run(graph.ainvoke(initial_state(query_for(tickers))))
+    wall = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return wall, state, peak
+
+def measure(graph, tickers, repeat):
+    walls, states = [], []
+    for _ in range(repeat):
+        wall, state, _ = run_once(graph, tickers)
+        walls.append(wall)
+        states.append(state)
+    # Peak memory in a separate run: tracing allocations slows the run down
+    _, _, peak = run_once(graph, tickers, trace_memory=True)
+    timings = states[-1]["timings"]
+    nodes = {
+        node: round(statistics.median(state["timings"][node]["seconds"] for state in states), 3)
+        for node in timings if node != "run"
+    }
+    return {
+        "tickers": len(tickers),
+        "wall_p50": round(statistics.median(walls), 3),
+        "wall_min": round(min(walls), 3),
+        "wall_max": round(max(walls), 3),
+        "llm_calls": timings["run"]["llm_calls"],
+        "prompt_tokens": timings["run"]["prompt_tokens"],
+        "completion_tokens": timings["run"]["completion_tokens"],
+        "tool_calls": timings["run"]["tool_calls"],
+        "upstream_calls": sum((states[-1].get("upstream_calls") or {}).values()),
+        "errors": timings["run"]["errors"],
+        "peak_mb": round(peak, 1),
+        "nodes": nodes,
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Prints the change of every compared metric and returns the regressions.
+    """
+    regressions = []
+    print(f"\nvs. baseline ({baseline['meta']['date']}, {baseline['meta'].get('commit') or 'unknown commit'}):")
+    for size, result in results.items():
+        before = baseline["results"].get(size)
+        if before is None:
+            continue
+        changes = []
+        for metric in COMPARED:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            flag = " REGRESSION" if change > threshold else ""
+            if flag:
+                regressions.append((size, metric, old, new))
+            changes.append(f"{metric} {old} -> {new} ({change:+.0%}){flag}")
+        print(f"{size:>3} tickers: " + "; ".join(changes))
+    return regressions
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, nargs="*", default=[1, 5, 20])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", default=None, help="GRAPH_MODE (default: the environment's)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="extra seconds per completion token")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="seconds per upstream request")
+    parser.add_argument("--answer-words", type=int, default=150)
+    parser.add_argument("--fixtures", default=None, help="fixture directory (default: generate one)")
+    parser.add_argument("--cassettes", default=None, help="replay recorded responses from this CASSETTE_DIR instead of fixtures")
+    parser.add_argument("--output", default=RESULTS)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    if args.cassettes:
+        os.environ.update(MARKET_DATA_MODE="replay", CASSETTE_DIR=args.cassettes, CASSETTE_LATENCY_MS=str(args.tool_latency * 1000))
+    else:
+        directory = args.fixtures or fixtures.generate(tempfile.mkdtemp(prefix="bench-e2e-fixtures-"), UNIVERSE)
+        fixtures.install(directory, latency=args.tool_latency)
+    utils._create_llm = lambda provider, model, temperature, cache=None: ScriptedToolModel(
+        latency=args.llm_latency, token_latency=args.token_latency, answer_words=args.answer_words,
+        callbacks=[LLMUsageHandler(model)],
+    )
+    mode = args.mode or graph_mode()
+    graph = create_graph(mode)
+
+    print(
+        f"mode={mode} llm_latency={args.llm_latency}s token_latency={args.token_latency}s "
+        f"tool_latency={args.tool_latency}s repeat={args.repeat}"
+    )
+    print(f"{'tickers':>7} | {'wall p50 (s)':>12} | {'min':>6} | {'LLM calls':>9} | {'prompt tok':>10} | {'compl. tok':>10} | {'tools':>5} | {'peak MB':>7}")
+    results = {}
+    for n in args.tickers:
+        result = results[str(n)] = measure(graph, UNIVERSE[:n], args.repeat)
+        print(
+            f"{n:>7} | {result['wall_p50']:>12.2f} | {result['wall_min']:>6.2f} | {result['llm_calls']:>9.0f} | "
+            f"{result['prompt_tokens']:>10.0f} | {result['completion_tokens']:>10.0f} | {result['tool_calls']:>5.0f} | {result['peak_mb']:>7.1f}"
+        )
+    print("\nPer-node wall time, p50 (s):")
+    nodes = list(dict.fromkeys(node for result in results.values() for node in result["nodes"]))
+    print(f"{'node':>20} | " + " | ".join(f"{n + ' tickers':>10}" for n in results))
+    for node in nodes:
+        print(f"{node:>20} | " + " | ".join(f"{result['nodes'].get(node, 0):>10.2f}" for result in results.values()))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU",
+            "mode": mode,
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "fixtures", "cassettes")},
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved to {args.output}")
+
+    if baseline is not None and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+LLM round trips, largest LLM context and wall time of each graph mode:
+"react" (analysts fetch data through tool calls), "prefetch" (data fetched up front
+and put in the prompt) and "fanout" (one analyst task per ticker, in parallel).
+
+Runs fully offline: the chat model is a scripted tool-calling fake that sleeps for a
+fixed latency per call, and Yahoo Finance / DuckDuckGo are replaced by fakes with a
+fixed latency per request. LLM calls are counted with a callback handler.
+
+    uv run python -m benchmarks.bench_graph_modes [--llm-latency 0.8] [--tool-latency 0.3] [--parallel-tool-calls]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench-graph-modes-")
+# Every market data read is a cache miss, as for a first-time query
+# Compare the graph modes on equal terms: the router always makes its LLM call
+os.environ["ROUTER_FAST_PATH"] = "false"
+os.environ["MARKET_INFO_TTL"] = os.environ["MARKET_HISTORY_TTL"] = os.environ["MARKET_STALE_TTL"] = "0"
+
+import numpy as np
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src import utils
+from src.graph import GRAPH_MODES, create_graph, initial_state
+from src.tools import market_data, search_tools
+from benchmarks.fake_llm import ScriptedToolModel
+
+UNIVERSE = ["NVDA", "AMD", "INTC", "TSM", "AVGO", "QCOM", "MU", "ARM", "ASML", "TXN"]
+
+class CallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.max_context = 0
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        size = sum(len(str(m.content)) for batch in messages for m in batch)
+        with self._lock:
+            self.llm_calls += 1
+            self.max_context = max(self.max_context, size)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        with self._lock:
+            self.tool_calls += 1
+
+def install_fakes(tool_latency):
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252, tz="America/New_York")
+
+    def history(ticker):
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(len(ticker)).normal(0, 0.02, len(index))))
+        return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1e6}, index=index)
+
+    def fetch_history(ticker, period="1y", interval="1d"):
+        time.sleep(tool_latency)
+        return history(ticker)
+
+    def fetch_histories(tickers, period="1y", interval="1d"):
+        time.sleep(tool_latency)  # one batched download
+        return {t: history(t) for t in tickers}
+
+    class FakeTicker:
+        def __init__(self, ticker, session=None):
+            self.ticker = ticker
+
+        @property
+        def info(self):
+            time.sleep(tool_latency)
+            return {"marketCap": 1e12, "trailingPE": 30.0, "revenueGrowth": 0.2, "fiftyTwoWeekHigh": 150.0}
+
+        @property
+        def news(self):
+            time.sleep(tool_latency)
+            return [{"content": {"title": f"{self.ticker} headline {i}", "link": "https://example.com", "summary": "..."}} for i in range(5)]
+
+    class FakeSearch:
+        def __init__(self, **kwargs):
+            pass
+
+        def run(self, query):
+            time.sleep(tool_latency)
+            return [{"title": f"{query} result {i}", "link": f"https://example.com/{i}", "snippet": f"results for {query}"} for i in range(5)]
+
+    market_data.fetch_history = fetch_history
+    market_data.fetch_histories = fetch_histories
+    market_data.fetch_info = lambda ticker: FakeTicker(ticker).info
+    sys.modules["yfinance"].Ticker = FakeTicker
+    search_tools.DuckDuckGoSearchResults = FakeSearch
+
+def run(mode, tickers, args):
+    utils.clear_client_caches()
+    market_data._cache = None
+    graph = create_graph(mode)
+    counter = CallCounter()
+    query = f"Compare {', '.join(tickers)}" if len(tickers) > 1 else f"Analyze {tickers[0]}"
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The async path, as served by the API: LLM calls are awaited, tools run on the tool pool
+        asyncio.run(graph.ainvoke(initial_state(query), config={"callbacks": [counter]}))
+    return counter.llm_calls, counter.tool_calls, counter.max_context, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--tool-latency", type=float, default=0.3)
+    parser.add_argument("--parallel-tool-calls", action="store_true")
+    parser.add_argument("--tickers", type=int, nargs="*", default=[1, 3, 5])
+    parser.add_argument("--modes", nargs="*", default=list(GRAPH_MODES))
+    args = parser.parse_args()
+
+    install_fakes(args.tool_latency)
+    utils._create_llm = lambda *key: ScriptedToolModel(latency=args.llm_latency, parallel_tool_calls=args.parallel_tool_calls)
+
+    print(f"llm_latency={args.llm_latency}s tool_latency={args.tool_latency}s parallel_tool_calls={args.parallel_tool_calls}")
+    print(f"{'tickers':>7} | {'mode':>8} | {'LLM calls':>9} | {'tool calls':>10} | {'max context':>11} | {'wall (s)':>8}")
+    for n in args.tickers:
+        for mode in args.modes:
+            llm_calls, tool_calls, max_context, wall = run(mode, UNIVERSE[:n], args)
+            print(f"{n:>7} | {mode:>8} | {llm_calls:>9} | {tool_calls:>10} | {max_context:>11} | {wall:>8.2f}")
+
+if __name__ == "__main__":
+    main()
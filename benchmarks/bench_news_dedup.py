@@ -0,0 +1,57 @@
+"""
+Near-duplicate news clustering (src/tools/news_dedup.py) on synthetic feeds: N distinct
+stories, each syndicated by several sites with different title decorations and snippet
+lengths. Reports clusters found vs. stories and the dedup time.
+
+    uv run python -m benchmarks.bench_news_dedup [--items 100 300 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tools.news_dedup import dedup_news
+
+WORDS = (
+    "nvidia apple tesla tsmc amd intel chips demand growth margin revenue china export guidance data center "
+    "shares rise fall analysts target price quarter results beat miss supply cloud capex rates fed inflation "
+    "tariffs earnings outlook investors buyback dividend lawsuit regulators deal acquisition launch model"
+).split()
+DECORATIONS = ["{} - Reuters", "UPDATE 1-{}", "{} | MarketWatch", "{}", "EXCLUSIVE: {}"]
+
+def feed(items, copies=4, seed=0):
+    rng = random.Random(seed)
+    stories = []
+    for _ in range(items // copies):
+        title = " ".join(rng.choice(WORDS) for _ in range(8))
+        summary = " ".join(rng.choice(WORDS) for _ in range(60))
+        stories.append((title, summary))
+    result = []
+    for i in range(items):
+        title, summary = stories[i % len(stories)]
+        result.append({
+            "title": rng.choice(DECORATIONS).format(title),
+            "summary": summary[: rng.randint(150, len(summary))],
+            "publisher": f"site{i % 17}",
+            "published": f"2025-06-{1 + i % 28:02d}T00:00:00Z",
+        })
+    return result, len(stories)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, nargs="*", default=[100, 300, 1000])
+    args = parser.parse_args()
+    print(f"{'items':>6} | {'stories':>7} | {'clusters':>8} | {'time (ms)':>9}")
+    for count in args.items:
+        items, stories = feed(count)
+        dedup_news(items[:10])  # warm-up
+        start = time.perf_counter()
+        clusters = dedup_news(items, terms=["nvidia"])
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{count:>6} | {stories:>7} | {len(clusters):>8} | {elapsed:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Per-request setup cost: rebuilding the graph, chat models and agents on every
+request (the old behaviour) versus reusing the process-wide memoized runtime.
+
+No network calls are made; only object construction is timed.
+
+    uv run python -m benchmarks.bench_setup_cost [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from src.agents import data_analyst, news_analyst, risk_manager, editor, router
+from src.graph import create_graph, get_graph
+from src.utils import get_agent, clear_client_caches
+
+NODES = {
+    "router": router,
+    "data_analyst": data_analyst,
+    "news_analyst": news_analyst,
+    "risk_manager": risk_manager,
+    "editor": editor,
+}
+
+def setup_per_request():
+    clear_client_caches()
+    create_graph()
+    for name, module in NODES.items():
+        get_agent(name, module._build_agent)
+
+def setup_memoized():
+    get_graph()
+    for name, module in NODES.items():
+        get_agent(name, module._build_agent)
+
+def bench(fn, iterations):
+    fn()  # warm imports
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cold = bench(setup_per_request, iterations)
+    warm = bench(setup_memoized, iterations)
+    clear_client_caches()
+    print(f"provider={os.getenv('LLM_PROVIDER', 'openai')} iterations={iterations}")
+    print(f"per-request rebuild : {cold:9.3f} ms/request")
+    print(f"memoized runtime    : {warm:9.3f} ms/request")
+    print(f"speedup             : {cold / warm:9.1f}x")
+
+if __name__ == "__main__":
+    main()
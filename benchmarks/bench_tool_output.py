@@ -0,0 +1,110 @@
+"""
+Tokens per tool call with TOOL_OUTPUT_MODE=verbose vs compact for `get_stock_data`,
+`get_multi_stock_data` and `search_news`.
+
+Runs offline on realistic fakes: a full-precision yfinance `info` dict (with the usual
+missing fields), a one-year price history and 10 Yahoo news items with full summaries.
+Tokens are counted with src/compaction.py (tiktoken when its encoding is available).
+
+    uv run python -m benchmarks.bench_tool_output
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench-tool-output-")
+
+import numpy as np
+import pandas as pd
+
+from src.compaction import count_tokens
+from src.tools import market_data
+from src.tools.finance_tools import format_comparison, format_stock_data
+from src.tools.search_tools import fetch_ticker_news
+
+TICKERS = ["NVDA", "AMD", "INTC"]
+
+def fake_info(ticker):
+    rng = np.random.default_rng(len(ticker))
+    return {
+        "marketCap": 3183465185280 * rng.random(),
+        "enterpriseValue": 3129113034752 * rng.random(),
+        "trailingPE": 52.893617021276595 * rng.random(),
+        "forwardPE": 31.46357142857143 * rng.random(),
+        "pegRatio": None,
+        "priceToBook": 45.13221359375921,
+        "priceToSalesTrailing12Months": 24.808403715683517,
+        "enterpriseToEbitda": 43.714,
+        "revenueGrowth": 0.779,
+        "earningsGrowth": 0.829,
+        "grossMargins": 0.75975,
+        "operatingMargins": 0.61933,
+        "returnOnEquity": 1.19178,
+        "totalCash": 43210000384,
+        "totalDebt": 10270000128,
+        "freeCashflow": 56403251200,
+        "targetMeanPrice": 176.38237,
+        "targetHighPrice": 220.0,
+        "targetLowPrice": None,
+        "recommendationKey": "strong_buy",
+        "numberOfAnalystOpinions": 57,
+        "fiftyTwoWeekHigh": 153.13,
+        "fiftyTwoWeekLow": 86.62,
+    }
+
+def fake_history(ticker):
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252, tz="America/New_York")
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(len(ticker)).normal(0, 0.02, len(index))))
+    volume = np.random.default_rng(1).integers(1e7, 5e8, len(index))
+    return pd.DataFrame({"Open": close * 0.995, "High": close * 1.013, "Low": close * 0.987, "Close": close, "Volume": volume}, index=index)
+
+class FakeTicker:
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+
+    @property
+    def news(self):
+        summary = (
+            f"{self.ticker} shares moved after the company reported quarterly results, with analysts "
+            "pointing to data-center demand, supply constraints and guidance for the coming quarters. "
+        ) * 3
+        return [
+            {"content": {
+                "title": f"{self.ticker} headline {i}: what the latest results mean for investors",
+                "summary": summary,
+                "pubDate": f"2025-06-{20 - i:02d}T12:00:00Z",
+                "provider": {"displayName": "Reuters"},
+                "clickThroughUrl": {"url": f"https://finance.yahoo.com/news/{self.ticker.lower()}-{i}.html"},
+            }}
+            for i in range(10)
+        ]
+
+def install_fakes():
+    market_data.fetch_info = fake_info
+    market_data.fetch_history = lambda ticker, period="1y", interval="1d": fake_history(ticker)
+    market_data.fetch_histories = lambda tickers, period="1y", interval="1d": {t: fake_history(t) for t in tickers}
+    sys.modules["yfinance"].Ticker = FakeTicker
+
+CALLS = [
+    ("get_stock_data", lambda: format_stock_data(TICKERS[0])),
+    ("get_multi_stock_data", lambda: format_comparison(TICKERS)),
+    ("search_news", lambda: fetch_ticker_news(TICKERS[0])),
+]
+
+def main():
+    install_fakes()
+    print(f"{'tool':>20} | {'verbose':>7} | {'compact':>7} | {'reduction':>9}")
+    for name, call in CALLS:
+        tokens = {}
+        for mode in ("verbose", "compact"):
+            os.environ["TOOL_OUTPUT_MODE"] = mode
+            with contextlib.redirect_stdout(io.StringIO()):
+                tokens[mode] = count_tokens(call())
+        reduction = 1 - tokens["compact"] / tokens["verbose"]
+        print(f"{name:>20} | {tokens['verbose']:>7} | {tokens['compact']:>7} | {reduction:>8.0%}")
+
+if __name__ == "__main__":
+    main()
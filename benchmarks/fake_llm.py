@@ -0,0 +1,92 @@
+"""
+Deterministic tool-calling chat model shared by the offline benchmarks.
+"""
+import asyncio
+import re
+import time
+import uuid
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.compaction import count_tokens
+
+class ScriptedToolModel(BaseChatModel):
+    """
+    Tool-calling fake: requests the tools a typical agent would call for the tickers in
+    its prompt, then answers. One tool call per turn unless `parallel_tool_calls`.
+
+    Each call sleeps `latency` seconds plus `token_latency` per completion token and reports
+    token usage (prompt and completion counted with src/compaction.py). Final answers are
+    `answer_words` words long (a one-line summary when 0).
+    """
+
+    latency: float = 0.8
+    token_latency: float = 0.0
+    parallel_tool_calls: bool = False
+    answer_words: int = 0
+
+    @property
+    def _llm_type(self):
+        return "scripted-tool-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tool_names=[getattr(t, "name", None) or t["name"] for t in tools])
+
+    def _plan(self, tool_names, text):
+        tickers = re.findall(r"'([A-Z0-9.\-]+)'", text) or re.findall(r"\b[A-Z]{2,5}\b", text)
+        if "submit_routing_instructions" in tool_names:
+            return [("submit_routing_instructions", {
+                "tickers": tickers, "data_analyst_instructions": "valuation", "news_analyst_instructions": "catalysts",
+            })]
+        plan = []
+        if "get_multi_stock_data" in tool_names:
+            plan = [("get_multi_stock_data", {"tickers": tickers})] if len(tickers) > 1 else []
+            plan += [("get_stock_data", {"ticker": t}) for t in tickers]
+        if "search_news" in tool_names:
+            plan += [("search_news", {"query": t}) for t in tickers]
+        if "web_search" in tool_names:
+            plan.append(("web_search", {"query": f"{' '.join(tickers)} risks"}))
+        return plan
+
+    def _generate(self, messages, stop=None, run_manager=None, tool_names=(), **kwargs):
+        result = self._respond(messages, tool_names)
+        time.sleep(self._latency(result))
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tool_names=(), **kwargs):
+        result = self._respond(messages, tool_names)
+        await asyncio.sleep(self._latency(result))
+        return result
+
+    def _latency(self, result):
+        return self.latency + self.token_latency * result.generations[0].message.usage_metadata["output_tokens"]
+
+    def _answer(self, messages, text):
+        if not self.answer_words:
+            return f"Analysis based on {len(messages)} messages."
+        tickers = re.findall(r"\b[A-Z]{2,5}\b", text) or ["the company"]
+        words = []
+        while len(words) < self.answer_words:
+            ticker = tickers[len(words) % len(tickers)]
+            words += f"{ticker} shows resilient margins, rising data-center demand and a valuation above its peers.".split()
+        return " ".join(words[:self.answer_words])
+
+    def _respond(self, messages, tool_names):
+        text = next((m.content for m in messages if isinstance(m, HumanMessage)), "")
+        plan = self._plan(tool_names, text)
+        done = sum(isinstance(m, ToolMessage) for m in messages)
+        if done < len(plan):
+            batch = plan[done:] if self.parallel_tool_calls else plan[done:done + 1]
+            calls = [{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:8]}"} for name, args in batch]
+            content, output = "", str(calls)
+        else:
+            calls, content = [], self._answer(messages, text)
+            output = content
+        prompt_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        completion_tokens = count_tokens(output)
+        message = AIMessage(content=content, tool_calls=calls, usage_metadata={
+            "input_tokens": prompt_tokens, "output_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
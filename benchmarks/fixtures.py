@@ -0,0 +1,224 @@
+"""
+Market data and news fixtures for the offline benchmarks, in the shapes yfinance and
+DuckDuckGo return them (full `info` dicts with missing fields, OHLCV frames, nested Yahoo
+news items with syndicated copies, DuckDuckGo news results).
+
+`generate(directory, tickers)` writes a deterministic fixture set; `install(directory)`
+replaces `yf.Ticker`, `yf.download` and the DuckDuckGo search with replays of a fixture
+directory, so everything above them (upstream client, caches, price store, news dedup and
+index, tool formatting) runs for real with no network.
+
+Layout: info/<TICKER>.json, history/<TICKER>.csv, news/<TICKER>.json, web.json
+"""
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+PUBLISHERS = ["Reuters", "Bloomberg", "Barron's", "MarketWatch", "Yahoo Finance", "Investor's Business Daily"]
+
+def _info(ticker, rng):
+    price = float(rng.uniform(20, 800))
+    shares = float(rng.uniform(2e8, 2.5e10))
+    return {
+        "symbol": ticker,
+        "shortName": f"{ticker} Inc.",
+        "longName": f"{ticker} Incorporated",
+        "sector": "Technology",
+        "industry": "Semiconductors",
+        "country": "United States",
+        "fullTimeEmployees": int(rng.integers(5_000, 200_000)),
+        "longBusinessSummary": (
+            f"{ticker} designs, develops and sells semiconductors, systems and software for data-center, "
+            "client, gaming and embedded markets worldwide. " * 6
+        ),
+        "currency": "USD",
+        "currentPrice": price,
+        "previousClose": price * float(rng.uniform(0.97, 1.03)),
+        "marketCap": price * shares,
+        "enterpriseValue": price * shares * float(rng.uniform(0.9, 1.1)),
+        "sharesOutstanding": shares,
+        "trailingPE": float(rng.uniform(8, 90)),
+        "forwardPE": float(rng.uniform(8, 60)),
+        "pegRatio": None,
+        "priceToBook": float(rng.uniform(1, 50)),
+        "priceToSalesTrailing12Months": float(rng.uniform(1, 30)),
+        "enterpriseToEbitda": float(rng.uniform(5, 60)),
+        "revenueGrowth": float(rng.uniform(-0.2, 0.9)),
+        "earningsGrowth": float(rng.uniform(-0.5, 1.2)),
+        "grossMargins": float(rng.uniform(0.3, 0.8)),
+        "operatingMargins": float(rng.uniform(0.05, 0.6)),
+        "profitMargins": float(rng.uniform(0.02, 0.5)),
+        "returnOnEquity": float(rng.uniform(0.05, 1.2)),
+        "returnOnAssets": float(rng.uniform(0.02, 0.4)),
+        "totalCash": float(rng.uniform(1e9, 9e10)),
+        "totalDebt": float(rng.uniform(1e9, 5e10)),
+        "debtToEquity": float(rng.uniform(5, 150)),
+        "freeCashflow": float(rng.uniform(1e9, 6e10)),
+        "dividendYield": None if rng.random() < 0.4 else float(rng.uniform(0.1, 3)),
+        "beta": float(rng.uniform(0.6, 2.2)),
+        "targetMeanPrice": price * float(rng.uniform(0.9, 1.4)),
+        "targetHighPrice": price * float(rng.uniform(1.3, 1.8)),
+        "targetLowPrice": None if rng.random() < 0.3 else price * float(rng.uniform(0.5, 0.9)),
+        "recommendationKey": str(rng.choice(["strong_buy", "buy", "hold", "underperform"])),
+        "numberOfAnalystOpinions": int(rng.integers(5, 60)),
+        "fiftyTwoWeekHigh": price * float(rng.uniform(1.05, 1.6)),
+        "fiftyTwoWeekLow": price * float(rng.uniform(0.4, 0.95)),
+        "fiftyDayAverage": price * float(rng.uniform(0.9, 1.1)),
+        "twoHundredDayAverage": price * float(rng.uniform(0.8, 1.2)),
+        "averageVolume": int(rng.integers(1e6, 3e8)),
+    }
+
+def _history(ticker, rng, sessions=504):
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=sessions, tz="America/New_York")
+    close = rng.uniform(20, 800) * np.exp(np.cumsum(rng.normal(0.0004, 0.022, sessions)))
+    return pd.DataFrame({
+        "Open": close * rng.uniform(0.99, 1.01, sessions),
+        "High": close * rng.uniform(1.0, 1.03, sessions),
+        "Low": close * rng.uniform(0.97, 1.0, sessions),
+        "Close": close,
+        "Volume": rng.integers(1e6, 4e8, sessions).astype(float),
+    }, index=pd.Index(index, name="Date"))
+
+def _news(ticker, rng, stories=8, copies=3):
+    now = pd.Timestamp.now(tz="UTC")
+    items = []
+    for story in range(stories):
+        published = now - pd.Timedelta(hours=int(rng.integers(1, 24 * 10)))
+        summary = (
+            f"{ticker} shares moved after the company said demand for its accelerators remained strong in story {story}; "
+            f"analysts pointed to supply constraints, pricing and guidance for the coming quarters. "
+        ) * 2
+        # The first story is syndicated by several publishers, as wire stories are
+        for copy in range(copies if story == 0 else 1):
+            publisher = PUBLISHERS[(story + copy) % len(PUBLISHERS)]
+            items.append({"content": {
+                "id": f"{ticker.lower()}-{story}-{copy}",
+                "contentType": "STORY",
+                "title": f"{ticker} update {story}: what the latest results mean for investors" + (f" - {publisher}" if copy else ""),
+                "summary": summary[: 400 - 40 * copy],
+                "pubDate": (published + pd.Timedelta(minutes=7 * copy)).isoformat().replace("+00:00", "Z"),
+                "provider": {"displayName": publisher, "url": "https://www.example.com"},
+                "clickThroughUrl": {"url": f"https://finance.yahoo.com/news/{ticker.lower()}-{story}-{copy}.html"},
+                "canonicalUrl": {"url": f"https://www.example.com/{ticker.lower()}-{story}-{copy}"},
+                "thumbnail": {"resolutions": [{"url": "https://s.yimg.com/x.jpg", "width": 140, "height": 140}]},
+            }})
+    return items
+
+def _web(rng, results=10):
+    now = pd.Timestamp.now(tz="UTC")
+    return [
+        {
+            "snippet": "{query}: analysts weigh export controls, capacity additions and customer concentration " * 2,
+            "title": f"{{query}}: what to watch, part {i}",
+            "link": f"https://news.example.com/{{slug}}-{i}",
+            "date": (now - pd.Timedelta(hours=int(rng.integers(1, 24 * 7)))).isoformat(),
+            "source": PUBLISHERS[i % len(PUBLISHERS)],
+        }
+        for i in range(results)
+    ]
+
+def generate(directory, tickers, seed=0):
+    """
+    Writes a deterministic fixture set for `tickers` (plus web search results) to `directory`.
+    """
+    for part in ("info", "history", "news"):
+        os.makedirs(os.path.join(directory, part), exist_ok=True)
+    for ticker in tickers:
+        rng = np.random.default_rng([seed, *ticker.encode()])
+        with open(os.path.join(directory, "info", f"{ticker}.json"), "w") as f:
+            json.dump(_info(ticker, rng), f)
+        _history(ticker, rng).to_csv(os.path.join(directory, "history", f"{ticker}.csv"))
+        with open(os.path.join(directory, "news", f"{ticker}.json"), "w") as f:
+            json.dump(_news(ticker, rng), f)
+    with open(os.path.join(directory, "web.json"), "w") as f:
+        json.dump(_web(np.random.default_rng(seed)), f)
+    return directory
+
+class Fixtures:
+    """
+    Reads a fixture directory, sleeping `latency` seconds per request like a network call.
+    """
+
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+
+    def _load(self, *parts):
+        time.sleep(self.latency)
+        path = os.path.join(self.directory, *parts)
+        if not os.path.exists(path):
+            return None
+        if path.endswith(".csv"):
+            frame = pd.read_csv(path, index_col=0)
+            frame.index = pd.to_datetime(frame.index, utc=True).tz_convert("America/New_York")
+            return frame
+        with open(path) as f:
+            return json.load(f)
+
+    def info(self, ticker):
+        return self._load("info", f"{ticker}.json") or {}
+
+    def news(self, ticker):
+        return self._load("news", f"{ticker}.json") or []
+
+    def history(self, ticker, period=None, start=None):
+        frame = self._load("history", f"{ticker}.csv")
+        if frame is None:
+            return pd.DataFrame()
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start).tz_convert(frame.index.tz)]
+        days = {"1d": 1, "5d": 7, "1mo": 30, "3mo": 91, "6mo": 182, "1y": 365, "2y": 730}.get(period)
+        return frame[frame.index >= frame.index[-1] - pd.Timedelta(days=days)] if days else frame
+
+    def web(self, query):
+        slug = "-".join(query.lower().split())
+        return [
+            {key: value.format(query=query, slug=slug) for key, value in result.items()}
+            for result in self._load("web.json") or []
+        ]
+
+def install(directory, latency=0.0):
+    """
+    Serves yfinance and DuckDuckGo from the fixtures in `directory`.
+    """
+    from src.tools import search_tools
+
+    fixtures = Fixtures(directory, latency)
+
+    class FixtureTicker:
+        def __init__(self, ticker, session=None):
+            self.ticker = ticker
+
+        @property
+        def info(self):
+            return fixtures.info(self.ticker)
+
+        @property
+        def news(self):
+            return fixtures.news(self.ticker)
+
+        def history(self, period=None, start=None, interval="1d", **kwargs):
+            return fixtures.history(self.ticker, period=period, start=start)
+
+    def download(tickers, period=None, start=None, interval="1d", **kwargs):
+        # One request for the whole batch, like yf.download
+        time.sleep(latency)
+        frames = {t: Fixtures(directory).history(t, period=period, start=start) for t in tickers}
+        frames = {t: frame for t, frame in frames.items() if not frame.empty}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    class FixtureSearch:
+        def __init__(self, **kwargs):
+            pass
+
+        def run(self, query):
+            return fixtures.web(query)
+
+    yfinance = sys.modules.get("yfinance") or __import__("yfinance")
+    yfinance.Ticker = FixtureTicker
+    yfinance.download = download
+    search_tools.DuckDuckGoSearchResults = FixtureSearch
+    return fixtures
@@ -1,20 +1,28 @@
+import logging
 from langchain.agents import create_agent
 from ..state import AgentState
-from ..tools.finance_tools import get_stock_data
-from ..utils import get_llm
+from ..tools.finance_tools import get_stock_data, get_multi_stock_data
+from ..tools.metrics import get_risk_metrics
+from ..tools.screener import screen_stocks
+from ..utils import get_llm, get_agent
 
-def data_analyst_node(state: AgentState):
-    """
-    Finance Data Analyst that gathers and analyzes market data using a ReAct agent.
-    """
-    llm = get_llm(temperature=0)
-    tools = [get_stock_data]
-    
-    system_prompt = """You are a Senior Financial Data Analyst at a top-tier investment bank.
+logger = logging.getLogger(__name__)
+
+_ROLE = """You are a Senior Financial Data Analyst at a top-tier investment bank.
     Your goal is to provide a rigorous quantitative analysis of the provided tickers, **specifically addressing the user's question**.
     
-    1. Use the `get_stock_data` tool to fetch comprehensive data.
-    2. **Context-Aware Analysis**: Look for data points that specifically support or refute the user's hypothesis (e.g., if they ask about "margins", focus on that).
+"""
+
+_TOOLS_STEP = """    1. Use the `get_stock_data` tool to fetch comprehensive data. When analyzing 2 or more tickers, call `get_multi_stock_data` ONCE with all of them for a comparison table, then use `get_stock_data` only for tickers that need a deeper look.
+       Use `get_risk_metrics` only when the question is about volatility, drawdowns, beta or technical trend.
+       Use `screen_stocks` to find peers or candidates across the whole market (e.g. cheaper companies in the same industry).
+"""
+
+# Prefetch graph mode: the data is already in the user message, so no tool round trips are needed
+_PREFETCH_STEP = """    1. The market data for every ticker (and a comparison table when there are 2 or more) is already included in the message. Base your analysis on it; do not ask for more data.
+"""
+
+_ANALYSIS = """    2. **Context-Aware Analysis**: Look for data points that specifically support or refute the user's hypothesis (e.g., if they ask about "margins", focus on that).
     3. **Valuation Analysis**: Compare P/E, PEG, and EV/EBITDA to historical norms or general market benchmarks. Is the stock cheap or expensive?
     4. **Financial Health**: Analyze margins (Gross/Operating), growth rates (Revenue/Earnings), and balance sheet strength (Cash vs Debt).
     5. **Analyst Consensus**: Summarize the street's view (Target Prices, Recommendations).
@@ -33,32 +41,76 @@ def data_analyst_node(state: AgentState):
     Ensure numbers are formatted legibly (e.g., 1.2B, 35%).
     If comparing multiple tickers, a comparison table is highly recommended.
     """
-    
-    # Create the agent
-    agent = create_agent(
-        model=llm,
-        tools=tools,
-        system_prompt=system_prompt
+
+SYSTEM_PROMPT = _ROLE + _TOOLS_STEP + _ANALYSIS
+PREFETCH_SYSTEM_PROMPT = _ROLE + _PREFETCH_STEP + _ANALYSIS
+
+def _build_agent():
+    return create_agent(
+        model=get_llm(temperature=0, node="data_analyst"),
+        tools=[get_stock_data, get_multi_stock_data, get_risk_metrics, screen_stocks],
+        system_prompt=SYSTEM_PROMPT
     )
-    
+
+def _build_prefetch_agent():
+    return create_agent(
+        model=get_llm(temperature=0, node="data_analyst"),
+        tools=[],
+        system_prompt=PREFETCH_SYSTEM_PROMPT
+    )
+
+def _get_agent(state: AgentState):
+    if state.get("prefetched_data") is not None:
+        return get_agent("data_analyst:prefetch", _build_prefetch_agent)
+    return get_agent("data_analyst", _build_agent)
+
+def _build_user_message(state: AgentState):
     tickers = state["tickers"]
     query = state["query"]
     instructions = state.get("data_analyst_instructions", "")
+    screen_results = state.get("screen_results")
     
-    user_message = f"""Analyze the following tickers: {tickers}. 
+    message = f"""Analyze the following tickers: {tickers}. 
 
         User's Specific Question: {query}
 
         **Specific Instructions from Lead**:
         {instructions}
         """
+    if state.get("prefetched_data") is not None:
+        message += f"""
+        **Market Data**:
+        {state["prefetched_data"]}
+        """
+    if screen_results:
+        message += f"""
+        **Screen Results** (the tickers above were selected by this screen):
+        {screen_results}
+        """
+    return message
+
+def data_analyst_node(state: AgentState):
+    """
+    Finance Data Analyst that gathers and analyzes market data using a ReAct agent.
+    """
+    agent = _get_agent(state)
         
     # Invoke the agent
     # The agent expects a list of messages. We pass the task as a human message.
-    result = agent.invoke({"messages": [("human", user_message)]})
+    result = agent.invoke({"messages": [("human", _build_user_message(state))]})
     
     # The result contains the full state of the agent, including messages.
     # The last message should be the AI's final response.
     last_message = result["messages"][-1]
-    print(last_message) 
+    logger.debug("Data analyst response: %s", last_message)
+    return {"data_analysis": last_message.content}
+
+async def adata_analyst_node(state: AgentState):
+    """
+    Async variant of `data_analyst_node`. Tool calls run on the bounded tool pool.
+    """
+    agent = _get_agent(state)
+    result = await agent.ainvoke({"messages": [("human", _build_user_message(state))]})
+    last_message = result["messages"][-1]
+    logger.debug("Data analyst response: %s", last_message)
     return {"data_analysis": last_message.content}
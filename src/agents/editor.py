@@ -1,14 +1,9 @@
 from langchain.agents import create_agent
 from ..state import AgentState
-from ..utils import get_llm
+from ..utils import get_llm, get_agent
+from ..compaction import compact_sections
 
-def editor_node(state: AgentState):
-    """
-    Chief Editor that compiles the final investment memo.
-    """
-    llm = get_llm(temperature=0)
-    
-    system_prompt = """You are the Chief Editor of a prestigious investment research firm (like Goldman Sachs or Morgan Stanley).
+SYSTEM_PROMPT = """You are the Chief Editor of a prestigious investment research firm (like Goldman Sachs or Morgan Stanley).
     Your goal is to compile a comprehensive "Sell-Side" Investment Report, **specifically addressing the user's question**.
     
     Inputs:
@@ -47,20 +42,30 @@ def editor_node(state: AgentState):
     
     Tone: Authoritative, professional, and decisive.
     """
-    
-    # Create the agent
-    agent = create_agent(
-        model=llm,
+
+def _build_agent():
+    return create_agent(
+        model=get_llm(temperature=0, node="editor"),
         tools=[],
-        system_prompt=system_prompt
+        system_prompt=SYSTEM_PROMPT
     )
-    
+
+def _build_user_message(state: AgentState):
+    """
+    Returns the prompt and its context-token stats; the upstream outputs are compacted
+    to EDITOR_TOKEN_BUDGET.
+    """
     user_query = state.get("query", "No specific query provided.")
-    data_analysis = state.get("data_analysis")
-    news_analysis = state.get("news_analysis")
-    risk_assessment = state.get("risk_assessment")
+    sections, stats = compact_sections("editor", {
+        "data_analysis": state.get("data_analysis") or "",
+        "news_analysis": state.get("news_analysis") or "",
+        "risk_assessment": state.get("risk_assessment") or "",
+    })
+    data_analysis = sections["data_analysis"]
+    news_analysis = sections["news_analysis"]
+    risk_assessment = sections["risk_assessment"]
     
-    user_message = f"""User Query:
+    message = f"""User Query:
 {user_query}
 
 Data Analysis:
@@ -73,11 +78,29 @@ Risk Assessment:
 {risk_assessment}
 
 Please generate the final Investment Memo."""
+    return message, {"editor": stats}
+
+def editor_node(state: AgentState):
+    """
+    Chief Editor that compiles the final investment memo.
+    """
+    agent = get_agent("editor", _build_agent)
+    message, context_tokens = _build_user_message(state)
     
     # Invoke the agent
-    result = agent.invoke({"messages": [("human", user_message)]})
+    result = agent.invoke({"messages": [("human", message)]})
     
     # The result contains the full state of the agent, including messages.
     last_message = result["messages"][-1]
     
-    return {"final_report": last_message.content}
+    return {"final_report": last_message.content, "context_tokens": context_tokens}
+
+async def aeditor_node(state: AgentState):
+    """
+    Async variant of `editor_node`.
+    """
+    agent = get_agent("editor", _build_agent)
+    message, context_tokens = _build_user_message(state)
+    result = await agent.ainvoke({"messages": [("human", message)]})
+    last_message = result["messages"][-1]
+    return {"final_report": last_message.content, "context_tokens": context_tokens}
@@ -0,0 +1,58 @@
+from langgraph.types import Send
+from ..state import AgentState
+from .data_analyst import data_analyst_node, adata_analyst_node
+from .news_analyst import news_analyst_node, anews_analyst_node
+
+# Keys copied from the graph state into each per-ticker task
+TASK_KEYS = ("query", "data_analyst_instructions", "news_analyst_instructions", "screen_results")
+
+def dispatch_per_ticker(state: AgentState):
+    """
+    Map step of the fan-out graph: one data-analyst and one news-analyst task per ticker,
+    each with a single-ticker state so every LLM context stays small. Quant metrics
+    still runs once for all tickers (it is a single vectorized computation).
+    """
+    base = {key: state.get(key) for key in TASK_KEYS}
+    groups = [[ticker] for ticker in state.get("tickers") or []] or [[]]
+    sends = []
+    for tickers in groups:
+        sends.append(Send("ticker_data_analyst", {**base, "tickers": tickers}))
+        sends.append(Send("ticker_news_analyst", {**base, "tickers": tickers}))
+    return [*sends, "quant_metrics"]
+
+def _key(task):
+    return task["tickers"][0] if task["tickers"] else ""
+
+def ticker_data_analyst_node(task):
+    return {"ticker_data_analyses": {_key(task): data_analyst_node(task)["data_analysis"]}}
+
+async def aticker_data_analyst_node(task):
+    return {"ticker_data_analyses": {_key(task): (await adata_analyst_node(task))["data_analysis"]}}
+
+def ticker_news_analyst_node(task):
+    return {"ticker_news_analyses": {_key(task): news_analyst_node(task)["news_analysis"]}}
+
+async def aticker_news_analyst_node(task):
+    return {"ticker_news_analyses": {_key(task): (await anews_analyst_node(task))["news_analysis"]}}
+
+def _join(analyses, tickers):
+    analyses = analyses or {}
+    if set(analyses) == {""}:
+        return analyses[""]
+    ordered = [t for t in tickers if t in analyses] + [t for t in analyses if t not in tickers]
+    return "\n\n".join(f"## {ticker}\n\n{analyses[ticker]}" for ticker in ordered)
+
+def merge_analyses_node(state: AgentState):
+    """
+    Reduce step of the fan-out graph: joins the per-ticker analyses (collected by the
+    `ticker_*_analyses` reducers) into the `data_analysis` / `news_analysis` fields the
+    Risk Manager and Editor read.
+    """
+    tickers = state.get("tickers") or []
+    return {
+        "data_analysis": _join(state.get("ticker_data_analyses"), tickers),
+        "news_analysis": _join(state.get("ticker_news_analyses"), tickers),
+    }
+
+async def amerge_analyses_node(state: AgentState):
+    return merge_analyses_node(state)
@@ -1,23 +1,28 @@
 from langchain.agents import create_agent
 from ..state import AgentState
-from ..tools.search_tools import search_news, web_search
-from ..utils import get_llm
+from ..tools.search_tools import search_news, search_local_news, web_search
+from ..utils import get_llm, get_agent
 
-def news_analyst_node(state: AgentState):
-    """
-    Finance News Analyst that searches for and summarizes news using a ReAct agent.
-    """
-    llm = get_llm(temperature=0)
-    tools = [search_news, web_search]
-    
-    system_prompt = """You are a Senior News Analyst at a top-tier investment bank.
+_ROLE = """You are a Senior News Analyst at a top-tier investment bank.
     Your goal is to synthesize market news into actionable insights, **specifically addressing the user's question**.
     
-    1. **Tool Selection**:
+"""
+
+_TOOLS_STEP = """    1. **Tool Selection**:
        - Use `search_news` for broad company coverage (Input: Ticker only, e.g., 'NVDA').
        - Use `web_search` for **specific questions**, **market sentiment**, or **competitor analysis** (Input: Search query, e.g., 'NVDA Blackwell delay rumors', 'TSM 2nm progress').
+       - Use `search_local_news` for keyword or time-window lookups in news already collected (instant, e.g. query 'Blackwell', tickers ['NVDA'], days 30); fall back to `web_search` if it finds nothing relevant.
        - **STRATEGY**: If the user asks a specific question (e.g., "risks"), you MUST use `web_search` with a targeted query in addition to checking the general ticker news.
-    
+"""
+
+# Prefetch graph mode: ticker news is already in the user message; only targeted searches need a tool call
+_PREFETCH_STEP = """    1. **Tool Selection**:
+       - The latest news for every ticker is already included in the message (same format as the `search_news` tool).
+       - Use `web_search` only for **specific questions**, **market sentiment**, or **competitor analysis** that the provided news does not cover (Input: Search query, e.g., 'NVDA Blackwell delay rumors').
+       - Use `search_local_news` first for keyword or time-window lookups in news already collected (instant, no web request).
+"""
+
+_ANALYSIS = """
     2. **Context-Aware Analysis**: Filter and analyze news to address the user's specific concern.
     3. **Debate Analysis**: What are the Bulls saying? What are the Bears saying?
     4. **Catalyst Identification**: Identify specific events that could move the stock price.
@@ -34,40 +39,73 @@ def news_analyst_node(state: AgentState):
     
     **CRITICAL OUTPUT FORMAT**:
     For the "**News links (新聞連結)**" section, you MUST use strict Markdown format: `[Title](URL)`.
-    The `search_news` tool returns data in the format:
-    `Title: ...`
-    `Link: ...`
-    `Summary: ...`
+    The news tools return one entry per story with its title, link and summary. Syndicated copies of a story are
+    merged into one entry that lists how many sources carried it; widely carried stories matter more.
     
-    You MUST extract the `Title` and `Link` exactly as provided.
+    You MUST extract the title and link exactly as provided.
     Example: `[Bloomberg: NVDA hits record high](https://www.bloomberg.com/news/...)`
     Do NOT just list the URL. Do NOT use HTML.
     """
-    
-    # Create the agent
-    agent = create_agent(
-        model=llm,
-        tools=tools,
-        system_prompt=system_prompt
+
+SYSTEM_PROMPT = _ROLE + _TOOLS_STEP + _ANALYSIS
+PREFETCH_SYSTEM_PROMPT = _ROLE + _PREFETCH_STEP + _ANALYSIS
+
+def _build_agent():
+    return create_agent(
+        model=get_llm(temperature=0, node="news_analyst"),
+        tools=[search_news, search_local_news, web_search],
+        system_prompt=SYSTEM_PROMPT
     )
-    
-    
+
+def _build_prefetch_agent():
+    return create_agent(
+        model=get_llm(temperature=0, node="news_analyst"),
+        tools=[search_local_news, web_search],
+        system_prompt=PREFETCH_SYSTEM_PROMPT
+    )
+
+def _get_agent(state: AgentState):
+    if state.get("prefetched_news") is not None:
+        return get_agent("news_analyst:prefetch", _build_prefetch_agent)
+    return get_agent("news_analyst", _build_agent)
+
+def _build_user_message(state: AgentState):
     tickers = state["tickers"]
     query = state["query"]
     instructions = state.get("news_analyst_instructions", "")
     
-    user_message = f"""Find and analyze news for the following tickers: {tickers}. 
+    message = f"""Find and analyze news for the following tickers: {tickers}. 
 
         User's Specific Question: {query}
 
         **Specific Instructions from Lead**:
         {instructions}
         """
+    if state.get("prefetched_news") is not None:
+        message += f"""
+        **Latest Ticker News**:
+        {state["prefetched_news"]}
+        """
+    return message
+
+def news_analyst_node(state: AgentState):
+    """
+    Finance News Analyst that searches for and summarizes news using a ReAct agent.
+    """
+    agent = _get_agent(state)
     
     # Invoke the agent
-    result = agent.invoke({"messages": [("human", user_message)]})
+    result = agent.invoke({"messages": [("human", _build_user_message(state))]})
     
     # The result contains the full state of the agent, including messages.
     last_message = result["messages"][-1]
-   #print(last_message) 
+    return {"news_analysis": last_message.content}
+
+async def anews_analyst_node(state: AgentState):
+    """
+    Async variant of `news_analyst_node`. Tool calls run on the bounded tool pool.
+    """
+    agent = _get_agent(state)
+    result = await agent.ainvoke({"messages": [("human", _build_user_message(state))]})
+    last_message = result["messages"][-1]
     return {"news_analysis": last_message.content}
@@ -0,0 +1,55 @@
+import asyncio
+import contextvars
+from ..state import AgentState
+from ..tools.finance_tools import format_stock_data, format_comparison
+from ..tools.search_tools import fetch_ticker_news
+from ..tools.pool import get_tool_executor, run_in_tool_pool
+
+def _jobs(tickers):
+    # (label, function, argument) for every fetch the analysts would otherwise request via tool calls
+    jobs = [("data", format_stock_data, ticker) for ticker in tickers]
+    if len(tickers) > 1:
+        jobs.append(("comparison", format_comparison, tickers))
+    jobs += [("news", fetch_ticker_news, ticker) for ticker in tickers]
+    return jobs
+
+def _assemble(jobs, results):
+    data, news = [], []
+    for (label, _, arg), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            result = f"Error fetching {label} for {arg}: {result}"
+        if label == "news":
+            news.append(f"### {arg}\n{result}")
+        elif label == "comparison":
+            data.insert(0, f"### Comparison\n{result}")
+        else:
+            data.append(f"### {arg}\n{result}")
+    return {
+        "prefetched_data": "\n\n".join(data) or "No tickers to fetch.",
+        "prefetched_news": "\n\n".join(news) or "No tickers to fetch.",
+    }
+
+def _call(func, arg):
+    try:
+        return func(arg)
+    except Exception as e:
+        return e
+
+def prefetch_node(state: AgentState):
+    """
+    Fetches stock data and ticker news for every routed ticker concurrently (no LLM involved),
+    so the analysts get the data in their prompt instead of requesting it through tool calls.
+    """
+    jobs = _jobs(state.get("tickers") or [])
+    executor = get_tool_executor()
+    futures = [executor.submit(contextvars.copy_context().run, _call, func, arg) for _, func, arg in jobs]
+    results = [future.result() for future in futures]
+    return _assemble(jobs, results)
+
+async def aprefetch_node(state: AgentState):
+    """
+    Async variant of `prefetch_node`; every fetch runs on the bounded tool pool.
+    """
+    jobs = _jobs(state.get("tickers") or [])
+    results = await asyncio.gather(*(run_in_tool_pool(_call, func, arg) for _, func, arg in jobs))
+    return _assemble(jobs, results)
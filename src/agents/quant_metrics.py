@@ -0,0 +1,26 @@
+import logging
+from ..state import AgentState
+from ..tools.metrics import fetch_risk_metrics
+from ..tools.pool import run_in_tool_pool
+
+logger = logging.getLogger(__name__)
+
+def quant_metrics_node(state: AgentState):
+    """
+    Computes quantitative risk metrics for the routed tickers (no LLM involved).
+    Runs alongside the analysts and feeds structured data to the Risk Manager.
+    """
+    tickers = state.get("tickers") or []
+    if not tickers:
+        return {"risk_metrics": {}}
+    try:
+        return {"risk_metrics": fetch_risk_metrics(tickers)}
+    except Exception as e:
+        logger.warning("Error computing risk metrics for %s: %s", tickers, e)
+        return {"risk_metrics": {}}
+
+async def aquant_metrics_node(state: AgentState):
+    """
+    Async variant of `quant_metrics_node`; the fetch and computation run on the tool pool.
+    """
+    return await run_in_tool_pool(quant_metrics_node, state)
@@ -1,20 +1,19 @@
 from langchain.agents import create_agent
 from ..state import AgentState
-from ..utils import get_llm
+from ..tools.metrics import format_metrics_table
+from ..compaction import compact_sections
+from ..utils import get_llm, get_agent
 
-def risk_manager_node(state: AgentState):
-    """
-    Risk Manager that assesses risks based on data and news analysis.
-    """
-    llm = get_llm(temperature=0)
-    
-    system_prompt = """You are a Chief Risk Officer at a major investment fund.
+SYSTEM_PROMPT = """You are a Chief Risk Officer at a major investment fund.
     Your job is to play "Devil's Advocate" and identify the downside risks that others might miss, **specifically regarding the user's question**.
     
     Input:
     - User Query: The specific question or hypothesis the user has.
     - Data Analysis (Valuation, Financials)
     - News Analysis (Catalysts, Sentiment)
+    - Quantitative Risk Metrics (realized volatility, max drawdown, beta, Sharpe, ATR, moving-average trend, volume z-score)
+    
+    Ground your Risk Score in the quantitative metrics where available (e.g., high beta or a deep drawdown raises risk).
     
     Output in **Traditional Chinese (繁體中文)**:
     1. **Stress Test User's Hypothesis (壓力測試用戶假設)**: If the user is asking "Is X a bottleneck?", explore "What if X is NOT a bottleneck?" or "What if X gets worse?".
@@ -26,19 +25,30 @@ def risk_manager_node(state: AgentState):
     
     **IMPORTANT**: Start directly with the analysis. Do NOT use introductory phrases like "As a Chief Risk Officer..." or "Here is my assessment...". Go straight to the first section.
     """
-    
-    # Create the agent
-    agent = create_agent(
-        model=llm,
+
+def _build_agent():
+    return create_agent(
+        model=get_llm(temperature=0, node="risk_manager"),
         tools=[],
-        system_prompt=system_prompt
+        system_prompt=SYSTEM_PROMPT
     )
-    
+
+def _build_user_message(state: AgentState):
+    """
+    Returns the prompt and its context-token stats; the upstream analyses are compacted
+    to RISK_MANAGER_TOKEN_BUDGET (the metrics table is always forwarded in full).
+    """
     user_query = state.get("query", "No specific query provided.")
-    data_analysis = state.get("data_analysis", "No data analysis provided.")
-    news_analysis = state.get("news_analysis", "No news analysis provided.")
+    sections, stats = compact_sections("risk_manager", {
+        "data_analysis": state.get("data_analysis") or "No data analysis provided.",
+        "news_analysis": state.get("news_analysis") or "No news analysis provided.",
+    })
+    data_analysis = sections["data_analysis"]
+    news_analysis = sections["news_analysis"]
+    risk_metrics = state.get("risk_metrics")
+    metrics_table = format_metrics_table(risk_metrics) if risk_metrics else "No quantitative metrics available."
     
-    user_message = f"""User Query:
+    message = f"""User Query:
 {user_query}
 
 Data Analysis:
@@ -47,12 +57,33 @@ Data Analysis:
 News Analysis:
 {news_analysis}
 
+Quantitative Risk Metrics:
+{metrics_table}
+
 Please provide your risk assessment."""
+    return message, {"risk_manager": stats}
+
+def risk_manager_node(state: AgentState):
+    """
+    Risk Manager that assesses risks based on data and news analysis.
+    """
+    agent = get_agent("risk_manager", _build_agent)
+    message, context_tokens = _build_user_message(state)
     
     # Invoke the agent
-    result = agent.invoke({"messages": [("human", user_message)]})
+    result = agent.invoke({"messages": [("human", message)]})
     
     # The result contains the full state of the agent, including messages.
     last_message = result["messages"][-1]
     
-    return {"risk_assessment": last_message.content}
+    return {"risk_assessment": last_message.content, "context_tokens": context_tokens}
+
+async def arisk_manager_node(state: AgentState):
+    """
+    Async variant of `risk_manager_node`.
+    """
+    agent = get_agent("risk_manager", _build_agent)
+    message, context_tokens = _build_user_message(state)
+    result = await agent.ainvoke({"messages": [("human", message)]})
+    last_message = result["messages"][-1]
+    return {"risk_assessment": last_message.content, "context_tokens": context_tokens}
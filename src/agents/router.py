@@ -1,11 +1,19 @@
+import os
 from typing import List
 from langchain.agents import create_agent
 from langchain_core.tools import tool
 from ..state import AgentState
-from ..utils import get_llm
+from ..tools.symbols import get_symbol_index, is_simple_query, validate_tickers
+from ..utils import get_llm, get_agent
 
 @tool
-def submit_routing_instructions(tickers: List[str], data_analyst_instructions: str, news_analyst_instructions: str):
+def submit_routing_instructions(
+    tickers: List[str],
+    data_analyst_instructions: str,
+    news_analyst_instructions: str,
+    screen_filters: str = "",
+    screen_sort: str = "",
+):
     """
     Submit the extracted tickers and specific instructions for the Data Analyst and News Analyst.
     
@@ -13,16 +21,13 @@ def submit_routing_instructions(tickers: List[str], data_analyst_instructions: s
         tickers: List of stock tickers found in the query.
         data_analyst_instructions: Specific instructions for the Data Analyst (financials, valuation).
         news_analyst_instructions: Specific instructions for the News Analyst (news, sentiment, events).
+        screen_filters: Only for open-ended queries that name no stocks: screener conditions,
+            e.g. "industry ~ semiconductor, revenue_growth > 20%". Leave empty otherwise.
+        screen_sort: Field to rank screen results by, "-" prefix for descending (e.g. "pe", "-market_cap").
     """
     return "Instructions submitted."
 
-def router_node(state: AgentState):
-    """
-    Router agent that extracts tickers and generates specific instructions for analysts.
-    """
-    llm = get_llm(temperature=0)
-    
-    system_prompt = """You are a Senior Financial Research Lead.
+SYSTEM_PROMPT = """You are a Senior Financial Research Lead.
     Your job is to orchestrate the research process by analyzing the user's query and delegating tasks.
     
     1. **Analyze the User Query**: Understand the core question, hypothesis, or concern.
@@ -33,22 +38,57 @@ def router_node(state: AgentState):
     4. **Delegate to News Analyst**: Create specific instructions for the News Analyst.
        - What specific keywords or topics should they search for? (e.g., "Search for 'supply chain issues' if the user asks about delays").
        - What sentiment or events matter most?
+    5. **Open-Ended Queries**: If the user asks to *find* or *rank* stocks without naming them (e.g., "cheapest P/E semis with >20% revenue growth"),
+       leave `tickers` empty and fill `screen_filters` (and `screen_sort`) instead; the screener will pick the tickers.
+       Fields: price, market_cap, pe, forward_pe, peg, pb, ps, ev_ebitda, revenue_growth, earnings_growth, gross_margin,
+       operating_margin, profit_margin, roe, debt_to_equity, dividend_yield, beta, return_1m, return_3m, return_1y,
+       volatility_3m, pct_from_high; text fields sector/industry/name support "~" (contains).
        
     **Goal**: Do not just pass the generic query. Translate the user's intent into precise, actionable technical instructions for your team.
     
     You MUST call the `submit_routing_instructions` tool to output your decision.
     """
-    
-    # Create the agent
-    agent = create_agent(
-        model=llm,
+
+# Instructions for simple queries resolved without the LLM ("Analyze AAPL and MSFT")
+DATA_INSTRUCTIONS_TEMPLATE = (
+    "Review {tickers}: valuation (P/E, PEG, EV/EBITDA vs. history and peers), financial health "
+    "(margins, ROE, cash vs. debt), revenue and earnings growth, and analyst consensus.{compare}"
+)
+NEWS_INSTRUCTIONS_TEMPLATE = (
+    "Search the latest news for {tickers}: upcoming and recent catalysts, the bull vs. bear debate, "
+    "and overall market sentiment.{compare}"
+)
+
+def fast_route(query: str):
+    """
+    Routes simple queries from the local symbol index without an LLM call.
+    Returns None when the query is ambiguous (unknown ticker-like tokens, no match) or asks
+    something beyond "look at these tickers", in which case the LLM router decides.
+    """
+    if os.getenv("ROUTER_FAST_PATH", "true").lower() in ("0", "false", "no"):
+        return None
+    tickers, unknown, remainder = get_symbol_index().resolve(query)
+    if not tickers or unknown or not is_simple_query(remainder):
+        return None
+    names = ", ".join(tickers)
+    return {
+        "tickers": tickers,
+        "data_analyst_instructions": DATA_INSTRUCTIONS_TEMPLATE.format(
+            tickers=names, compare=" Compare them side by side." if len(tickers) > 1 else ""
+        ),
+        "news_analyst_instructions": NEWS_INSTRUCTIONS_TEMPLATE.format(
+            tickers=names, compare=" Contrast how the market views each of them." if len(tickers) > 1 else ""
+        ),
+    }
+
+def _build_agent():
+    return create_agent(
+        model=get_llm(temperature=0, node="router"),
         tools=[submit_routing_instructions],
-        system_prompt=system_prompt
+        system_prompt=SYSTEM_PROMPT
     )
-    
-    # Invoke the agent
-    result = agent.invoke({"messages": [("human", state["query"])]})
-    
+
+def _parse_routing(result, state: AgentState):
     # Extract the tool call from the last message (or the one before if the last is a tool message)
     # The agent should have called the tool.
     # We need to find the tool call in the messages.
@@ -65,10 +105,38 @@ def router_node(state: AgentState):
     if tool_call and tool_call["name"] == "submit_routing_instructions":
         args = tool_call["args"]
         return {
-            "tickers": args.get("tickers", []),
+            # Names are mapped to tickers and malformed symbols dropped before they reach yfinance
+            "tickers": validate_tickers(args.get("tickers", [])),
             "data_analyst_instructions": args.get("data_analyst_instructions", ""),
-            "news_analyst_instructions": args.get("news_analyst_instructions", "")
+            "news_analyst_instructions": args.get("news_analyst_instructions", ""),
+            "screen_filters": args.get("screen_filters") or None,
+            "screen_sort": args.get("screen_sort") or None,
         }
     
     # Fallback if no tool call (shouldn't happen with good LLM)
     return {"tickers": [], "data_analyst_instructions": state["query"], "news_analyst_instructions": state["query"]}
+
+def router_node(state: AgentState):
+    """
+    Router agent that extracts tickers and generates specific instructions for analysts.
+    """
+    routing = fast_route(state["query"])
+    if routing is not None:
+        return routing
+
+    agent = get_agent("router", _build_agent)
+    
+    # Invoke the agent
+    result = agent.invoke({"messages": [("human", state["query"])]})
+    return _parse_routing(result, state)
+
+async def arouter_node(state: AgentState):
+    """
+    Async variant of `router_node`.
+    """
+    routing = fast_route(state["query"])
+    if routing is not None:
+        return routing
+    agent = get_agent("router", _build_agent)
+    result = await agent.ainvoke({"messages": [("human", state["query"])]})
+    return _parse_routing(result, state)
@@ -0,0 +1,27 @@
+import logging
+import os
+from ..state import AgentState
+from ..tools.screener import run_screen
+from ..tools.pool import run_in_tool_pool
+
+logger = logging.getLogger(__name__)
+
+def screener_node(state: AgentState):
+    """
+    Runs the Router's screen over the configured universe and hands the top matches to
+    the analysts as tickers (no LLM involved). Used for open-ended queries that name no stocks.
+    """
+    max_tickers = int(os.getenv("SCREENER_MAX_TICKERS", "5"))
+    try:
+        tickers, table = run_screen(state.get("screen_filters") or "", state.get("screen_sort") or "", limit=max(max_tickers, 10))
+    except (ValueError, LookupError) as e:
+        logger.warning("Screener failed: %s", e)
+        return {"screen_results": f"Screen failed: {e}"}
+    merged = list(dict.fromkeys([*(state.get("tickers") or []), *tickers[:max_tickers]]))
+    return {"tickers": merged, "screen_results": table}
+
+async def ascreener_node(state: AgentState):
+    """
+    Async variant of `screener_node`; the (memory-mapped) screen runs on the tool pool.
+    """
+    return await run_in_tool_pool(screener_node, state)
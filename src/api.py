@@ -1,34 +1,192 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from src.graph import create_graph
+from src.graph import get_graph, initial_state
+from src.jobs import JobManager, JobQueueFull, JobStore
+from src.llm_cache import close_llm_cache, get_llm_cache, llm_cache_nodes
+from src.report_cache import ReportCache
+from src.singleflight import SingleFlight
+from src.tools.cassette import get_cassette
+from src.tools.news_index import close_news_index, get_news_index
+from src.tools.pool import shutdown_tool_executor
+from src.tools.run_scope import run_scope
+from src import tracing
+from src.telemetry import render_metrics
+from src.tools.upstream import close_upstreams, upstream_stats
+from src.utils import aclose_client_caches, normalize_query
 
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(), format="%(levelname)s %(name)s: %(message)s")
 
-app = FastAPI(title="Investment Agent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile the graph once at startup; LLM clients are memoized lazily on first use
+    get_graph()
+    store = JobStore()
+    app.state.report_cache = ReportCache()
+    app.state.jobs = JobManager(store, get_graph, cache=app.state.report_cache)
+    app.state.streams = SingleFlight()
+    await app.state.jobs.start()
+    yield
+    await app.state.jobs.stop()
+    store.close()
+    app.state.report_cache.close()
+    await aclose_client_caches()
+    close_llm_cache()
+    close_news_index()
+    close_upstreams()
+    tracing.close_trace_exporter()
+    shutdown_tool_executor()
+
+app = FastAPI(title="Investment Agent API", lifespan=lifespan)
 
 class ResearchRequest(BaseModel):
     query: str
+    # Report cache control: skip the lookup entirely, or only accept entries younger than max_age seconds
+    bypass_cache: bool = False
+    max_age: Optional[int] = Field(default=None, ge=0)
+
+# Nodes whose completion is reported on /research/stream, and the node whose LLM tokens are forwarded
+STREAMED_NODES = (
+    "router", "screener", "prefetch", "data_analyst", "news_analyst", "ticker_data_analyst",
+    "ticker_news_analyst", "quant_metrics", "merge_analyses", "risk_manager", "editor",
+)
+TOKEN_NODE = "editor"
+
+def _sse(event: str, data) -> str:
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
 
-@app.post("/research")
-async def research(request: ResearchRequest):
+def _chunk_text(content) -> str:
+    # Gemini returns content as a list of parts, OpenAI as a plain string
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(c.get("text", "") for c in content if isinstance(c, dict) and c.get("type") == "text")
+    return ""
+
+@app.post("/research", status_code=202)
+async def research(request: ResearchRequest, http_request: Request):
+    """
+    Enqueues a research run and returns its job id immediately; poll `GET /jobs/{job_id}`.
+    A `traceparent` (or `X-Trace-Id`) header makes the run part of the caller's trace.
+    """
+    trace_id, parent_span_id = tracing.parse_trace_headers(http_request.headers)
     try:
-        graph = create_graph()
-        # Initialize state with just the query, other fields will be populated by agents
-        initial_state = {
-            "query": request.query,
-            "tickers": [],
-            "data_analysis": None,
-            "news_analysis": None,
-            "risk_assessment": None,
-            "final_report": None
-        }
-        result = graph.invoke(initial_state)
-        return result
+        job = http_request.app.state.jobs.submit(
+            request.query, bypass_cache=request.bypass_cache, max_age=request.max_age,
+            trace_id=trace_id, parent_span_id=parent_span_id,
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "coalesced": job["coalesced"],
+        "cached": job["cached"],
+        "trace_id": job["trace_id"],
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, http_request: Request):
+    job = http_request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+async def _cached_events(query: str, state):
+    yield _sse("start", {"query": query})
+    yield _sse("final", state)
+
+async def _research_events(query: str, jobs: JobManager, cache: ReportCache, trace_id=None, parent_span_id=None):
+    """
+    Runs the graph and yields SSE frames: a `node` event as each top-level node completes,
+    `token` events for the editor's output as it is generated, then `final` (or `error`).
+    """
+    graph = get_graph()
+    state = initial_state(query)
+    trace_id = trace_id or tracing.new_trace_id()
+    # Flush a first frame immediately so clients and proxies see the stream open
+    yield _sse("start", {"query": query, "trace_id": trace_id})
+    try:
+        # Share the worker run slots so streamed runs count against the same concurrency cap
+        async with jobs.slot():
+            with run_scope(), tracing.trace("research", trace_id, parent_span_id, query=query):
+                # subgraphs=True is required to see the token stream of the agent running inside a node
+                async for namespace, mode, chunk in graph.astream(
+                    state, stream_mode=["updates", "values", "messages"], subgraphs=True
+                ):
+                    if mode == "values" and not namespace:
+                        # The full state after each step, merged by the state reducers
+                        state = dict(chunk)
+                    elif mode == "updates" and not namespace:
+                        for node, update in chunk.items():
+                            if node in STREAMED_NODES:
+                                yield _sse("node", {"node": node, "update": update})
+                    elif mode == "messages" and namespace:
+                        node = namespace[0].split(":", 1)[0]
+                        message, _metadata = chunk
+                        text = _chunk_text(getattr(message, "content", ""))
+                        if node == TOKEN_NODE and text:
+                            yield _sse("token", {"node": node, "content": text})
+        cache.store(state)
+        yield _sse("final", state)
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+        yield _sse("error", {"detail": str(e)})
+
+@app.post("/research/stream")
+async def research_stream(request: ResearchRequest, http_request: Request):
+    jobs = http_request.app.state.jobs
+    cache = http_request.app.state.report_cache
+    cached = None if request.bypass_cache else cache.lookup(request.query, max_age=request.max_age)
+    if cached is not None:
+        events = _cached_events(request.query, cached)
+    else:
+        # Identical concurrent queries attach to one in-flight run and receive the same events
+        trace_id, parent_span_id = tracing.parse_trace_headers(http_request.headers)
+        events = http_request.app.state.streams.stream(
+            normalize_query(request.query),
+            lambda: _research_events(request.query, jobs, cache, trace_id, parent_span_id),
+        )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/stats")
+async def stats(http_request: Request):
+    jobs = http_request.app.state.jobs
+    streams = http_request.app.state.streams
+    return {
+        "coalesced_requests": jobs.coalesced + streams.coalesced,
+        "coalesced_jobs": jobs.coalesced,
+        "coalesced_streams": streams.coalesced,
+        "streams_in_flight": streams.in_flight(),
+        "report_cache": http_request.app.state.report_cache.stats(),
+        "news_index": get_news_index().stats(),
+        "upstreams": upstream_stats(),
+        "market_data": get_cassette().stats(),
+        # Only present when some nodes opt into LLM response caching (LLM_CACHE_NODES)
+        **({"llm_cache": get_llm_cache().stats()} if llm_cache_nodes() else {}),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: node, tool and run latency histograms, LLM calls/tokens/cost per node
+    and model, upstream requests and errors.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/health")
 async def health():
@@ -0,0 +1,160 @@
+import os
+import re
+import threading
+
+# Token budgets for the upstream analyses forwarded to each downstream node (0 disables compaction)
+DEFAULT_BUDGETS = {"risk_manager": 6000, "editor": 8000}
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    # tiktoken downloads its BPE files on first use; offline we fall back to an estimate
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(os.getenv("TOKEN_ENCODING", "o200k_base"))
+            except Exception:
+                _encoding = False
+    return _encoding
+
+def count_tokens(text) -> int:
+    """
+    Token count of `text` with tiktoken when available, otherwise an estimate
+    (~4 ASCII characters per token, one token per CJK/other character).
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def token_budget(node):
+    """
+    Budget for `node` from <NODE>_TOKEN_BUDGET (e.g. EDITOR_TOKEN_BUDGET), or the default.
+    """
+    value = os.getenv(f"{node.upper()}_TOKEN_BUDGET")
+    return int(value) if value is not None else DEFAULT_BUDGETS.get(node, 0)
+
+# Blocks that always survive compaction: headings, tables, links, scores/ratings, key numbers
+HEADING = re.compile(r"^\s*(#{1,6}\s|\*\*[^*]+\*\*\s*[:：]?\s*$|[-*]?\s*\*\*[^*]+\*\*\s*[:：])")
+LINK = re.compile(r"\[[^\]]+\]\(https?://[^)]+\)|https?://\S+")
+SCORE = re.compile(r"(評分|分數|score|rating|目標價|target|\b(BUY|HOLD|SELL)\b|\d+(\.\d+)?\s*/\s*10)", re.IGNORECASE)
+NUMBER = re.compile(r"[-+]?\$?\d[\d,]*(\.\d+)?\s*(%|[KMBT]\b|x\b|倍)?")
+SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s*")
+
+def _is_key_line(line):
+    stripped = line.strip()
+    return (
+        stripped.startswith("|")
+        or bool(HEADING.match(line))
+        or bool(LINK.search(line))
+        or bool(SCORE.search(line))
+    )
+
+def _density(text):
+    # Numbers per 100 characters: prose with few figures is the first to go
+    return len(NUMBER.findall(text)) * 100 / max(len(text), 1)
+
+def _first_sentence(text):
+    parts = [p for p in SENTENCE_END.split(text.strip()) if p]
+    return parts[0] if parts else text
+
+def compact(text, budget):
+    """
+    Shrinks Markdown `text` to roughly `budget` tokens.
+
+    Headings, tables, links and lines with scores/ratings are kept verbatim. Repeated
+    lines are dropped first, then prose paragraphs are cut to their first sentence and
+    finally removed, starting with the ones carrying the fewest figures.
+    """
+    if not text or budget <= 0 or count_tokens(text) <= budget:
+        return text
+
+    # Blocks: (kind, text); key blocks are single lines, prose blocks are paragraphs
+    blocks, seen, paragraph = [], set(), []
+    def flush():
+        if paragraph:
+            blocks.append(["prose", " ".join(paragraph)])
+            paragraph.clear()
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            flush()
+            continue
+        if stripped in seen and not stripped.startswith("|"):
+            continue
+        seen.add(stripped)
+        if _is_key_line(line):
+            flush()
+            blocks.append(["key", line.rstrip()])
+        else:
+            paragraph.append(stripped)
+    flush()
+
+    def render():
+        out, previous = [], None
+        for kind, body in blocks:
+            if body is None:
+                continue
+            # Table rows stay on consecutive lines; everything else is separated by a blank line
+            if out and not (previous == "table" and body.lstrip().startswith("|")):
+                out.append("")
+            out.append(body)
+            previous = "table" if body.lstrip().startswith("|") else kind
+        return "\n".join(out)
+
+    prose = sorted((i for i, (kind, _) in enumerate(blocks) if kind == "prose"), key=lambda i: _density(blocks[i][1]))
+    for shorten in (True, False):
+        for i in prose:
+            if count_tokens(render()) <= budget:
+                return render()
+            blocks[i][1] = _first_sentence(blocks[i][1]) if shorten and blocks[i][1] else None
+    result = render()
+    if count_tokens(result) <= budget:
+        return result
+
+    # Key content alone is over budget: keep the leading part
+    lines, kept = result.splitlines(), []
+    for line in lines:
+        if count_tokens("\n".join(kept + [line])) > budget:
+            break
+        kept.append(line)
+    return "\n".join(kept + ["[... truncated to fit the token budget]"])
+
+def compact_sections(node, sections):
+    """
+    Fits the upstream `sections` ({name: text}) forwarded to `node` into its token budget.
+
+    Sections smaller than an equal share are kept verbatim and the remaining budget is split
+    among the larger ones. Returns (compacted sections, {"tokens_in", "tokens_out", "budget"}).
+    """
+    budget = token_budget(node)
+    sizes = {name: count_tokens(text) for name, text in sections.items()}
+    tokens_in = sum(sizes.values())
+    if budget <= 0 or tokens_in <= budget:
+        return dict(sections), {"tokens_in": tokens_in, "tokens_out": tokens_in, "budget": budget}
+
+    allocation, remaining, pending = {}, budget, sorted(sizes, key=sizes.get)
+    while pending:
+        share = remaining // len(pending)
+        name = pending[0]
+        if sizes[name] <= share:
+            allocation[name] = sizes[name]
+            remaining -= sizes[name]
+            pending.pop(0)
+        else:
+            for name in pending:
+                allocation[name] = share
+            break
+
+    compacted = {
+        name: text if allocation[name] >= sizes[name] else compact(text, allocation[name])
+        for name, text in sections.items()
+    }
+    tokens_out = sum(count_tokens(text) for text in compacted.values())
+    return compacted, {"tokens_in": tokens_in, "tokens_out": tokens_out, "budget": budget}
@@ -1,37 +1,137 @@
+import os
+from functools import lru_cache
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from .state import AgentState
-from .agents.router import router_node
-from .agents.data_analyst import data_analyst_node
-from .agents.news_analyst import news_analyst_node
-from .agents.risk_manager import risk_manager_node
-from .agents.editor import editor_node
+from . import tracing
+from .telemetry import current_run_timings, node_span
+from .tools.run_scope import upstream_calls
+from .agents.router import router_node, arouter_node
+from .agents.data_analyst import data_analyst_node, adata_analyst_node
+from .agents.news_analyst import news_analyst_node, anews_analyst_node
+from .agents.screener import screener_node, ascreener_node
+from .agents.prefetch import prefetch_node, aprefetch_node
+from .agents.fanout import (
+    dispatch_per_ticker,
+    ticker_data_analyst_node, aticker_data_analyst_node,
+    ticker_news_analyst_node, aticker_news_analyst_node,
+    merge_analyses_node, amerge_analyses_node,
+)
+from .agents.quant_metrics import quant_metrics_node, aquant_metrics_node
+from .agents.risk_manager import risk_manager_node, arisk_manager_node
+from .agents.editor import editor_node, aeditor_node
 
-def create_graph():
+def _with_run_stats(update):
+    # Inside a run scope every node update carries the run's upstream request counts and
+    # per-node timings so far
+    calls = upstream_calls()
+    if calls is not None and isinstance(update, dict):
+        return {**update, "upstream_calls": calls, "timings": current_run_timings()}
+    return update
+
+def _node(name, func, afunc):
+    # Pairs the sync and async implementations so the same compiled graph
+    # supports both `invoke` (CLI) and `ainvoke` (API event loop)
+    def sync_node(state):
+        with node_span(name), tracing.span(name, "node"):
+            update = func(state)
+        return _with_run_stats(update)
+
+    async def async_node(state):
+        with node_span(name), tracing.span(name, "node"):
+            update = await afunc(state)
+        return _with_run_stats(update)
+
+    return RunnableLambda(sync_node, afunc=async_node, name=name)
+
+# Nodes that run in parallel once the tickers are known
+ANALYSTS = ["data_analyst", "news_analyst", "quant_metrics"]
+
+# "react": analysts fetch their data through tool calls.
+# "prefetch": a prefetch node fetches stock data and ticker news for all tickers up front
+# and the analysts get it in their prompt (only `web_search` remains a tool).
+# "fanout": one data-analyst and one news-analyst task per ticker run in parallel (`Send`)
+# and a merge node joins their results before the Risk Manager.
+GRAPH_MODES = ("react", "prefetch", "fanout")
+
+def graph_mode():
+    mode = os.getenv("GRAPH_MODE", "react").lower()
+    if mode not in GRAPH_MODES:
+        raise ValueError(f"Unsupported GRAPH_MODE: {mode}")
+    return mode
+
+def _after_router(next_nodes):
+    def route(state: AgentState):
+        # Open-ended queries ("cheapest semis with >20% growth") are screened first,
+        # which fills in the tickers for the analysts
+        if state.get("screen_filters"):
+            return "screener"
+        return next_nodes(state) if callable(next_nodes) else next_nodes
+    return route
+
+def initial_state(query: str):
+    """
+    Initial graph state for a query; the other fields are populated by the agents.
+    """
+    return {
+        "query": query,
+        "tickers": [],
+        "screen_results": None,
+        "data_analysis": None,
+        "news_analysis": None,
+        "risk_metrics": None,
+        "risk_assessment": None,
+        "final_report": None
+    }
+
+def create_graph(mode=None):
     """
     Creates the Multi-Agent Investment Research Graph.
+    `mode` is one of `GRAPH_MODES` and defaults to the GRAPH_MODE environment variable.
     """
+    mode = mode or graph_mode()
     workflow = StateGraph(AgentState)
 
     # Add nodes
-    workflow.add_node("router", router_node)
-    workflow.add_node("data_analyst", data_analyst_node)
-    workflow.add_node("news_analyst", news_analyst_node)
-    workflow.add_node("risk_manager", risk_manager_node)
-    workflow.add_node("editor", editor_node)
+    workflow.add_node("router", _node("router", router_node, arouter_node))
+    workflow.add_node("screener", _node("screener", screener_node, ascreener_node))
+    workflow.add_node("quant_metrics", _node("quant_metrics", quant_metrics_node, aquant_metrics_node))
+    workflow.add_node("risk_manager", _node("risk_manager", risk_manager_node, arisk_manager_node))
+    workflow.add_node("editor", _node("editor", editor_node, aeditor_node))
 
     # Set entry point
     workflow.set_entry_point("router")
 
     # Add edges
-    # Router -> Data Analyst AND News Analyst (Parallel)
-    workflow.add_edge("router", "data_analyst")
-    workflow.add_edge("router", "news_analyst")
+    if mode == "fanout":
+        # Router (-> Screener) -> one Data Analyst and one News Analyst task per ticker (Send)
+        # AND Quant Metrics -> Merge Analyses -> Risk Manager
+        workflow.add_node("ticker_data_analyst", _node("ticker_data_analyst", ticker_data_analyst_node, aticker_data_analyst_node))
+        workflow.add_node("ticker_news_analyst", _node("ticker_news_analyst", ticker_news_analyst_node, aticker_news_analyst_node))
+        workflow.add_node("merge_analyses", _node("merge_analyses", merge_analyses_node, amerge_analyses_node))
+        targets = ["ticker_data_analyst", "ticker_news_analyst", "quant_metrics"]
+        workflow.add_conditional_edges("router", _after_router(dispatch_per_ticker), ["screener", *targets])
+        workflow.add_conditional_edges("screener", dispatch_per_ticker, targets)
+        workflow.add_edge(targets, "merge_analyses")
+        workflow.add_edge("merge_analyses", "risk_manager")
+    else:
+        # Router (-> Screener) -> Data Analyst AND News Analyst AND Quant Metrics (Parallel)
+        # In prefetch mode the analysts run after the Prefetch node instead
+        workflow.add_node("data_analyst", _node("data_analyst", data_analyst_node, adata_analyst_node))
+        workflow.add_node("news_analyst", _node("news_analyst", news_analyst_node, anews_analyst_node))
+        if mode == "prefetch":
+            workflow.add_node("prefetch", _node("prefetch", prefetch_node, aprefetch_node))
+            workflow.add_edge("prefetch", "data_analyst")
+            workflow.add_edge("prefetch", "news_analyst")
+            after_tickers = ["prefetch", "quant_metrics"]
+        else:
+            after_tickers = ANALYSTS
+        workflow.add_conditional_edges("router", _after_router(after_tickers), ["screener", *after_tickers])
+        for node in after_tickers:
+            workflow.add_edge("screener", node)
 
-    # Data Analyst -> Risk Manager
-    workflow.add_edge("data_analyst", "risk_manager")
-    
-    # News Analyst -> Risk Manager
-    workflow.add_edge("news_analyst", "risk_manager")
+        # Data Analyst AND News Analyst AND Quant Metrics -> Risk Manager (waits for all three)
+        workflow.add_edge(ANALYSTS, "risk_manager")
 
     # Risk Manager -> Editor
     workflow.add_edge("risk_manager", "editor")
@@ -40,3 +140,14 @@ def create_graph():
     workflow.add_edge("editor", END)
 
     return workflow.compile()
+
+@lru_cache(maxsize=None)
+def _compiled_graph(mode):
+    return create_graph(mode)
+
+def get_graph(mode=None):
+    """
+    Returns the process-wide compiled graph for `mode` (default GRAPH_MODE), compiling it on first use.
+    Nodes fetch their (memoized) agents at run time, so the compiled graph can be shared by all requests.
+    """
+    return _compiled_graph(mode or graph_mode())
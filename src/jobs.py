@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import asynccontextmanager
+from . import tracing
+from .graph import initial_state
+from .tools.run_scope import run_scope
+from .utils import get_data_dir, normalize_query
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+class JobQueueFull(Exception):
+    """
+    Raised when the research queue is at capacity; callers should retry later.
+    """
+
+class JobStore:
+    """
+    SQLite persistence for research jobs, so queued work survives a worker restart.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("JOBS_DB_PATH") or os.path.join(get_data_dir(), "jobs.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    state TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def create(self, query):
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, query, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, query, QUEUED, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "query": row["query"],
+            "status": row["status"],
+            "state": json.loads(row["state"]) if row["state"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def update(self, job_id, status, state=None, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, state = COALESCE(?, state), error = ?, updated_at = ? WHERE id = ?",
+                (
+                    status,
+                    json.dumps(state, ensure_ascii=False, default=str) if state is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def unfinished(self):
+        """
+        Returns ids of queued or interrupted jobs, oldest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JobManager:
+    """
+    Runs research jobs on a fixed number of async workers.
+
+    `submit` only enqueues; once RESEARCH_QUEUE_SIZE jobs are waiting it raises
+    `JobQueueFull` instead of accepting unbounded work. A submission whose normalized
+    query matches a job that is still queued or running is attached to that job
+    instead of starting another run. With a `cache`, a fresh cached report completes
+    the job immediately and finished runs are written back. Partial state is persisted
+    after every node so `GET /jobs/{id}` can report progress.
+    """
+
+    def __init__(self, store, graph_factory, workers=None, queue_size=None, cache=None):
+        self.store = store
+        self.cache = cache
+        self.graph_factory = graph_factory
+        self.workers = workers or int(os.getenv("RESEARCH_WORKERS", "2"))
+        self.queue_size = queue_size or int(os.getenv("RESEARCH_QUEUE_SIZE", "50"))
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._tasks = []
+        # normalized query -> id of the queued/running job serving it
+        self._inflight = {}
+        # job id -> (trace id, parent span id) of the request that submitted it
+        self._traces = {}
+        self.coalesced = 0
+
+    async def start(self):
+        # Requeue jobs that were waiting, or were interrupted mid-run, when the process stopped
+        for job_id in self.store.unfinished():
+            self.store.update(job_id, QUEUED)
+            self._inflight[normalize_query(self.store.get(job_id)["query"])] = job_id
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, query, bypass_cache=False, max_age=None, trace_id=None, parent_span_id=None):
+        """
+        Enqueues a query, or attaches to the in-flight job for the same normalized query.
+        The returned job has `coalesced` set when it was attached and `cached` when it
+        was answered from the report cache, and the `trace_id` its run is traced under
+        (`trace_id` / `parent_span_id` continue the caller's trace).
+        """
+        if self.cache is not None and not bypass_cache:
+            cached = self.cache.lookup(query, max_age=max_age)
+            if cached is not None:
+                job = self.store.create(query)
+                self.store.update(job["job_id"], COMPLETED, cached)
+                return {**self.store.get(job["job_id"]), "coalesced": False, "cached": True, "trace_id": None}
+
+        key = normalize_query(query)
+        job_id = self._inflight.get(key)
+        if job_id is not None:
+            job = self.store.get(job_id)
+            if job is not None and job["status"] in (QUEUED, RUNNING):
+                self.coalesced += 1
+                return {**job, "coalesced": True, "cached": False, "trace_id": self._traces.get(job_id, (None,))[0]}
+
+        if self._queue.qsize() >= self.queue_size:
+            raise JobQueueFull(f"Research queue is full ({self.queue_size} jobs waiting)")
+        job = self.store.create(query)
+        self._inflight[key] = job["job_id"]
+        self._traces[job["job_id"]] = (trace_id or tracing.new_trace_id(), parent_span_id)
+        self._queue.put_nowait(job["job_id"])
+        return {**job, "coalesced": False, "cached": False, "trace_id": self._traces[job["job_id"]][0]}
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Holds one of the `workers` run slots; shared with streaming runs so the cap covers both.
+        """
+        async with self._slots:
+            yield
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                async with self.slot():
+                    await self._run(job_id)
+            finally:
+                self._release(job_id)
+                self._queue.task_done()
+
+    def _release(self, job_id):
+        self._traces.pop(job_id, None)
+        for key, inflight_id in list(self._inflight.items()):
+            if inflight_id == job_id:
+                del self._inflight[key]
+
+    async def _run(self, job_id):
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in (QUEUED, RUNNING):
+            return
+        state = initial_state(job["query"])
+        self.store.update(job_id, RUNNING, state)
+        # Jobs requeued after a restart start a new trace
+        trace_id, parent_span_id = self._traces.get(job_id, (None, None))
+        try:
+            with run_scope(), tracing.trace("research", trace_id, parent_span_id, query=job["query"], job_id=job_id):
+                # Each "values" chunk is the full state after a step, merged by the state reducers
+                async for chunk in self.graph_factory().astream(state, stream_mode="values"):
+                    state = dict(chunk)
+                    self.store.update(job_id, RUNNING, state)
+            self.store.update(job_id, COMPLETED, state)
+            if self.cache is not None:
+                self.cache.store(state)
+        except asyncio.CancelledError:
+            # Leave the job RUNNING so it is requeued on the next start
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            self.store.update(job_id, FAILED, state, error=str(e))
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from .telemetry import CACHED_GENERATION
+from .utils import get_data_dir
+
+def llm_cache_nodes():
+    """
+    Nodes whose LLM responses are cached, from LLM_CACHE_NODES (comma-separated, "*" for all).
+    Empty by default: caching is opt-in.
+    """
+    return {node.strip() for node in os.getenv("LLM_CACHE_NODES", "").split(",") if node.strip()}
+
+def llm_cache_enabled(node):
+    nodes = llm_cache_nodes()
+    return bool(node) and ("*" in nodes or node in nodes)
+
+class SQLiteLLMCache:
+    """
+    Exact-match, persistent cache of chat model responses.
+
+    Entries are keyed by a SHA-256 of LangChain's serialized prompt (messages) and
+    llm_string (provider class, model, temperature and bound tools, among other
+    invocation parameters). The total stored size is bounded by LLM_CACHE_MAX_MB;
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path or os.getenv("LLM_CACHE_PATH") or os.path.join(get_data_dir(), "llm_cache.sqlite3")
+        self.max_bytes = max_bytes or int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.stats_by_node = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    node TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (last_access)")
+
+    @staticmethod
+    def key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def view(self, node):
+        """
+        Returns the `BaseCache` a chat model for `node` is constructed with.
+        """
+        return _NodeCache(self, node)
+
+    def _count(self, node, hit):
+        counts = self.stats_by_node.setdefault(node, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    def lookup(self, node, prompt, llm_string):
+        key = self.key(prompt, llm_string)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._count(node, row is not None)
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        try:
+            generations = loads(row[0], allowed_objects="core")
+        except Exception:
+            return None
+        # Marked so usage accounting does not count the cached tokens and cost again
+        for generation in generations if isinstance(generations, list) else []:
+            if isinstance(generation, Generation):
+                generation.generation_info = {**(generation.generation_info or {}), CACHED_GENERATION: True}
+        return generations
+
+    def update(self, node, prompt, llm_string, return_val):
+        value = dumps(return_val)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (self.key(prompt, llm_string), node, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        # Drop least-recently-used entries beyond the size budget
+        self._conn.execute(
+            """DELETE FROM llm_cache WHERE key IN (
+                   SELECT key FROM (
+                       SELECT key, SUM(size) OVER (ORDER BY last_access DESC, created_at DESC) AS total
+                       FROM llm_cache
+                   ) WHERE total > ?
+               )""",
+            (self.max_bytes,),
+        )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            nodes = {node: dict(counts) for node, counts in self.stats_by_node.items()}
+        hits = sum(c["hits"] for c in nodes.values())
+        misses = sum(c["misses"] for c in nodes.values())
+        for counts in nodes.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / lookups, 4) if lookups else 0.0
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "nodes": nodes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class _NodeCache(BaseCache):
+    # LangChain-facing adapter that attributes lookups to one graph node
+    def __init__(self, store, node):
+        self.store = store
+        self.node = node
+
+    def lookup(self, prompt, llm_string):
+        return self.store.lookup(self.node, prompt, llm_string)
+
+    def update(self, prompt, llm_string, return_val):
+        self.store.update(self.node, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs):
+        self.store.clear()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """
+    Returns the process-wide LLM response cache, opening it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteLLMCache()
+    return _cache
+
+def close_llm_cache():
+    global _cache
+    with _cache_lock:
+        cache, _cache = _cache, None
+    if cache is not None:
+        cache.close()
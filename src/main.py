@@ -1,3 +1,4 @@
+import logging
 import sys
 import os
 
@@ -6,9 +7,25 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dotenv import load_dotenv
 from src.graph import create_graph
+from src.tools.run_scope import run_scope
+from src.tracing import trace
 
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(), format="%(levelname)s %(name)s: %(message)s")
+
+def print_timings(timings):
+    """
+    Per-node breakdown of where the run spent its time, LLM tokens and cost.
+    """
+    if not timings:
+        return
+    print(f"\n{'node':<22} {'seconds':>8} {'llm':>4} {'prompt':>8} {'compl.':>7} {'cost $':>8} {'tools':>5} {'tool s':>7} {'errors':>6}")
+    for node, t in sorted(timings.items(), key=lambda item: (item[0] == "run", -item[1]["seconds"])):
+        print(
+            f"{node:<22} {t['seconds']:>8.2f} {t['llm_calls']:>4.0f} {t['prompt_tokens']:>8.0f} {t['completion_tokens']:>7.0f}"
+            f" {t['cost_usd']:>8.4f} {t['tool_calls']:>5.0f} {t['tool_seconds']:>7.2f} {t['errors']:>6.0f}"
+        )
 
 def main():
     """
@@ -57,7 +74,8 @@ def main():
     # Run the graph
     # We can stream events to show progress if desired, but for now let's just invoke
     try:
-        final_state = graph.invoke(initial_state)
+        with run_scope(), trace("research", query=query) as root:
+            final_state = graph.invoke(initial_state)
         
         print("\n" + "="*60)
         print("FINAL REPORT")
@@ -65,6 +83,12 @@ def main():
         
         print(final_state["final_report"])
         
+        print(f"\nUpstream requests: {final_state.get('upstream_calls') or {}}")
+        for node, stats in (final_state.get("context_tokens") or {}).items():
+            print(f"\n[{node}] context tokens: {stats['tokens_in']} -> {stats['tokens_out']} (budget {stats['budget']})")
+        print_timings(final_state.get("timings") or {})
+        print(f"\nTrace id: {root.trace_id}")
+        
         print("\n" + "="*60)
         print("Research Complete.")
         
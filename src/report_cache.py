@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
+from .utils import get_data_dir, normalize_query
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dt_time(9, 30)
+
+def trading_session_date(now=None) -> str:
+    """
+    Returns the date of the most recent (US) trading session that has opened, as YYYY-MM-DD.
+    Before the open and on weekends this is the previous weekday, so a report cached on
+    Friday afternoon is still valid on Saturday. Exchange holidays are not modelled.
+    """
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    day = now.date()
+    if now.time() < MARKET_OPEN:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+def report_key(query, tickers, session_date) -> str:
+    raw = json.dumps([normalize_query(query), sorted(t.upper() for t in tickers or []), session_date])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class ReportCache:
+    """
+    SQLite cache of final research states with TTL expiry and LRU eviction.
+
+    Entries are keyed by (normalized query, router-extracted tickers, trading-session date).
+    Lookups happen before the router runs, so they match on (normalized query, session
+    date) and return the freshest entry; its tickers are the router's output for that
+    query in that session.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or os.getenv("REPORT_CACHE_PATH") or os.path.join(get_data_dir(), "report_cache.sqlite3")
+        self.ttl = ttl if ttl is not None else int(os.getenv("REPORT_CACHE_TTL", str(6 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "500"))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS reports (
+                    key TEXT PRIMARY KEY,
+                    query_key TEXT NOT NULL,
+                    tickers TEXT NOT NULL,
+                    session_date TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS reports_lookup ON reports (query_key, session_date, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS reports_lru ON reports (last_access)")
+
+    def lookup(self, query, max_age=None, session_date=None):
+        """
+        Returns the cached final state for `query`, or None.
+        `max_age` (seconds) can only tighten the configured TTL.
+        """
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        session_date = session_date or trading_session_date()
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                """SELECT key, state, created_at FROM reports
+                   WHERE query_key = ? AND session_date = ? AND created_at >= ?
+                   ORDER BY created_at DESC LIMIT 1""",
+                (normalize_query(query), session_date, now - max_age),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE reports SET last_access = ? WHERE key = ?", (now, row[0]))
+            self.hits += 1
+        state = json.loads(row[1])
+        state["cache"] = {"hit": True, "age_seconds": round(now - row[2], 3), "session_date": session_date}
+        return state
+
+    def store(self, state, session_date=None):
+        """
+        Caches a completed final state; runs without a final report are ignored.
+        """
+        if not state.get("final_report"):
+            return
+        session_date = session_date or trading_session_date()
+        tickers = state.get("tickers") or []
+        state = {k: v for k, v in state.items() if k != "cache"}
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    report_key(state["query"], tickers, session_date),
+                    normalize_query(state["query"]),
+                    json.dumps(sorted(tickers)),
+                    session_date,
+                    json.dumps(state, ensure_ascii=False, default=str),
+                    now,
+                    now,
+                ),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM reports WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            """DELETE FROM reports WHERE key IN (
+                   SELECT key FROM reports ORDER BY last_access DESC LIMIT -1 OFFSET ?
+               )""",
+            (self.max_entries,),
+        )
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,66 @@
+import asyncio
+import traceback
+
+class _Flight:
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.cond = asyncio.Condition()
+        self.task = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent async streams with the same key.
+
+    The first caller for a key starts the source; callers that arrive while it is
+    still running attach to it instead of starting their own, and receive every
+    item from the beginning (buffered) followed by the live ones.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def stream(self, key, source_factory):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._pump(key, flight, source_factory()))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return self._follow(flight)
+
+    def in_flight(self):
+        return len(self._flights)
+
+    async def _pump(self, key, flight, source):
+        try:
+            async for item in source:
+                async with flight.cond:
+                    flight.items.append(item)
+                    flight.cond.notify_all()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            # The flight keeps running even if every follower disconnects, so the result is not wasted
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    async def _follow(self, flight):
+        index = 0
+        while True:
+            async with flight.cond:
+                await flight.cond.wait_for(lambda: index < len(flight.items) or flight.done)
+                batch = flight.items[index:]
+                done = flight.done
+            for item in batch:
+                yield item
+            index += len(batch)
+            if done and index >= len(flight.items):
+                return
@@ -1,12 +1,47 @@
-from typing import TypedDict, List, Optional, Annotated
+from typing import TypedDict, List, Optional, Annotated, Dict
 import operator
 
+def merge_counts(left, right):
+    # Counters reported by parallel nodes are running totals: keep the highest value per key
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        merged[key] = max(merged.get(key, 0), value)
+    return merged
+
+def merge_timings(left, right):
+    # Per-node timings reported by parallel nodes are running totals of the run: keep the highest
+    merged = {node: dict(fields) for node, fields in (left or {}).items()}
+    for node, fields in (right or {}).items():
+        totals = merged.setdefault(node, {})
+        for key, value in fields.items():
+            totals[key] = max(totals.get(key, 0), value)
+    return merged
+
 class AgentState(TypedDict):
     query: str
     tickers: List[str]
     data_analyst_instructions: Optional[str]
     news_analyst_instructions: Optional[str]
+    # Set by the Router for open-ended queries, see src/tools/screener.py
+    screen_filters: Optional[str]
+    screen_sort: Optional[str]
+    screen_results: Optional[str]
+    # Prefetch graph mode only: tool output gathered before the analysts run
+    prefetched_data: Optional[str]
+    prefetched_news: Optional[str]
     data_analysis: Optional[str]
     news_analysis: Optional[str]
+    # Fan-out graph mode only: ticker -> analysis, merged across the parallel per-ticker tasks
+    ticker_data_analyses: Annotated[Dict[str, str], operator.or_]
+    ticker_news_analyses: Annotated[Dict[str, str], operator.or_]
+    # ticker -> metric name -> value, see src/tools/metrics.py
+    risk_metrics: Optional[Dict[str, Dict[str, Optional[float]]]]
     risk_assessment: Optional[str]
     final_report: Optional[str]
+    # node -> {"tokens_in", "tokens_out", "budget"} for the upstream context it was given, see src/compaction.py
+    context_tokens: Annotated[Dict[str, Dict[str, int]], operator.or_]
+    # Upstream requests (Yahoo Finance, DuckDuckGo) made so far in this run, see src/tools/run_scope.py
+    upstream_calls: Annotated[Dict[str, int], merge_counts]
+    # node -> wall time, LLM calls, tokens, cost, tool calls and errors so far in this run, plus a
+    # "run" total, see src/telemetry.py
+    timings: Annotated[Dict[str, Dict[str, float]], merge_timings]
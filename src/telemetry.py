@@ -0,0 +1,324 @@
+import bisect
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics for graph nodes, tools, LLM calls and upstream requests, rendered in the
+# text exposition format on the API's /metrics endpoint. Each graph run also collects the same
+# numbers per node (see `RunTimings`), returned in the final state as `timings`.
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(tuple(str(labels[name]) for name in self.labelnames), ([0], 0.0))
+            return sum(counts)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+REGISTRY = Registry()
+
+NODE_SECONDS = REGISTRY.histogram("research_node_duration_seconds", "Wall time of a graph node", ["node"])
+NODE_ERRORS = REGISTRY.counter("research_node_errors_total", "Graph node executions that raised", ["node"])
+TOOL_SECONDS = REGISTRY.histogram("research_tool_duration_seconds", "Wall time of a tool call", ["tool", "node"])
+TOOL_ERRORS = REGISTRY.counter("research_tool_errors_total", "Tool calls that raised or returned an error message", ["tool", "node"])
+LLM_CALLS = REGISTRY.counter("research_llm_calls_total", "LLM calls", ["node", "model"])
+LLM_TOKENS = REGISTRY.counter("research_llm_tokens_total", "LLM tokens by kind (prompt, completion)", ["node", "model", "kind"])
+LLM_COST = REGISTRY.counter("research_llm_cost_dollars_total", "Estimated LLM cost in USD", ["node", "model"])
+LLM_CACHE_HITS = REGISTRY.counter(
+    "research_llm_cache_hits_total", "LLM calls answered from the response cache (no tokens or cost)", ["node", "model"]
+)
+UPSTREAM_REQUESTS = REGISTRY.counter("research_upstream_requests_total", "Requests to upstream data services", ["upstream"])
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "research_upstream_errors_total", "Upstream request errors by outcome (retried, failed, rejected by the breaker)", ["host", "outcome"]
+)
+RUN_SECONDS = REGISTRY.histogram(
+    "research_run_duration_seconds", "Wall time of a research run", ["status"], buckets=(5, 10, 30, 60, 120, 180, 300, 600)
+)
+
+def render_metrics():
+    return REGISTRY.render()
+
+# USD per million (prompt, completion) tokens; models are matched by prefix (dated snapshots)
+MODEL_PRICES = {
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+def llm_cost(model, prompt_tokens, completion_tokens):
+    """
+    Estimated USD cost of one call. LLM_PRICE_INPUT_PER_MTOK / LLM_PRICE_OUTPUT_PER_MTOK
+    override the MODEL_PRICES entry; unknown models cost 0.
+    """
+    prices = next((MODEL_PRICES[name] for name in sorted(MODEL_PRICES, key=len, reverse=True) if (model or "").startswith(name)), (0.0, 0.0))
+    input_price = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK") or prices[0])
+    output_price = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK") or prices[1])
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+
+class RunTimings:
+    """
+    Per-node totals of one graph run: calls, wall time, LLM calls and cache hits, tokens and
+    cost, tool calls and time, upstream requests and errors. Parallel nodes add to it concurrently.
+    """
+
+    FIELDS = (
+        "calls", "seconds", "llm_calls", "llm_cache_hits", "prompt_tokens", "completion_tokens", "cost_usd",
+        "tool_calls", "tool_seconds", "upstream_calls", "errors",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._nodes = {}
+
+    def add(self, node, **fields):
+        with self._lock:
+            totals = self._nodes.setdefault(node or "other", dict.fromkeys(self.FIELDS, 0))
+            for name, value in fields.items():
+                totals[name] += value
+
+    def snapshot(self):
+        """
+        {node: totals} plus a "run" entry with the elapsed wall time and the sums over nodes.
+        """
+        with self._lock:
+            nodes = {node: dict(totals) for node, totals in self._nodes.items()}
+        run = {name: sum(totals[name] for totals in nodes.values()) for name in self.FIELDS if name not in ("calls", "seconds")}
+        run["seconds"] = time.perf_counter() - self.started
+        nodes["run"] = run
+        return {node: {name: round(value, 6 if name == "cost_usd" else 3) for name, value in totals.items()} for node, totals in nodes.items()}
+
+_run = contextvars.ContextVar("telemetry_run", default=None)
+_node = contextvars.ContextVar("telemetry_node", default=None)
+
+@contextlib.contextmanager
+def run_timings():
+    """
+    Collects `RunTimings` for the code inside (one graph run) and records its duration.
+    Entered by `run_scope()`.
+    """
+    timings = RunTimings()
+    token = _run.set(timings)
+    status = "ok"
+    try:
+        yield timings
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _run.reset(token)
+        RUN_SECONDS.observe(time.perf_counter() - timings.started, status=status)
+
+def current_run_timings():
+    timings = _run.get()
+    return timings.snapshot() if timings is not None else None
+
+def current_node():
+    return _node.get()
+
+def _add(**fields):
+    timings = _run.get()
+    if timings is not None:
+        timings.add(_node.get(), **fields)
+
+@contextlib.contextmanager
+def node_span(name):
+    """
+    Times a graph node; LLM calls, tool calls and upstream requests made inside are attributed to it.
+    """
+    token = _node.set(name)
+    started = time.perf_counter()
+    errors = 0
+    try:
+        yield
+    except BaseException:
+        errors = 1
+        NODE_ERRORS.inc(node=name)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        NODE_SECONDS.observe(seconds, node=name)
+        _add(calls=1, seconds=seconds, errors=errors)
+        _node.reset(token)
+
+def instrument_tool(name, func):
+    """
+    Wraps a tool body to record its wall time and errors. Data tools report failures as
+    "Error ..." strings rather than raising, so those count as errors too.
+    """
+    def wrapper(*args, **kwargs):
+        node = _node.get() or "other"
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = isinstance(result, str) and result.startswith("Error")
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            TOOL_SECONDS.observe(seconds, tool=name, node=node)
+            if failed:
+                TOOL_ERRORS.inc(tool=name, node=node)
+            _add(tool_calls=1, tool_seconds=seconds, errors=int(failed))
+
+    wrapper.__wrapped__ = func
+    return wrapper
+
+def record_upstream(name, count=1):
+    UPSTREAM_REQUESTS.inc(count, upstream=name)
+    _add(upstream_calls=count)
+
+def record_upstream_error(host, outcome):
+    UPSTREAM_ERRORS.inc(host=host, outcome=outcome)
+
+# generation_info flag set on generations served by the LLM response cache (src/llm_cache.py)
+CACHED_GENERATION = "llm_cache_hit"
+
+def is_cached_generation(generation):
+    return bool((getattr(generation, "generation_info", None) or {}).get(CACHED_GENERATION))
+
+def is_cached_response(response):
+    generations = [generation for generations in response.generations for generation in generations]
+    return bool(generations) and all(is_cached_generation(generation) for generation in generations)
+
+def _usage(response):
+    # Chat models report usage on the message; older integrations only in llm_output
+    prompt = completion = 0
+    model = (response.llm_output or {}).get("model_name")
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            model = model or (getattr(message, "response_metadata", None) or {}).get("model_name")
+            if is_cached_generation(generation):
+                # The tokens were paid for when the response was cached
+                continue
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not prompt and not completion:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return model, prompt, completion
+
+class LLMUsageHandler(BaseCallbackHandler):
+    """
+    Callback attached to every chat model: counts calls, tokens and estimated cost per node.
+    Responses served by the LLM response cache count as cache hits, without tokens or cost.
+    """
+
+    # Runs in the caller's context (also for async calls), where the current node is set
+    run_inline = True
+
+    def __init__(self, model=None):
+        self.model = model
+
+    def on_llm_end(self, response, **kwargs):
+        try:
+            model, prompt, completion = _usage(response)
+            model = model or self.model or "unknown"
+            node = _node.get() or "other"
+            if is_cached_response(response):
+                LLM_CACHE_HITS.inc(node=node, model=model)
+                _add(llm_cache_hits=1)
+                return
+            cost = llm_cost(model, prompt, completion)
+            LLM_CALLS.inc(node=node, model=model)
+            LLM_TOKENS.inc(prompt, node=node, model=model, kind="prompt")
+            LLM_TOKENS.inc(completion, node=node, model=model, kind="completion")
+            LLM_COST.inc(cost, node=node, model=model)
+            _add(llm_calls=1, prompt_tokens=prompt, completion_tokens=completion, cost_usd=cost)
+        except Exception:
+            # Never let accounting break an LLM call
+            logger.exception("Failed to record LLM usage")
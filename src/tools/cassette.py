@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+from ..utils import get_data_dir
+
+# Record/replay of every external data response (Yahoo info, price history and news, DuckDuckGo
+# results), selected with MARKET_DATA_MODE: "live" calls the services, "record" calls them and
+# saves each response under CASSETTE_DIR, "replay" serves the saved responses without any
+# network access (optionally sleeping CASSETTE_LATENCY_MS per response, like a request would).
+# The caches, price store and news index above the fetchers run unchanged in every mode, so the
+# CLI, the API, the UI and the tests can run offline against a recording.
+
+MARKET_DATA_MODES = ("live", "record", "replay")
+
+# Symbols and intervals used as file names as is; anything else (web queries) is hashed
+SAFE_NAME = re.compile(r"^[A-Za-z0-9.^=_-]{1,64}$")
+
+def market_data_mode():
+    mode = os.getenv("MARKET_DATA_MODE", "live").lower()
+    if mode not in MARKET_DATA_MODES:
+        raise ValueError(f"Unknown MARKET_DATA_MODE {mode!r}, expected one of {', '.join(MARKET_DATA_MODES)}")
+    return mode
+
+class CassetteMiss(LookupError):
+    """
+    Raised in replay mode for a request that was never recorded.
+    """
+
+def _name(key):
+    key = str(key)
+    return key.upper() if SAFE_NAME.match(key) else hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+class Cassette:
+    """
+    On-disk recordings of upstream responses.
+
+    JSON responses (info dicts, news lists, search results) are stored gzipped, one file per
+    (kind, key). Price history is stored per (ticker, interval) as the price store's flat
+    `BAR_DTYPE` records plus the exchange timezone; recording merges every fetched window
+    into it, and replay cuts the requested window (`start`, or `period` back from the last
+    recorded bar) out of it.
+    """
+
+    def __init__(self, root=None, mode="live", latency=0.0):
+        self.root = root or os.getenv("CASSETTE_DIR") or get_data_dir("cassettes")
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.counts = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    def _path(self, *parts):
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _miss(self, kind, key):
+        self._count("misses")
+        return CassetteMiss(f"No {kind} recording for {key!r} in {self.root}; record one with MARKET_DATA_MODE=record")
+
+    def _replayed(self):
+        self._count("replayed")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def call(self, kind, key, fetch):
+        """
+        JSON response of `fetch()` for (kind, key): fetched live, fetched and recorded, or replayed.
+        """
+        if self.mode == "live":
+            return fetch()
+        path = self._path(kind, f"{_name(key)}.json.gz")
+        if self.mode == "replay":
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    value = json.load(f)["response"]
+            except FileNotFoundError:
+                raise self._miss(kind, key) from None
+            self._replayed()
+            return value
+
+        value = fetch()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"key": str(key), "recorded_at": time.time(), "response": value}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        self._count("recorded")
+        return value
+
+    def _history_paths(self, ticker, interval):
+        base = self._path("history", interval, _name(ticker))
+        return f"{base}.bin", f"{base}.json"
+
+    def record_history(self, ticker, interval, frame):
+        """
+        Merges the bars of a fetched `frame` into the recording of (ticker, interval).
+        """
+        from .price_store import BAR_DTYPE, _to_records
+
+        data_path, meta_path = self._history_paths(ticker, interval)
+        with self._lock:
+            stored = np.fromfile(data_path, dtype=BAR_DTYPE) if os.path.exists(data_path) else np.empty(0, dtype=BAR_DTYPE)
+            records = np.concatenate([stored, _to_records(frame)])
+            # Keep the newest copy of each timestamp, in time order
+            _, last_index = np.unique(records["ts"][::-1], return_index=True)
+            records = records[::-1][last_index]
+            tmp_path = f"{data_path}.tmp"
+            records.tofile(tmp_path)
+            os.replace(tmp_path, data_path)
+            tz = str(frame.index.tz) if frame is not None and not frame.empty and frame.index.tz is not None else None
+            if tz or not os.path.exists(meta_path):
+                with open(meta_path, "w") as f:
+                    json.dump({"ticker": ticker, "interval": interval, "tz": tz or "UTC", "recorded_at": time.time()}, f)
+            self.counts["recorded"] += 1
+
+    def replay_history(self, ticker, interval="1d", period=None, start=None):
+        """
+        Recorded bars of (ticker, interval) since `start`, or for `period` ending at the last recorded bar.
+        """
+        from .price_store import BAR_DTYPE, COLUMNS, PERIOD_SESSIONS, period_start
+
+        data_path, meta_path = self._history_paths(ticker, interval)
+        if not os.path.exists(data_path):
+            raise self._miss("history", f"{ticker} {interval}")
+        records = np.fromfile(data_path, dtype=BAR_DTYPE)
+        with open(meta_path) as f:
+            tz = json.load(f).get("tz", "UTC")
+        index = pd.to_datetime(records["ts"], utc=True).tz_convert(tz)
+        frame = pd.DataFrame({c: records[f] for f, c in zip(BAR_DTYPE.names[1:], COLUMNS)}, index=index)
+        frame.index.name = "Date"
+        self._replayed()
+
+        if frame.empty:
+            return frame
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start).tz_convert(tz)]
+        if period in PERIOD_SESSIONS:
+            sessions = pd.Index(frame.index.normalize()).unique()
+            return frame[frame.index.normalize() >= sessions[-PERIOD_SESSIONS[period]:][0]]
+        cutoff = period_start(period, now=frame.index[-1].tz_convert("UTC").to_pydatetime())
+        return frame[frame.index >= pd.Timestamp(cutoff).tz_convert(tz)] if cutoff is not None else frame
+
+    def history(self, ticker, interval, fetch, period=None, start=None):
+        """
+        `fetch()` (one ticker's history) fetched live, fetched and recorded, or replayed.
+        """
+        if self.mode == "replay":
+            return self.replay_history(ticker, interval, period=period, start=start)
+        frame = fetch()
+        if self.mode == "record":
+            self.record_history(ticker, interval, frame)
+        return frame
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, "root": self.root, **self.counts}
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+def get_cassette():
+    """
+    Returns the process-wide cassette for MARKET_DATA_MODE, CASSETTE_DIR and CASSETTE_LATENCY_MS.
+    """
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(mode=market_data_mode(), latency=float(os.getenv("CASSETTE_LATENCY_MS", "0")) / 1000)
+    return _cassette
+
+def close_cassette():
+    global _cassette
+    with _cassette_lock:
+        _cassette = None
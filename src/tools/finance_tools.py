@@ -1,22 +1,41 @@
+from typing import List
 from langchain_core.tools import tool
-import yfinance as yf
+from .market_data import get_histories, get_history, get_info, get_infos
+from .output import MISSING, field_table, fmt_large, fmt_num, fmt_pct, fmt_text, tool_output_mode
+from .pool import offload_to_pool
+from .run_scope import memoize_in_run
+from .symbols import validate_tickers
 
+@offload_to_pool
 @tool
 def get_stock_data(ticker: str) -> str:
     """
     Retrieves stock data for a given ticker symbol using yfinance.
     Returns a summary of price history (last 1 month) and basic info.
     """
+    return format_stock_data(ticker)
+
+@memoize_in_run(key=lambda ticker: (ticker or "").strip().upper())
+def format_stock_data(ticker: str) -> str:
+    """
+    Plain-function body of `get_stock_data`, also used by the prefetch node.
+    """
+    symbols = validate_tickers([ticker])
+    if not symbols:
+        return f"Invalid ticker symbol: {ticker}."
+    ticker = symbols[0]
     try:
-        stock = yf.Ticker(ticker)
-        
         # Get history (extended to 1 year for better trend analysis)
-        history = stock.history(period="1y")
+        # Both reads go through the shared market data cache
+        history = get_history(ticker, period="1y")
         if history.empty:
             return f"No price data found for {ticker}."
             
         # Get info
-        info = stock.info
+        info = get_info(ticker)
+        
+        if tool_output_mode() == "compact":
+            return _compact_stock_data(ticker, history, info)
         
         # 1. Valuation Metrics
         valuation = {
@@ -85,3 +104,101 @@ def get_stock_data(ticker: str) -> str:
         """
     except Exception as e:
         return f"Error fetching data for {ticker}: {str(e)}"
+
+
+def _period_return(close, days):
+    start = close.iloc[-days] if len(close) > days else close.iloc[0]
+    return (close.iloc[-1] - start) / start
+
+# (label, formatter) rows of the compact `get_stock_data` output, in this fixed order
+STOCK_DATA_FIELDS = [
+    ("Price", lambda info, close: fmt_num(close.iloc[-1])),
+    ("1M", lambda info, close: fmt_pct(_period_return(close, 22))),
+    ("6M", lambda info, close: fmt_pct(_period_return(close, 126))),
+    ("1Y", lambda info, close: fmt_pct(_period_return(close, len(close)))),
+    ("52W High", lambda info, close: fmt_num(info.get("fiftyTwoWeekHigh"))),
+    ("52W Low", lambda info, close: fmt_num(info.get("fiftyTwoWeekLow"))),
+    ("Mkt Cap", lambda info, close: fmt_large(info.get("marketCap"))),
+    ("EV", lambda info, close: fmt_large(info.get("enterpriseValue"))),
+    ("P/E", lambda info, close: fmt_num(info.get("trailingPE"))),
+    ("Fwd P/E", lambda info, close: fmt_num(info.get("forwardPE"))),
+    ("PEG", lambda info, close: fmt_num(info.get("pegRatio"))),
+    ("P/B", lambda info, close: fmt_num(info.get("priceToBook"))),
+    ("P/S", lambda info, close: fmt_num(info.get("priceToSalesTrailing12Months"))),
+    ("EV/EBITDA", lambda info, close: fmt_num(info.get("enterpriseToEbitda"))),
+    ("Rev Gr", lambda info, close: fmt_pct(info.get("revenueGrowth"))),
+    ("EPS Gr", lambda info, close: fmt_pct(info.get("earningsGrowth"))),
+    ("Gross M", lambda info, close: fmt_pct(info.get("grossMargins"))),
+    ("Op M", lambda info, close: fmt_pct(info.get("operatingMargins"))),
+    ("ROE", lambda info, close: fmt_pct(info.get("returnOnEquity"))),
+    ("Cash", lambda info, close: fmt_large(info.get("totalCash"))),
+    ("Debt", lambda info, close: fmt_large(info.get("totalDebt"))),
+    ("FCF", lambda info, close: fmt_large(info.get("freeCashflow"))),
+    ("Target", lambda info, close: fmt_num(info.get("targetMeanPrice"))),
+    ("Target High", lambda info, close: fmt_num(info.get("targetHighPrice"))),
+    ("Target Low", lambda info, close: fmt_num(info.get("targetLowPrice"))),
+    ("Rec", lambda info, close: fmt_text(info.get("recommendationKey"))),
+    ("Analysts", lambda info, close: fmt_text(info.get("numberOfAnalystOpinions"))),
+]
+
+def _compact_stock_data(ticker, history, info):
+    close = history["Close"].dropna()
+    table = field_table((label, fmt(info, close)) for label, fmt in STOCK_DATA_FIELDS)
+    recent = ["| Date | Close | Volume |", "|---|---|---|"]
+    for date, row in history.tail(5).iterrows():
+        recent.append(f"| {date:%Y-%m-%d} | {fmt_num(row.get('Close'))} | {fmt_large(row.get('Volume'))} |")
+    return f"Ticker: {ticker}\n{table}\n\nLast 5 days:\n" + "\n".join(recent)
+
+# Columns of the multi-ticker comparison table: a subset of STOCK_DATA_FIELDS, in the same order
+COMPARISON_LABELS = (
+    "Price", "1M", "6M", "1Y", "Mkt Cap", "P/E", "Fwd P/E", "PEG", "EV/EBITDA",
+    "Rev Gr", "EPS Gr", "Gross M", "Op M", "ROE", "Target", "Rec",
+)
+COMPARISON_COLUMNS = [(label, fmt) for label, fmt in STOCK_DATA_FIELDS if label in COMPARISON_LABELS]
+
+@offload_to_pool
+@tool
+def get_multi_stock_data(tickers: List[str]) -> str:
+    """
+    Retrieves stock data for several tickers at once and returns a single comparison table
+    (price returns, valuation, growth, margins, analyst targets).
+    Prefer this over calling `get_stock_data` once per ticker when comparing 2 or more tickers.
+    """
+    return format_comparison(tickers)
+
+@memoize_in_run(key=lambda tickers: tuple((t or "").strip().upper() for t in tickers or []))
+def format_comparison(tickers: List[str]) -> str:
+    """
+    Plain-function body of `get_multi_stock_data`, also used by the prefetch node.
+    """
+    tickers = validate_tickers(tickers)
+    if not tickers:
+        return "No tickers provided."
+    try:
+        # One batched download for all price histories, fundamentals fetched concurrently
+        histories = get_histories(tickers, period="1y")
+        infos = get_infos(tickers)
+
+        table, missing = [], []
+        for ticker in tickers:
+            history = histories.get(ticker)
+            if history is None or history.empty:
+                missing.append(ticker)
+                continue
+            close = history["Close"].dropna()
+            info = infos.get(ticker) or {}
+            table.append((ticker, [fmt(info, close) for _, fmt in COMPARISON_COLUMNS]))
+    except Exception as e:
+        return f"Error fetching data for {', '.join(tickers)}: {str(e)}"
+
+    columns = list(range(len(COMPARISON_COLUMNS)))
+    if tool_output_mode() == "compact":
+        # Leave out columns no ticker has a value for
+        columns = [i for i in columns if any(cells[i] != MISSING for _, cells in table)]
+    header = "| Ticker | " + " | ".join(COMPARISON_COLUMNS[i][0] for i in columns) + " |"
+    rows = [header, "|" + "---|" * (len(columns) + 1)]
+    rows += [f"| {ticker} | " + " | ".join(cells[i] for i in columns) + " |" for ticker, cells in table]
+
+    if missing:
+        rows.append(f"\nNo price data found for: {', '.join(missing)}.")
+    return "\n".join(rows)
@@ -0,0 +1,209 @@
+import contextvars
+import hashlib
+import os
+import pickle
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import get_data_dir
+from .price_store import get_price_store
+from .cassette import get_cassette
+from .run_scope import get_ticker, record_upstream
+from .upstream import YAHOO, upstream
+
+# Upstream fetchers. Everything that reads Yahoo Finance info/prices goes through these
+# functions, so the cache (and tests) have a single seam to hook into; requests are
+# rate-limited and retried by the shared upstream client (upstream.py), or recorded and
+# replayed (cassette.py). Price history is served by the local incremental price store,
+# which only downloads missing bars.
+
+def fetch_info(ticker):
+    def fetch():
+        # Counted only when the request is made (not when replayed)
+        record_upstream("yahoo_info")
+        return upstream(YAHOO).call(lambda: get_ticker(ticker).info)
+    return get_cassette().call("info", ticker, fetch)
+
+def fetch_history(ticker, period="1y", interval="1d"):
+    return get_price_store().get(ticker, period=period, interval=interval)
+
+def fetch_histories(tickers, period="1y", interval="1d"):
+    """
+    Price history for several tickers with batched downloads for whatever is missing locally.
+    Returns {ticker: DataFrame}; tickers without data map to an empty frame.
+    """
+    return get_price_store().get_many(tickers, period=period, interval=interval)
+
+class MarketDataCache:
+    """
+    Two-tier (memory + disk) cache for yfinance fundamentals and price history.
+
+    Each entry is fresh for its TTL (MARKET_INFO_TTL for `info`, MARKET_HISTORY_TTL for
+    prices). For a further MARKET_STALE_TTL seconds the stale value is returned immediately
+    while a background refresh replaces it (stale-while-revalidate); after that the caller
+    waits for a synchronous fetch. Entries are pickled under DATA_DIR so they survive restarts.
+    Returned objects are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, cache_dir=None, info_ttl=None, history_ttl=None, stale_ttl=None):
+        self.cache_dir = cache_dir or get_data_dir("market_data")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.info_ttl = info_ttl if info_ttl is not None else int(os.getenv("MARKET_INFO_TTL", str(6 * 3600)))
+        self.history_ttl = history_ttl if history_ttl is not None else int(os.getenv("MARKET_HISTORY_TTL", "300"))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else int(os.getenv("MARKET_STALE_TTL", "3600"))
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._refreshing = set()
+        self._refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="market-refresh")
+        # Separate from the tool pool: tools running on that pool block on these futures
+        self._fetcher = ThreadPoolExecutor(
+            max_workers=int(os.getenv("MARKET_FETCH_WORKERS", "8")), thread_name_prefix="market-fetch"
+        )
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    def get_info(self, ticker):
+        return self._get(("info", ticker.upper()), self.info_ttl, lambda: fetch_info(ticker))
+
+    def get_history(self, ticker, period="1y", interval="1d"):
+        return self._get(
+            ("history", ticker.upper(), period, interval),
+            self.history_ttl,
+            lambda: fetch_history(ticker, period=period, interval=interval),
+        )
+
+    def get_infos(self, tickers):
+        """
+        Returns {ticker: info}, fetching uncached tickers concurrently.
+        """
+        # Each fetch runs in a copy of the caller's context so it is attributed to the caller's run
+        contexts = [contextvars.copy_context() for _ in tickers]
+        return dict(zip(tickers, self._fetcher.map(lambda ctx, t: ctx.run(self.get_info, t), contexts, tickers)))
+
+    def get_histories(self, tickers, period="1y", interval="1d"):
+        """
+        Returns {ticker: history}. Tickers that are missing (or too stale to serve) are
+        fetched together in a single batched download instead of one request each.
+        """
+        histories, missing = {}, []
+        for ticker in tickers:
+            key = ("history", ticker.upper(), period, interval)
+            entry = self._load(key)
+            age = time.time() - entry[0] if entry is not None else None
+            if age is not None and age < self.history_ttl + self.stale_ttl:
+                histories[ticker] = self.get_history(ticker, period=period, interval=interval)
+            else:
+                missing.append(ticker)
+
+        if missing:
+            self._count("misses")
+            for ticker, history in fetch_histories(missing, period=period, interval=interval).items():
+                histories[ticker] = self._store(("history", ticker.upper(), period, interval), history)
+        return histories
+
+    def _get(self, key, ttl, fetch):
+        entry = self._load(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < ttl:
+                self._count("hits")
+                return entry[1]
+            if age < ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._refresh_in_background(key, fetch)
+                return entry[1]
+
+        # Missing or too stale: fetch synchronously, one fetch per key at a time
+        with self._key_lock(key):
+            entry = self._load(key)
+            if entry is not None and time.time() - entry[0] < ttl:
+                self._count("hits")
+                return entry[1]
+            self._count("misses")
+            return self._store(key, fetch())
+
+    def _refresh_in_background(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with self._key_lock(key):
+                    self._store(key, fetch())
+                self._count("refreshes")
+            except Exception:
+                # Keep serving the stale value; the next stale read retries
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresher.submit(refresh)
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pkl")
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(key), "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def _store(self, key, value):
+        entry = (time.time(), value)
+        with self._lock:
+            self._entries[key] = entry
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            traceback.print_exc()
+        return value
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_market_data_cache():
+    """
+    Returns the process-wide market data cache shared by the agent tools and the UI.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MarketDataCache()
+    return _cache
+
+def get_info(ticker):
+    return get_market_data_cache().get_info(ticker)
+
+def get_history(ticker, period="1y", interval="1d"):
+    return get_market_data_cache().get_history(ticker, period=period, interval=interval)
+
+def get_infos(tickers):
+    return get_market_data_cache().get_infos(tickers)
+
+def get_histories(tickers, period="1y", interval="1d"):
+    return get_market_data_cache().get_histories(tickers, period=period, interval=interval)
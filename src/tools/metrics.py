@@ -0,0 +1,251 @@
+import os
+from typing import List
+import numpy as np
+import pandas as pd
+from langchain_core.tools import tool
+from .market_data import get_histories
+from .pool import offload_to_pool
+from .run_scope import memoize_in_run
+from .symbols import validate_tickers
+
+TRADING_DAYS = 252
+
+# Metric name -> description, in the order they are reported
+METRICS = {
+    "return_1y": "Total return over the window",
+    "volatility_20d": "Annualized realized volatility, last 20 sessions",
+    "volatility_1y": "Annualized realized volatility, full window",
+    "max_drawdown": "Worst peak-to-trough decline",
+    "sharpe": "Annualized Sharpe ratio (vs. RISK_FREE_RATE)",
+    "beta_60d": "Beta vs. benchmark, trailing 60 sessions",
+    "beta_1y": "Beta vs. benchmark, full window",
+    "atr_14_pct": "14-day average true range as % of price",
+    "sma_50": "50-day simple moving average",
+    "sma_200": "200-day simple moving average",
+    "ma_trend": "+1 if SMA50 > SMA200 (golden cross regime), -1 otherwise",
+    "days_since_ma_cross": "Sessions since the last SMA50/SMA200 crossover",
+    "volume_zscore": "Last session volume vs. prior 20 sessions (z-score)",
+}
+
+def _rolling_sum(x, window):
+    # Column-wise rolling sum over axis 0 via cumulative sums; first window-1 rows are NaN
+    csum = np.cumsum(np.nan_to_num(x), axis=0)
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = csum[window - 1:] - np.vstack([np.zeros((1, x.shape[1])), csum[:-window]])
+    return out
+
+def _rolling_mean(x, window):
+    counts = _rolling_sum(~np.isnan(x) * 1.0, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts == window, _rolling_sum(x, window) / window, np.nan)
+
+def _beta(returns, bench):
+    # returns: (T, N), bench: (T, N) or (T,) -> (N,) using pairwise-complete observations
+    if bench.ndim == 1:
+        bench = np.broadcast_to(bench[:, None], returns.shape)
+    mask = ~np.isnan(returns) & ~np.isnan(bench)
+    n = mask.sum(axis=0)
+    r = np.where(mask, returns, 0.0)
+    b = np.where(mask, bench, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_r = r.sum(axis=0) / n
+        mean_b = b.sum(axis=0) / n
+        cov = (r * b).sum(axis=0) / n - mean_r * mean_b
+        var = (b * b).sum(axis=0) / n - mean_b ** 2
+        return np.where(n > 2, cov / var, np.nan)
+
+def _own_sessions(close, high, low, volume, bench_close):
+    # Moves each ticker's sessions (rows with a close) to the bottom of its column, in order,
+    # so "last" values and rolling windows cover that ticker's own sessions only, whatever
+    # the other tickers traded. The benchmark is gathered onto each ticker's sessions.
+    valid = ~np.isnan(close)
+    if valid.all():
+        return close, high, low, volume, bench_close
+    order = np.argsort(valid, axis=0, kind="stable")
+    columns = np.arange(close.shape[1])
+    kept = valid[order, columns]
+
+    def gather(x):
+        return np.where(kept, x[order, columns], np.nan)
+
+    if bench_close is not None:
+        bench_close = np.where(kept, bench_close[order], np.nan)
+    return gather(close), gather(high), gather(low), gather(volume), bench_close
+
+def compute_metrics_arrays(close, high, low, volume, bench_close=None, risk_free_rate=0.0):
+    """
+    Computes every metric in `METRICS` for N tickers at once.
+
+    All inputs are (T, N) float arrays aligned on the same T sessions (NaN where a ticker
+    has no bar); `bench_close` is a (T,) array. Each ticker's metrics are computed over its
+    own sessions only. Returns {metric: (N,) array}.
+    """
+    close = np.asarray(close, dtype=float)
+    high, low, volume = (np.asarray(x, dtype=float) for x in (high, low, volume))
+    if bench_close is not None:
+        bench_close = np.asarray(bench_close, dtype=float)
+    close, high, low, volume, bench_close = _own_sessions(close, high, low, volume, bench_close)
+    T, N = close.shape
+    log_close = np.log(close)
+    returns = np.diff(log_close, axis=0)
+
+    # Forward-fill closes so drawdowns are not broken by missing bars
+    idx = np.where(~np.isnan(close), np.arange(T)[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = close[idx, np.arange(N)]
+    first_valid = np.argmax(~np.isnan(close), axis=0)
+    last = filled[-1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        running_max = np.fmax.accumulate(filled, axis=0)
+        drawdown = filled / running_max - 1.0
+
+        mean_ret = np.nanmean(returns, axis=0)
+        std_ret = np.nanstd(returns, axis=0, ddof=1)
+        std_20 = np.nanstd(returns[-20:], axis=0, ddof=1)
+
+        prev_close = np.vstack([np.full((1, N), np.nan), close[:-1]])
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        atr = _rolling_mean(true_range, 14)[-1]
+
+        sma_50_series = _rolling_mean(filled, 50)
+        sma_200_series = _rolling_mean(filled, 200)
+        spread = np.sign(sma_50_series - sma_200_series)
+        crosses = (spread[1:] * spread[:-1]) < 0
+        has_cross = crosses.any(axis=0)
+        last_cross = T - 1 - np.argmax(crosses[::-1], axis=0)
+
+        vol_hist = volume[-21:-1]
+        volume_z = (volume[-1] - np.nanmean(vol_hist, axis=0)) / np.nanstd(vol_hist, axis=0, ddof=1)
+
+        metrics = {
+            "return_1y": last / close[first_valid, np.arange(N)] - 1.0,
+            "volatility_20d": std_20 * np.sqrt(TRADING_DAYS),
+            "volatility_1y": std_ret * np.sqrt(TRADING_DAYS),
+            "max_drawdown": np.nanmin(drawdown, axis=0),
+            "sharpe": (mean_ret * TRADING_DAYS - risk_free_rate) / (std_ret * np.sqrt(TRADING_DAYS)),
+            "beta_60d": np.full(N, np.nan),
+            "beta_1y": np.full(N, np.nan),
+            "atr_14_pct": atr / last,
+            "sma_50": sma_50_series[-1],
+            "sma_200": sma_200_series[-1],
+            "ma_trend": np.where(np.isnan(spread[-1]), np.nan, spread[-1]),
+            "days_since_ma_cross": np.where(has_cross, T - 1 - last_cross, np.nan),
+            "volume_zscore": volume_z,
+        }
+
+    if bench_close is not None:
+        bench_returns = np.diff(np.log(bench_close), axis=0)
+        metrics["beta_1y"] = _beta(returns, bench_returns)
+        metrics["beta_60d"] = _beta(returns[-60:], bench_returns[-60:])
+    return metrics
+
+def _session_dates(index):
+    # Calendar date of each bar, without timezone: the timezone-aware midnights of different
+    # exchanges (America/New_York vs. Asia/Taipei) never coincide
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+def compute_metrics(histories, benchmark=None, risk_free_rate=None):
+    """
+    Computes risk/technical metrics from already-fetched OHLCV frames.
+
+    `histories` maps ticker -> DataFrame with Open/High/Low/Close/Volume columns;
+    `benchmark` is an optional OHLCV frame (e.g. SPY) used for beta.
+    Returns {ticker: {metric: float or None}}.
+    """
+    histories = {t: h for t, h in histories.items() if h is not None and not h.empty}
+    if not histories:
+        return {}
+    if risk_free_rate is None:
+        risk_free_rate = float(os.getenv("RISK_FREE_RATE", "0.04"))
+
+    # Align every ticker on the union of session dates with plain NumPy scatters; per-frame
+    # pandas column selection/reindexing dominates the runtime at hundreds of tickers
+    tickers = list(histories)
+    fields = ["Close", "High", "Low", "Volume"]
+    first = histories[tickers[0]].index
+    first_dates = _session_dates(first)
+    dates = {
+        ticker: first_dates if history.index.equals(first) else _session_dates(history.index)
+        for ticker, history in histories.items()
+    }
+    index = first_dates[~first_dates.duplicated(keep="last")] if first_dates.has_duplicates else first_dates
+    for ticker_dates in dates.values():
+        if ticker_dates is not index and not ticker_dates.equals(index):
+            index = index.union(ticker_dates[~ticker_dates.duplicated(keep="last")])
+    values = np.full((len(index), len(tickers), len(fields)), np.nan)
+    for i, ticker in enumerate(tickers):
+        history, ticker_dates = histories[ticker], dates[ticker]
+        block = history.to_numpy(dtype=float)[:, history.columns.get_indexer(fields)]
+        if ticker_dates is index or ticker_dates.equals(index):
+            values[:, i, :] = block
+        else:
+            keep = ~ticker_dates.duplicated(keep="last")
+            values[index.get_indexer(ticker_dates[keep]), i, :] = block[keep]
+    close, high, low, volume = (values[:, :, i] for i in range(len(fields)))
+
+    bench_close = None
+    if benchmark is not None and not benchmark.empty:
+        bench_dates = _session_dates(benchmark.index)
+        keep = ~bench_dates.duplicated(keep="last")
+        bench = pd.Series(benchmark["Close"].to_numpy(dtype=float)[keep], index=bench_dates[keep])
+        bench_close = bench.reindex(index).to_numpy(dtype=float)
+
+    metrics = compute_metrics_arrays(close, high, low, volume, bench_close, risk_free_rate)
+    names = list(metrics)
+    table = np.round(np.vstack([metrics[name] for name in names]).T, 4)
+    return {
+        ticker: {name: (None if value != value else value) for name, value in zip(names, row)}
+        for ticker, row in zip(tickers, table.tolist())
+    }
+
+@memoize_in_run(key=lambda tickers: tuple((t or "").strip().upper() for t in tickers or []))
+def fetch_risk_metrics(tickers):
+    """
+    Fetches one year of history for `tickers` plus the RISK_BENCHMARK (default SPY)
+    in one batched call and computes their metrics.
+    """
+    benchmark = os.getenv("RISK_BENCHMARK", "SPY")
+    histories = get_histories(list(dict.fromkeys([*tickers, benchmark])), period="1y")
+    bench_history = histories.get(benchmark)
+    return compute_metrics({t: histories.get(t) for t in tickers}, benchmark=bench_history)
+
+def _fmt(name, value):
+    if value is None:
+        return "-"
+    if name in ("return_1y", "volatility_20d", "volatility_1y", "max_drawdown", "atr_14_pct"):
+        return f"{value * 100:.1f}%"
+    if name in ("ma_trend", "days_since_ma_cross"):
+        return f"{value:.0f}"
+    return f"{value:.2f}"
+
+def format_metrics_table(metrics):
+    """
+    Renders {ticker: {metric: value}} as a Markdown table, one row per ticker.
+    """
+    if not metrics:
+        return "No risk metrics available."
+    names = list(METRICS)
+    rows = ["| Ticker | " + " | ".join(names) + " |", "|" + "---|" * (len(names) + 1)]
+    for ticker, values in metrics.items():
+        rows.append(f"| {ticker} | " + " | ".join(_fmt(n, values.get(n)) for n in names) + " |")
+    return "\n".join(rows)
+
+@offload_to_pool
+@tool
+def get_risk_metrics(tickers: List[str]) -> str:
+    """
+    Computes quantitative risk and technical metrics for one or more tickers over the last year:
+    realized volatility, max drawdown, beta vs. SPY, Sharpe, ATR, 50/200-day moving-average trend
+    and volume z-score. Returns a comparison table.
+    """
+    tickers = validate_tickers(tickers)
+    if not tickers:
+        return "No tickers provided."
+    try:
+        return format_metrics_table(fetch_risk_metrics(tickers))
+    except Exception as e:
+        return f"Error computing risk metrics for {', '.join(tickers)}: {str(e)}"
@@ -0,0 +1,156 @@
+import hashlib
+import math
+import os
+import re
+from datetime import datetime, timezone
+import numpy as np
+
+# Latin words/numbers, or single CJK characters (paired into bigrams below)
+TOKEN = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*|[㐀-鿿]")
+
+def news_dedup_enabled():
+    return os.getenv("NEWS_DEDUP", "true").lower() not in ("0", "false", "no", "off")
+
+# Wire-service decorations that differ between syndicated copies of one story
+TITLE_NOISE = re.compile(r"^\s*(update\s*\d*|exclusive|breaking)\s*[-:]\s*|\s+[-|–]\s+[^-|–]{2,40}$", re.IGNORECASE)
+# Snippets are cut at different lengths by different sites: only the lead of the summary is hashed
+SUMMARY_TOKENS = 20
+
+def _fingerprint_text(item):
+    title = TITLE_NOISE.sub("", item.get("title") or "")
+    summary = " ".join(TOKEN.findall((item.get("summary") or "").lower())[:SUMMARY_TOKENS])
+    return f"{title} {summary}"
+
+def _features(text):
+    tokens = TOKEN.findall((text or "").lower())
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+def simhash(texts):
+    """
+    64-bit SimHash fingerprint per text over its word unigrams and bigrams (character
+    bigrams for Chinese). Texts that share most of their features get fingerprints
+    within a small Hamming distance. Returns a uint64 array.
+    """
+    # Each distinct feature is hashed once, however many texts contain it
+    vocabulary, ids, counts = {}, [], []
+    for text in texts:
+        grams = _features(text)
+        ids.extend(vocabulary.setdefault(gram, len(vocabulary)) for gram in grams)
+        counts.append(len(grams))
+    votes = np.zeros((len(texts), 64), dtype=np.int32)
+    if vocabulary:
+        hashes = np.frombuffer(
+            b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in vocabulary), dtype="<u8"
+        )
+        # Every feature votes +1/-1 on each of the 64 bits of the fingerprint of its text
+        signs = 2 * np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little").astype(np.int32) - 1
+        counts = np.asarray(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        votes[nonempty] = np.add.reduceat(signs[np.asarray(ids)], starts[nonempty], axis=0)
+    packed = np.packbits(votes > 0, axis=1, bitorder="little")
+    return packed.view("<u8").ravel().astype(np.uint64)
+
+def _popcount(values):
+    return np.unpackbits(values.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+def cluster(fingerprints, max_distance=10):
+    """
+    Groups fingerprints within `max_distance` bits of each other (transitively).
+
+    The 64 bits are split into max_distance + 1 bands: two fingerprints that differ in at
+    most max_distance bits agree exactly on at least one band, so only items sharing a band
+    bucket are compared. Returns a cluster label (the index of its first item) per item.
+    """
+    count = len(fingerprints)
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bands = max_distance + 1
+    width = 64 // bands
+    pairs = []
+    for band in range(bands):
+        shift = band * width
+        bits = 64 - shift if band == bands - 1 else width
+        keys = (fingerprints >> np.uint64(shift)) & np.uint64((1 << bits) - 1)
+        order = np.argsort(keys, kind="stable")
+        # Runs of equal keys are the buckets
+        boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) < 2:
+                continue
+            # All pairs of the bucket at once
+            values = fingerprints[bucket]
+            distances = _popcount((values[:, None] ^ values[None, :]).ravel()).reshape(len(bucket), len(bucket))
+            i, j = np.nonzero(np.triu(distances <= max_distance, k=1))
+            pairs.append(bucket[i] * count + bucket[j])
+
+    # The same pair is usually found in several bands
+    for pair in np.unique(np.concatenate(pairs)).tolist() if pairs else []:
+        a, b = find(pair // count), find(pair % count)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    return [find(i) for i in range(count)]
+
+def parse_time(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _relevance(item, terms):
+    if not terms:
+        return 0.0
+    title = (item.get("title") or "").lower()
+    summary = (item.get("summary") or "").lower()
+    # A term in the title counts double
+    score = sum(2 if term in title else 1 if term in summary else 0 for term in terms)
+    return score / (2 * len(terms))
+
+def dedup_news(items, terms=(), now=None):
+    """
+    Collapses near-duplicate news items (syndicated copies of one story) and ranks the rest.
+
+    `items` are dicts with "title", "summary", "publisher" and "published" (ISO timestamp).
+    Items whose title + summary SimHash fingerprints are within NEWS_DEDUP_DISTANCE bits
+    form a cluster; its representative is the copy with the longest summary, with
+    "sources" (cluster size) and "publishers" added. Clusters are ranked by recency
+    (half-life NEWS_RECENCY_HALF_LIFE_HOURS), relevance to `terms` and source count.
+    """
+    if not items:
+        return []
+    max_distance = int(os.getenv("NEWS_DEDUP_DISTANCE", "10"))
+    half_life = float(os.getenv("NEWS_RECENCY_HALF_LIFE_HOURS", "48"))
+    now = now or datetime.now(timezone.utc)
+    terms = [term.lower() for term in terms if term]
+
+    fingerprints = simhash([_fingerprint_text(item) for item in items])
+    clusters = {}
+    for index, label in enumerate(cluster(fingerprints, max_distance)):
+        clusters.setdefault(label, []).append(index)
+
+    results = []
+    for members in clusters.values():
+        copies = [items[i] for i in members]
+        best = max(copies, key=lambda item: (len(item.get("summary") or ""), parse_time(item.get("published")) or now))
+        publishers = list(dict.fromkeys(item.get("publisher") for item in copies if item.get("publisher")))
+        times = [t for t in (parse_time(item.get("published")) for item in copies) if t is not None]
+        results.append({**best, "sources": len(copies), "publishers": publishers, "_first_seen": min(times) if times else None})
+
+    max_sources = max(item["sources"] for item in results)
+    for item in results:
+        first_seen = item.pop("_first_seen")
+        age_hours = max((now - first_seen).total_seconds() / 3600, 0) if first_seen else None
+        recency = 0.5 ** (age_hours / half_life) if age_hours is not None else 0.0
+        coverage = math.log1p(item["sources"]) / math.log1p(max_sources)
+        item["score"] = round(0.5 * recency + 0.3 * _relevance(item, terms) + 0.2 * coverage, 4)
+    results.sort(key=lambda item: item["score"], reverse=True)
+    return results
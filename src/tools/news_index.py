@@ -0,0 +1,225 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from ..utils import get_data_dir
+from .news_dedup import parse_time
+
+# Terms shorter than a trigram cannot use the FTS index and are matched with LIKE instead
+FTS_TERM = re.compile(r"[^\s\"'()*:^+-]+")
+
+def news_index_ttl():
+    """
+    Seconds the news fetched for a ticker (or web query) is considered fresh (NEWS_INDEX_TTL).
+    """
+    return int(os.getenv("NEWS_INDEX_TTL", "1800"))
+
+def news_index_window_days():
+    """
+    How far back `search_news` answers from the index when it is fresh (NEWS_INDEX_WINDOW_DAYS).
+    """
+    return float(os.getenv("NEWS_INDEX_WINDOW_DAYS", "7"))
+
+class NewsIndex:
+    """
+    Local full-text index (SQLite FTS5) of every news item fetched by `search_news`
+    and `web_search`, accumulated across runs.
+
+    Items are keyed by link and tagged with the tickers they were fetched for. Each
+    remote fetch is recorded under a key ("ticker:NVDA", "web:<query>") with its time
+    and items, so callers can skip the remote source while the key is fresh.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("NEWS_INDEX_PATH") or os.path.join(get_data_dir(), "news_index.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """CREATE TABLE IF NOT EXISTS news (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT UNIQUE NOT NULL,
+                    title TEXT NOT NULL,
+                    link TEXT,
+                    summary TEXT,
+                    publisher TEXT,
+                    published REAL,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS news_published ON news (published);
+                CREATE TABLE IF NOT EXISTS news_tickers (
+                    news_id INTEGER NOT NULL,
+                    ticker TEXT NOT NULL,
+                    published REAL,
+                    PRIMARY KEY (ticker, news_id)
+                );
+                -- Per-ticker time-window queries are a range scan of this index
+                CREATE INDEX IF NOT EXISTS news_tickers_published ON news_tickers (ticker, published);
+                CREATE INDEX IF NOT EXISTS news_tickers_news ON news_tickers (news_id);
+                CREATE TABLE IF NOT EXISTS fetches (
+                    key TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    news_ids TEXT NOT NULL
+                );"""
+            )
+            try:
+                # Trigram tokens match inside Chinese text, which has no spaces between words
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(title, summary, tokenize='trigram')"
+                )
+            except sqlite3.OperationalError:
+                self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(title, summary)")
+
+    @staticmethod
+    def _item_key(item):
+        link = item.get("link")
+        if link and link != "No Link":
+            return link
+        return "title:" + hashlib.sha1((item.get("title") or "").lower().encode("utf-8")).hexdigest()
+
+    def add(self, items, tickers=(), fetch_key=None):
+        """
+        Stores `items` (dicts with title, link, summary, publisher and an ISO "published"),
+        tags them with `tickers` and, with `fetch_key`, records the fetch as fresh now.
+        """
+        now = time.time()
+        tickers = [t.upper() for t in tickers if t]
+        ids = []
+        with self._lock, self._conn:
+            for item in items:
+                key = self._item_key(item)
+                row = self._conn.execute("SELECT id, published FROM news WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    published = parse_time(item.get("published"))
+                    published = published.timestamp() if published else None
+                    cursor = self._conn.execute(
+                        "INSERT INTO news (key, title, link, summary, publisher, published, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            key, item.get("title") or "", item.get("link"), item.get("summary"), item.get("publisher"),
+                            published, now,
+                        ),
+                    )
+                    news_id = cursor.lastrowid
+                    self._conn.execute(
+                        "INSERT INTO news_fts (rowid, title, summary) VALUES (?, ?, ?)",
+                        (news_id, item.get("title") or "", item.get("summary") or ""),
+                    )
+                else:
+                    news_id, published = row
+                ids.append(news_id)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO news_tickers (news_id, ticker, published) VALUES (?, ?, ?)",
+                    [(news_id, ticker, published) for ticker in tickers],
+                )
+            if fetch_key is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO fetches (key, fetched_at, news_ids) VALUES (?, ?, ?)",
+                    (fetch_key, now, ",".join(map(str, ids))),
+                )
+        return ids
+
+    def fresh_fetch(self, fetch_key, ttl=None):
+        """
+        Items of the last fetch recorded under `fetch_key` if it is younger than `ttl`
+        (default NEWS_INDEX_TTL), else None.
+        """
+        ttl = news_index_ttl() if ttl is None else ttl
+        with self._lock:
+            row = self._conn.execute("SELECT fetched_at, news_ids FROM fetches WHERE key = ?", (fetch_key,)).fetchone()
+        if row is None or time.time() - row[0] >= ttl:
+            return None
+        ids = [int(i) for i in row[1].split(",") if i]
+        if not ids:
+            return []
+        return self._items(f"n.id IN ({','.join('?' * len(ids))})", ids, "n.published DESC", len(ids))
+
+    def search(self, text="", tickers=(), since=None, until=None, limit=20):
+        """
+        Items matching every term of `text` (title or summary), tagged with any of `tickers`,
+        published within [since, until] (datetimes), most recent first.
+        """
+        where, params = [], []
+        terms = FTS_TERM.findall(text or "")
+        fts_terms = [t for t in terms if len(t) >= 3]
+        if fts_terms:
+            where.append("n.id IN (SELECT rowid FROM news_fts WHERE news_fts MATCH ?)")
+            params.append(" AND ".join('"' + t.replace('"', '""') + '"' for t in fts_terms))
+        for term in terms:
+            if len(term) < 3:
+                where.append("(n.title LIKE ? OR n.summary LIKE ?)")
+                params += [f"%{term}%", f"%{term}%"]
+        if tickers:
+            # Driven by the (ticker, published) index: only the window of each ticker is read
+            window, window_params = ["ticker = ?"], []
+            if since is not None:
+                window.append("published >= ?")
+                window_params.append(since.timestamp())
+            if until is not None:
+                window.append("published <= ?")
+                window_params.append(until.timestamp())
+            subquery = " UNION ".join(f"SELECT news_id FROM news_tickers WHERE {' AND '.join(window)}" for _ in tickers)
+            where.append(f"n.id IN ({subquery})")
+            for ticker in tickers:
+                params += [ticker.upper(), *window_params]
+        else:
+            if since is not None:
+                where.append("n.published >= ?")
+                params.append(since.timestamp())
+            if until is not None:
+                where.append("n.published <= ?")
+                params.append(until.timestamp())
+        return self._items(" AND ".join(where) or "1", params, "n.published DESC", limit)
+
+    def _items(self, where, params, order, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT n.id, n.title, n.link, n.summary, n.publisher, n.published,
+                           (SELECT group_concat(ticker) FROM news_tickers WHERE news_id = n.id)
+                    FROM news n WHERE {where} ORDER BY {order} LIMIT ?""",
+                [*params, limit],
+            ).fetchall()
+        return [
+            {
+                "title": title,
+                "link": link or "No Link",
+                "summary": summary or "No Summary",
+                "publisher": publisher,
+                "published": datetime.fromtimestamp(published, tz=timezone.utc).isoformat() if published else None,
+                "tickers": tickers.split(",") if tickers else [],
+            }
+            for _, title, link, summary, publisher, published, tickers in rows
+        ]
+
+    def stats(self):
+        with self._lock:
+            items = self._conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+            tickers = self._conn.execute("SELECT COUNT(DISTINCT ticker) FROM news_tickers").fetchone()[0]
+            fetches = self._conn.execute("SELECT COUNT(*) FROM fetches").fetchone()[0]
+        return {"items": items, "tickers": tickers, "fetches": fetches}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_news_index():
+    """
+    Returns the process-wide news index, opening it on first use.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NewsIndex()
+    return _index
+
+def close_news_index():
+    global _index
+    with _index_lock:
+        index, _index = _index, None
+    if index is not None:
+        index.close()
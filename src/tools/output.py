@@ -0,0 +1,72 @@
+import math
+import os
+
+# How tool results are serialized for the LLM. "compact": fixed-schema tables with rounded
+# numbers and missing fields left out, capped news lists; "verbose": the original free-form dumps.
+TOOL_OUTPUT_MODES = ("compact", "verbose")
+
+def tool_output_mode():
+    mode = os.getenv("TOOL_OUTPUT_MODE", "compact").lower()
+    if mode not in TOOL_OUTPUT_MODES:
+        raise ValueError(f"Unknown TOOL_OUTPUT_MODE {mode!r}, expected one of {', '.join(TOOL_OUTPUT_MODES)}")
+    return mode
+
+def news_top_k():
+    return int(os.getenv("NEWS_TOP_K", "8"))
+
+def news_summary_chars():
+    return int(os.getenv("NEWS_SUMMARY_CHARS", "240"))
+
+# Formatted stand-in for missing or unusable values; `field_table` leaves these fields out
+MISSING = "-"
+
+def _finite(value):
+    # yfinance occasionally reports numeric fields as strings ("Infinity") or NaN
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+def fmt_large(value):
+    value = _finite(value)
+    if value is None:
+        return MISSING
+    for divisor, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if abs(value) >= divisor:
+            return f"{value / divisor:.2f}{suffix}"
+    return f"{value:,.0f}"
+
+def fmt_pct(value):
+    value = _finite(value)
+    return MISSING if value is None else f"{value * 100:.1f}%"
+
+def fmt_num(value):
+    value = _finite(value)
+    return MISSING if value is None else f"{value:.2f}"
+
+def fmt_text(value):
+    return MISSING if value in (None, "") else str(value)
+
+def field_table(fields):
+    """
+    One-row Markdown table of (label, formatted value) pairs; missing values are left out.
+    """
+    fields = [(label, value) for label, value in fields if value != MISSING]
+    if not fields:
+        return ""
+    return "\n".join([
+        "| " + " | ".join(label for label, _ in fields) + " |",
+        "|" + "---|" * len(fields),
+        "| " + " | ".join(value for _, value in fields) + " |",
+    ])
+
+def truncate(text, limit):
+    """
+    Cuts `text` to at most `limit` characters at a word boundary, marking the cut with "…".
+    """
+    text = " ".join((text or "").split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0] if " " in text[:limit] else text[:limit]
+    return cut.rstrip(",;:") + "…"
@@ -0,0 +1,59 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ..telemetry import instrument_tool
+from ..tracing import trace_tool
+
+# Blocking I/O tools (yfinance, DuckDuckGo) run on this bounded pool when they are
+# awaited from the async graph, so they never block the event loop and a burst of
+# concurrent research runs cannot spawn an unbounded number of threads.
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """
+    Returns the process-wide tool thread pool, sized by TOOL_MAX_WORKERS (default 8).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("TOOL_MAX_WORKERS", "8")),
+                thread_name_prefix="tool",
+            )
+    return _executor
+
+def shutdown_tool_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_in_tool_pool(func, *args, **kwargs):
+    """
+    Runs a blocking callable on the tool pool and awaits its result.
+    The caller's context variables are propagated into the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_tool_executor(), call)
+
+def offload_to_pool(structured_tool):
+    """
+    Gives a synchronous `@tool` an async implementation that runs it on the tool pool.
+    Use it above the `@tool` decorator. Both paths record the call's latency and errors
+    and run it in a "tool" span of the current trace.
+    """
+    name = structured_tool.name
+    func = structured_tool.func = instrument_tool(name, trace_tool(name, structured_tool.func))
+
+    async def _coroutine(*args, **kwargs):
+        return await run_in_tool_pool(func, *args, **kwargs)
+
+    structured_tool.coroutine = _coroutine
+    return structured_tool
@@ -0,0 +1,302 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from ..utils import get_data_dir
+from .cassette import get_cassette
+from .run_scope import get_ticker, record_upstream
+from .upstream import YAHOO, upstream, yahoo_session
+
+# One fixed-size little-endian record per bar; files are append-only arrays of these
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),  # bar start, UTC nanoseconds
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+PERIOD_DAYS = {"1mo": 30, "3mo": 91, "6mo": 182, "1y": 365, "2y": 730, "5y": 1826, "10y": 3652}
+# Periods measured in trading sessions rather than calendar days (so "1d" works on weekends)
+PERIOD_SESSIONS = {"1d": 1, "5d": 5}
+# Intraday interval -> how far back Yahoo serves it (days)
+INTRADAY_MAX_DAYS = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "60m": 730, "90m": 60, "1h": 730}
+
+# A revised overlapping bar that moves more than this means the history was re-adjusted
+# (split/dividend with auto_adjust), so the stored series is refetched instead of appended to
+ADJUSTMENT_TOLERANCE = 0.005
+
+def download_history(ticker, interval="1d", period=None, start=None):
+    """
+    Raw yfinance fetch used by the store: either a whole `period` or everything since `start`.
+    """
+    kwargs = {"start": start} if start is not None else {"period": period}
+
+    def fetch():
+        record_upstream("yahoo_history")
+        return upstream(YAHOO).call(get_ticker(ticker).history, interval=interval, **kwargs)
+    return get_cassette().history(ticker, interval, fetch, **kwargs)
+
+def download_histories(tickers, interval="1d", period=None, start=None):
+    """
+    Batched variant of `download_history` using a single `yf.download` call.
+    """
+    kwargs = {"start": start} if start is not None else {"period": period}
+    cassette = get_cassette()
+    if cassette.mode == "replay":
+        return {ticker: cassette.replay_history(ticker, interval, **kwargs) for ticker in tickers}
+    record_upstream("yahoo_history")
+    frame = upstream(YAHOO).call(
+        yf.download, list(tickers), interval=interval, group_by="ticker",
+        auto_adjust=True, threads=True, progress=False, session=yahoo_session(), **kwargs,
+    )
+    histories = {}
+    for ticker in tickers:
+        if frame is not None and not frame.empty and ticker in frame.columns.get_level_values(0):
+            histories[ticker] = frame[ticker].dropna(how="all")
+        else:
+            histories[ticker] = pd.DataFrame()
+        if cassette.mode == "record":
+            cassette.record_history(ticker, interval, histories[ticker])
+    return histories
+
+def period_start(period, now=None):
+    """
+    Calendar cutoff for a yfinance period string, or None for "max"/session-based periods.
+    """
+    now = now or datetime.now(timezone.utc)
+    if period == "ytd":
+        return datetime(now.year, 1, 1, tzinfo=timezone.utc)
+    if period in PERIOD_DAYS:
+        return now - timedelta(days=PERIOD_DAYS[period])
+    return None
+
+def _to_records(frame):
+    if frame is None or frame.empty:
+        return np.empty(0, dtype=BAR_DTYPE)
+    index = frame.index if frame.index.tz is not None else frame.index.tz_localize("UTC")
+    records = np.empty(len(frame), dtype=BAR_DTYPE)
+    records["ts"] = index.tz_convert("UTC").as_unit("ns").asi8
+    for field, column in zip(BAR_DTYPE.names[1:], COLUMNS):
+        records[field] = frame[column].to_numpy(dtype=float)
+    return records
+
+class PriceStore:
+    """
+    Local OHLCV store with one append-only binary file per (ticker, interval).
+
+    Each file is a flat array of `BAR_DTYPE` records, so reading is a single
+    `np.fromfile` and updating appends only the bars newer than the last stored one
+    (the last bar itself is re-fetched because it may still be forming; readers keep
+    the latest copy of a timestamp). Period queries are answered by slicing locally;
+    data older than what was ever fetched is backfilled once.
+    """
+
+    def __init__(self, root=None, min_refresh=None):
+        self.root = root or get_data_dir("prices")
+        self.min_refresh = min_refresh if min_refresh is not None else int(os.getenv("PRICE_STORE_MIN_REFRESH", "60"))
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self.stats = {"full_fetches": 0, "delta_fetches": 0, "bars_appended": 0}
+
+    def _paths(self, ticker, interval):
+        directory = os.path.join(self.root, interval)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, ticker.upper())
+        return f"{base}.bin", f"{base}.json"
+
+    def _lock(self, ticker, interval):
+        with self._locks_lock:
+            return self._locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, meta_path, meta):
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _read_records(self, data_path, compact=False):
+        """
+        Stored bars, keeping the last written copy of each timestamp, in time order. With
+        `compact` (only under the ticker's lock) a file with many superseded copies is rewritten.
+        """
+        if not os.path.exists(data_path):
+            return np.empty(0, dtype=BAR_DTYPE)
+        records = np.fromfile(data_path, dtype=BAR_DTYPE)
+        _, last_index = np.unique(records["ts"][::-1], return_index=True)
+        deduped = records[::-1][last_index]
+        if compact and len(records) - len(deduped) > 64:
+            self._rewrite(data_path, deduped)
+        return deduped
+
+    def _rewrite(self, data_path, records):
+        tmp_path = f"{data_path}.tmp"
+        records.tofile(tmp_path)
+        os.replace(tmp_path, data_path)
+
+    def _append(self, data_path, records):
+        if len(records):
+            with open(data_path, "ab") as f:
+                f.write(records.tobytes())
+            self.stats["bars_appended"] += len(records)
+
+    def read(self, ticker, interval="1d"):
+        """
+        Returns every stored bar as an OHLCV DataFrame in the exchange timezone.
+        """
+        with self._lock(ticker, interval):
+            return self._read(ticker, interval)
+
+    def _read(self, ticker, interval):
+        data_path, meta_path = self._paths(ticker, interval)
+        records = self._read_records(data_path, compact=True)
+        tz = self._read_meta(meta_path).get("tz", "UTC")
+        index = pd.to_datetime(records["ts"], utc=True).tz_convert(tz)
+        frame = pd.DataFrame({c: records[f] for f, c in zip(BAR_DTYPE.names[1:], COLUMNS)}, index=index)
+        frame.index.name = "Date"
+        return frame
+
+    def _needs_backfill(self, meta, period):
+        if not meta:
+            return True
+        covered = meta.get("start")
+        if covered == "max":
+            return False
+        if period == "max":
+            return True
+        start = period_start(period)
+        return start is not None and covered is not None and start.timestamp() < covered
+
+    def _replace(self, ticker, interval, frame, period):
+        data_path, meta_path = self._paths(ticker, interval)
+        records = _to_records(frame)
+        self._rewrite(data_path, records)
+        self.stats["full_fetches"] += 1
+        start = period_start(period)
+        covered = "max" if period == "max" else (
+            start.timestamp() if start is not None else (records["ts"][0] / 1e9 if len(records) else time.time())
+        )
+        tz = str(frame.index.tz) if frame is not None and not frame.empty and frame.index.tz is not None else "UTC"
+        self._write_meta(meta_path, {"start": covered, "tz": tz, "checked_at": time.time()})
+
+    def _apply_delta(self, ticker, interval, frame, period):
+        """
+        Appends fetched bars that are at or after the last stored bar. Returns False when the
+        overlap shows the history was re-adjusted and a full refetch is required.
+        """
+        data_path, meta_path = self._paths(ticker, interval)
+        stored = self._read_records(data_path)
+        fetched = _to_records(frame)
+        meta = self._read_meta(meta_path)
+        if len(stored) and len(fetched):
+            last = stored[-1]
+            overlap = fetched[fetched["ts"] == last["ts"]]
+            if len(overlap) and abs(overlap[0]["open"] / last["open"] - 1) > ADJUSTMENT_TOLERANCE:
+                return False
+            # The re-fetched last bar is only written again if it changed (it was still forming)
+            revised = overlap[-1:] if len(overlap) and overlap[-1].tobytes() != last.tobytes() else overlap[:0]
+            self._append(data_path, np.concatenate([revised, fetched[fetched["ts"] > last["ts"]]]))
+        else:
+            self._append(data_path, fetched)
+        self.stats["delta_fetches"] += 1
+        meta["checked_at"] = time.time()
+        self._write_meta(meta_path, meta)
+        return True
+
+    def _plan(self, ticker, interval, period):
+        """
+        Returns ("full", None), ("delta", start) or ("fresh", None) for one ticker.
+        """
+        data_path, meta_path = self._paths(ticker, interval)
+        meta = self._read_meta(meta_path)
+        if self._needs_backfill(meta, period) or not os.path.exists(data_path):
+            return "full", None
+        if time.time() - meta.get("checked_at", 0) < self.min_refresh:
+            return "fresh", None
+        records = self._read_records(data_path)
+        if not len(records):
+            return "full", None
+        last = pd.Timestamp(records["ts"][-1], unit="ns", tz="UTC")
+        if interval in INTRADAY_MAX_DAYS:
+            # Gaps older than Yahoo's intraday retention cannot be filled incrementally
+            if pd.Timestamp.now(tz="UTC") - last > pd.Timedelta(days=INTRADAY_MAX_DAYS[interval] - 1):
+                return "full", None
+            return "delta", last
+        return "delta", last.tz_convert(meta.get("tz", "UTC")).normalize()
+
+    def get(self, ticker, period="1y", interval="1d"):
+        """
+        Returns OHLCV bars for `period`, fetching only bars missing from the local store.
+        """
+        with self._lock(ticker, interval):
+            action, start = self._plan(ticker, interval, period)
+            if action == "delta":
+                if not self._apply_delta(ticker, interval, download_history(ticker, interval, start=start), period):
+                    action = "full"
+            if action == "full":
+                self._replace(ticker, interval, download_history(ticker, interval, period=period), period)
+            return self.slice(self._read(ticker, interval), period)
+
+    def get_many(self, tickers, period="1y", interval="1d"):
+        """
+        Batched `get`: at most one download for tickers that need a full fetch and one for
+        the deltas of all the others (from the oldest last bar among them).
+        """
+        plans = {}
+        for ticker in tickers:
+            with self._lock(ticker, interval):
+                plans[ticker] = self._plan(ticker, interval, period)
+        full = [t for t, (action, _) in plans.items() if action == "full"]
+        delta = {t: start for t, (action, start) in plans.items() if action == "delta"}
+
+        if delta:
+            start = min(s.tz_convert("UTC") for s in delta.values())
+            frames = download_histories(list(delta), interval, start=start)
+            for ticker in delta:
+                with self._lock(ticker, interval):
+                    if not self._apply_delta(ticker, interval, frames.get(ticker), period):
+                        full.append(ticker)
+        if full:
+            frames = download_histories(full, interval, period=period)
+            for ticker in full:
+                with self._lock(ticker, interval):
+                    self._replace(ticker, interval, frames.get(ticker), period)
+        return {ticker: self.slice(self.read(ticker, interval), period) for ticker in tickers}
+
+    @staticmethod
+    def slice(frame, period):
+        if frame.empty or period == "max":
+            return frame
+        if period in PERIOD_SESSIONS:
+            sessions = pd.Index(frame.index.normalize()).unique()
+            return frame[frame.index.normalize() >= sessions[-PERIOD_SESSIONS[period]:][0]]
+        start = period_start(period)
+        if start is None:
+            return frame
+        return frame[frame.index >= pd.Timestamp(start).tz_convert(frame.index.tz)]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_price_store():
+    """
+    Returns the process-wide price store.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore()
+    return _store
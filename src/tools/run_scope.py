@@ -0,0 +1,148 @@
+import contextlib
+import contextvars
+import functools
+import threading
+import yfinance as yf
+from .. import telemetry
+from .upstream import yahoo_session
+
+class _Entry:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class RunScope:
+    """
+    Memo shared by every node of one graph execution.
+
+    Each (function, arguments) pair executes at most once per run: the first caller
+    computes the result and concurrent callers (the analysts run in parallel threads)
+    wait for it. Calls that raise, or whose result `keep(result)` rejects, are not memoized,
+    so a later call retries. The scope also shares `yf.Ticker` objects and counts the
+    upstream requests made during the run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._tickers = {}
+        self.upstream_calls = {}
+        self.memo_hits = 0
+
+    def call(self, key, func, keep=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+            else:
+                self.memo_hits += 1
+        if owner:
+            try:
+                entry.value = func()
+                if keep is not None and not keep(entry.value):
+                    # Concurrent callers share this attempt; later ones retry
+                    with self._lock:
+                        del self._entries[key]
+            except BaseException as e:
+                entry.error = e
+                with self._lock:
+                    del self._entries[key]
+            finally:
+                entry.done.set()
+        else:
+            entry.done.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.value
+
+    def ticker(self, symbol):
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+            if ticker is None:
+                ticker = self._tickers[symbol] = yf.Ticker(symbol, session=yahoo_session())
+        return ticker
+
+    def record_upstream(self, name, count=1):
+        with self._lock:
+            self.upstream_calls[name] = self.upstream_calls.get(name, 0) + count
+
+    def stats(self):
+        with self._lock:
+            return dict(self.upstream_calls)
+
+_current = contextvars.ContextVar("run_scope", default=None)
+
+@contextlib.contextmanager
+def run_scope():
+    """
+    Opens a run scope for one graph execution. Nodes, tools and the tool pool inherit it
+    through the context, so enter it around `graph.invoke` / `graph.astream`.
+    """
+    scope = RunScope()
+    token = _current.set(scope)
+    try:
+        # Per-node latency, token and upstream totals of the run, see src/telemetry.py
+        with telemetry.run_timings():
+            yield scope
+    finally:
+        _current.reset(token)
+
+def current_run_scope():
+    return _current.get()
+
+def is_failed_result(result):
+    """
+    True for the messages data tools return instead of raising ("Error ...", "No price data
+    found ..."), which may be transient and must not be served for the rest of the run.
+    """
+    return isinstance(result, str) and (result.startswith("Error") or "No price data found" in result)
+
+def memoize_in_run(key=None):
+    """
+    Decorator: within a run scope, calls with the same (normalized) arguments execute once
+    and share the result; outside a scope the function runs as usual.
+    `key(*args, **kwargs)` normalizes the arguments (e.g. upper-cases tickers). Failed
+    results (see `is_failed_result`) are returned but not memoized, like exceptions.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            scope = _current.get()
+            if scope is None:
+                return func(*args, **kwargs)
+            args_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return scope.call(
+                (func.__qualname__, _hashable(args_key)), lambda: func(*args, **kwargs),
+                keep=lambda result: not is_failed_result(result),
+            )
+        return wrapper
+    return decorator
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+def get_ticker(symbol):
+    """
+    Returns the run's shared `yf.Ticker` for `symbol` (a new one outside a run scope).
+    """
+    scope = _current.get()
+    return scope.ticker(symbol.upper()) if scope is not None else yf.Ticker(symbol, session=yahoo_session())
+
+def record_upstream(name, count=1):
+    """
+    Counts a request to an upstream service (Yahoo Finance, DuckDuckGo) against the current run.
+    """
+    telemetry.record_upstream(name, count)
+    scope = _current.get()
+    if scope is not None:
+        scope.record_upstream(name, count)
+
+def upstream_calls():
+    scope = _current.get()
+    return scope.stats() if scope is not None else None
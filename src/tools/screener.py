@@ -0,0 +1,463 @@
+"""
+Cross-sectional stock screener over a pre-built universe (S&P 500, TWSE, ...).
+
+A universe is refreshed by a batch job and stored under DATA_DIR/screener/<universe>
+as one NumPy column per field, which requests open with `mmap_mode="r"`: screening
+is a handful of vectorized comparisons over already-mapped arrays.
+
+    python -m src.tools.screener refresh sp500
+    python -m src.tools.screener refresh twse
+    python -m src.tools.screener refresh mylist --tickers-file tickers.txt
+    python -m src.tools.screener screen sp500 "industry ~ semiconductor, revenue_growth > 20%" --sort pe
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from urllib.parse import urlparse
+import numpy as np
+import pandas as pd
+from langchain_core.tools import tool
+from ..utils import get_data_dir
+from .market_data import fetch_info, fetch_histories
+from .pool import offload_to_pool
+from .upstream import http_session, upstream
+
+logger = logging.getLogger(__name__)
+
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+TWSE_URL = "https://openapi.twse.com.tw/v1/exchangeReport/STOCK_DAY_ALL"
+
+# Numeric column -> yfinance `info` key. Ratios are stored as fractions (0.2 == 20%).
+FUNDAMENTALS = {
+    "price": "currentPrice",
+    "market_cap": "marketCap",
+    "pe": "trailingPE",
+    "forward_pe": "forwardPE",
+    "peg": "trailingPegRatio",
+    "pb": "priceToBook",
+    "ps": "priceToSalesTrailing12Months",
+    "ev_ebitda": "enterpriseToEbitda",
+    "revenue_growth": "revenueGrowth",
+    "earnings_growth": "earningsGrowth",
+    "gross_margin": "grossMargins",
+    "operating_margin": "operatingMargins",
+    "profit_margin": "profitMargins",
+    "roe": "returnOnEquity",
+    "debt_to_equity": "debtToEquity",
+    "dividend_yield": "dividendYield",
+    "beta": "beta",
+}
+# Derived from the daily closes at refresh time
+PRICE_COLUMNS = ("return_1m", "return_3m", "return_1y", "volatility_3m", "pct_from_high")
+TEXT_COLUMNS = {"name": "shortName", "sector": "sector", "industry": "industry"}
+PERCENT_COLUMNS = {
+    "revenue_growth", "earnings_growth", "gross_margin", "operating_margin", "profit_margin",
+    "roe", "dividend_yield", "return_1m", "return_3m", "return_1y", "volatility_3m", "pct_from_high",
+}
+ALIASES = {"p/e": "pe", "pe_ratio": "pe", "mcap": "market_cap", "cap": "market_cap", "yield": "dividend_yield"}
+# Columns shown for every match, in addition to the ones used by the filters/sort
+DEFAULT_COLUMNS = ("price", "market_cap", "pe")
+
+SUFFIXES = {"%": 0.01, "k": 1e3, "m": 1e6, "b": 1e9, "t": 1e12}
+CONDITION = re.compile(r"^\s*([\w/]+)\s*(<=|>=|!=|==|=|<|>|~)\s*(.+?)\s*$")
+RETURN_WINDOW = re.compile(r"^return_(\d+)d$")
+
+# Filter parsing
+
+def _column_name(name):
+    name = name.strip().lower()
+    return ALIASES.get(name, name)
+
+def _number(text):
+    text = text.strip().replace(",", "").replace("$", "")
+    scale = SUFFIXES.get(text[-1:].lower(), 1)
+    if scale != 1:
+        text = text[:-1]
+    return float(text) * scale
+
+def parse_filters(filters):
+    """
+    Parses "field op value" conditions separated by commas, semicolons or "and".
+    Returns a list of (column, op, value) tuples; raises ValueError on bad input.
+    """
+    conditions = []
+    for term in re.split(r",|;|\s+and\s+", filters or "", flags=re.IGNORECASE):
+        if not term.strip():
+            continue
+        match = CONDITION.match(term)
+        if not match:
+            raise ValueError(f"Cannot parse screen condition '{term.strip()}' (expected e.g. 'pe < 20')")
+        column, op, value = match.groups()
+        column = _column_name(column)
+        op = "=" if op == "==" else op
+        if column in TEXT_COLUMNS:
+            if op not in ("=", "!=", "~"):
+                raise ValueError(f"Text field '{column}' only supports =, != and ~")
+            conditions.append((column, op, value.strip("'\" ").lower()))
+        else:
+            if op == "~":
+                raise ValueError(f"'~' only applies to text fields ({', '.join(TEXT_COLUMNS)})")
+            try:
+                conditions.append((column, op, _number(value)))
+            except ValueError:
+                raise ValueError(f"'{value}' is not a number (condition '{term.strip()}')") from None
+    return conditions
+
+def parse_sort(sort_by):
+    """
+    "pe" / "pe asc" -> ("pe", False); "-market_cap" / "market_cap desc" -> ("market_cap", True).
+    """
+    sort_by = (sort_by or "").strip()
+    if not sort_by:
+        return None, False
+    parts = sort_by.split()
+    descending = parts[0].startswith("-") or (len(parts) > 1 and parts[1].lower() == "desc")
+    return _column_name(parts[0].lstrip("-+")), descending
+
+# Memory-mapped universe
+
+class Universe:
+    """
+    A read-only view of one refreshed universe; numeric columns and the
+    (sessions x tickers) close matrix are memory-mapped, text columns are held in memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.name = meta["universe"]
+        self.refreshed_at = meta["refreshed_at"]
+        self.tickers = np.array(meta["tickers"])
+        self.text = {column: np.array(meta["text"][column], dtype=object) for column in TEXT_COLUMNS}
+        self._lower = {column: np.char.lower(values.astype(str)) for column, values in self.text.items()}
+        self.columns = {
+            column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode="r")
+            for column in meta["columns"]
+        }
+        self.closes = np.load(os.path.join(directory, "closes.npy"), mmap_mode="r")
+        self.dates = np.load(os.path.join(directory, "dates.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def column(self, name):
+        """
+        Returns a numeric column; `return_<N>d` is computed from the mapped closes.
+        """
+        if name in self.columns:
+            return self.columns[name]
+        window = RETURN_WINDOW.match(name)
+        if window:
+            n = min(int(window.group(1)), len(self.closes) - 1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return self.closes[-1] / self.closes[-1 - n] - 1.0 if n > 0 else np.full(len(self), np.nan)
+        raise ValueError(f"Unknown screen field '{name}'. Available: {', '.join(available_fields())}")
+
+    def mask(self, conditions):
+        mask = np.ones(len(self), dtype=bool)
+        for column, op, value in conditions:
+            if column in TEXT_COLUMNS:
+                values = self._lower[column]
+                if op == "~":
+                    mask &= np.char.find(values, value) >= 0
+                elif op == "=":
+                    mask &= values == value
+                else:
+                    mask &= values != value
+                continue
+            values = self.column(column)
+            with np.errstate(invalid="ignore"):
+                if op == "<":
+                    hit = values < value
+                elif op == "<=":
+                    hit = values <= value
+                elif op == ">":
+                    hit = values > value
+                elif op == ">=":
+                    hit = values >= value
+                elif op == "=":
+                    hit = values == value
+                else:
+                    hit = values != value
+            mask &= hit & ~np.isnan(values)
+        return mask
+
+    def screen(self, filters="", sort_by="", limit=20):
+        """
+        Applies `filters` and returns (matches, total_matches), where matches is a DataFrame
+        of the first `limit` rows ordered by `sort_by` (missing values last).
+        """
+        conditions = parse_filters(filters)
+        sort_column, descending = parse_sort(sort_by)
+        index = np.flatnonzero(self.mask(conditions))
+        if sort_column:
+            keys = np.asarray(self.column(sort_column))[index]
+            keys = -keys if descending else keys
+            index = index[np.argsort(np.where(np.isnan(keys), np.inf, keys), kind="stable")]
+        total = len(index)
+        index = index[:limit]
+
+        shown = list(dict.fromkeys(
+            [*DEFAULT_COLUMNS, *(c for c, _, _ in conditions if c not in TEXT_COLUMNS), *([sort_column] if sort_column else [])]
+        ))
+        frame = pd.DataFrame({"ticker": self.tickers[index]})
+        for column in TEXT_COLUMNS:
+            frame[column] = self.text[column][index]
+        for column in shown:
+            frame[column] = np.asarray(self.column(column))[index]
+        return frame, total
+
+def available_fields():
+    return [*FUNDAMENTALS, *PRICE_COLUMNS, "return_<N>d", *TEXT_COLUMNS]
+
+def _universe_root(universe, root=None):
+    return os.path.join(root or get_data_dir("screener"), universe)
+
+_universes = {}
+_universes_lock = threading.Lock()
+
+def get_universe(universe, root=None):
+    """
+    Returns the latest refreshed `Universe`, or None if it has never been refreshed.
+    Re-opens the universe when a batch refresh has published a new version.
+    """
+    base = _universe_root(universe, root)
+    try:
+        with open(os.path.join(base, "CURRENT")) as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    with _universes_lock:
+        cached = _universes.get(base)
+        if cached is None or cached[0] != version:
+            cached = (version, Universe(os.path.join(base, version)))
+            _universes[base] = cached
+        return cached[1]
+
+# Batch refresh (never on the request path)
+
+def _get(url):
+    def fetch():
+        response = http_session().get(url, timeout=30)
+        # 429/5xx raise here so the upstream client retries them
+        response.raise_for_status()
+        return response
+    return upstream(urlparse(url).hostname).call(fetch)
+
+def _sp500_tickers():
+    html = _get(SP500_URL).text
+    table = pd.read_html(StringIO(html), attrs={"id": "constituents"})[0]
+    # Yahoo uses dashes for share classes (BRK.B -> BRK-B)
+    return [str(symbol).replace(".", "-") for symbol in table["Symbol"]]
+
+def _twse_tickers():
+    rows = _get(TWSE_URL).json()
+    # Ordinary shares have 4-digit codes; ETFs, warrants etc. are skipped
+    return [f"{row['Code']}.TW" for row in rows if re.fullmatch(r"\d{4}", row.get("Code", ""))]
+
+UNIVERSES = {"sp500": _sp500_tickers, "twse": _twse_tickers}
+
+def load_tickers_file(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.split("#")[0].strip().upper() for line in f if line.split("#")[0].strip()]
+
+def _safe_info(ticker):
+    try:
+        return fetch_info(ticker) or {}
+    except Exception as e:
+        logger.info("Screener: no info for %s: %s", ticker, e)
+        return {}
+
+def _close_matrix(histories, tickers):
+    # Sessions x tickers, aligned on calendar dates across exchanges and forward-filled
+    closes = {}
+    for ticker in tickers:
+        history = histories.get(ticker)
+        if history is not None and not history.empty:
+            series = history["Close"]
+            index = series.index.tz_localize(None) if series.index.tz is not None else series.index
+            closes[ticker] = pd.Series(series.to_numpy(dtype=float), index=index.normalize()).groupby(level=0).last()
+    frame = pd.DataFrame(closes).reindex(columns=tickers).sort_index().ffill()
+    return frame
+
+def _price_columns(closes):
+    values = closes.to_numpy(dtype=float)
+    if not len(values):
+        return {column: np.full(closes.shape[1], np.nan) for column in PRICE_COLUMNS}
+    last = values[-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        first = values[np.argmax(~np.isnan(values), axis=0), np.arange(values.shape[1])]
+        log_returns = np.diff(np.log(values[-64:]), axis=0)
+        return {
+            "return_1m": last / values[max(-22, -len(values))] - 1.0,
+            "return_3m": last / values[max(-64, -len(values))] - 1.0,
+            "return_1y": last / first - 1.0,
+            "volatility_3m": np.nanstd(log_returns, axis=0, ddof=1) * np.sqrt(252) if len(log_returns) > 1 else np.full(len(last), np.nan),
+            "pct_from_high": last / np.nanmax(values, axis=0) - 1.0,
+        }
+
+def write_universe(universe, tickers, infos, closes, root=None):
+    """
+    Publishes a new version of `universe` from per-ticker `info` dicts and a
+    (dates x tickers) close DataFrame. Readers switch over atomically via CURRENT.
+    """
+    base = _universe_root(universe, root)
+    version = f"v{int(time.time() * 1000)}"
+    directory = os.path.join(base, version)
+    os.makedirs(directory)
+
+    columns = {}
+    for column, key in FUNDAMENTALS.items():
+        columns[column] = np.array([_as_float(info.get(key)) for info in infos], dtype=float)
+    # yfinance reports dividendYield in percent; keep every ratio as a fraction
+    columns["dividend_yield"] = columns["dividend_yield"] / 100.0
+    columns.update(_price_columns(closes))
+    for column, values in columns.items():
+        np.save(os.path.join(directory, f"{column}.npy"), values)
+    np.save(os.path.join(directory, "closes.npy"), closes.to_numpy(dtype=np.float64))
+    np.save(os.path.join(directory, "dates.npy"), closes.index.to_numpy(dtype="datetime64[D]"))
+
+    meta = {
+        "universe": universe,
+        "refreshed_at": time.time(),
+        "tickers": list(tickers),
+        "columns": list(columns),
+        "text": {column: [str(info.get(key) or "") for info in infos] for column, key in TEXT_COLUMNS.items()},
+    }
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    tmp_path = os.path.join(base, "CURRENT.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(base, "CURRENT"))
+
+    # Keep the previous version for readers that opened it just before the switch
+    versions = sorted(v for v in os.listdir(base) if v.startswith("v"))
+    for old in versions[:-2]:
+        shutil.rmtree(os.path.join(base, old), ignore_errors=True)
+    return get_universe(universe, root)
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def refresh_universe(universe, tickers=None, root=None, workers=None):
+    """
+    Downloads fundamentals and one year of daily closes for every ticker in `universe`
+    and publishes them. `tickers` overrides the built-in constituent lists.
+    """
+    if tickers is None:
+        if universe not in UNIVERSES:
+            raise ValueError(f"Unknown universe '{universe}'; pass a tickers file for custom universes")
+        tickers = UNIVERSES[universe]()
+    tickers = list(dict.fromkeys(tickers))
+    workers = workers or int(os.getenv("SCREENER_REFRESH_WORKERS", "8"))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screener-refresh") as pool:
+        infos = list(pool.map(_safe_info, tickers))
+    closes = _close_matrix(fetch_histories(tickers, period="1y"), tickers)
+    return write_universe(universe, tickers, infos, closes, root=root)
+
+# Presentation / tool
+
+def _fmt(column, value):
+    if value != value:
+        return "-"
+    if column in PERCENT_COLUMNS or RETURN_WINDOW.match(column):
+        return f"{value * 100:.1f}%"
+    if column == "market_cap":
+        for scale, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+            if abs(value) >= scale:
+                return f"{value / scale:.2f}{suffix}"
+    return f"{value:.2f}"
+
+def format_screen(universe, frame, total):
+    """
+    Renders screen results as a Markdown table with a one-line summary.
+    """
+    as_of = time.strftime("%Y-%m-%d", time.localtime(universe.refreshed_at))
+    header = f"{total} of {len(universe)} {universe.name} stocks match (data as of {as_of})."
+    if frame.empty:
+        return header
+    numeric = [c for c in frame.columns if c not in ("ticker", *TEXT_COLUMNS)]
+    columns = ["ticker", "name", "industry", *numeric]
+    rows = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for record in frame.to_dict("records"):
+        cells = [str(record[c]) if c in ("ticker", *TEXT_COLUMNS) else _fmt(c, record[c]) for c in columns]
+        rows.append("| " + " | ".join(cells) + " |")
+    return header + "\n\n" + "\n".join(rows)
+
+def default_universe():
+    return os.getenv("SCREENER_UNIVERSE", "sp500")
+
+def run_screen(filters, sort_by="", limit=10, universe=None):
+    """
+    Screens `universe` and returns (tickers, markdown); raises ValueError on bad
+    filters and LookupError when the universe has not been refreshed yet.
+    """
+    universe = universe or default_universe()
+    data = get_universe(universe)
+    if data is None:
+        raise LookupError(
+            f"The '{universe}' universe has not been built yet; run `python -m src.tools.screener refresh {universe}`."
+        )
+    frame, total = data.screen(filters, sort_by, limit)
+    return list(frame["ticker"]), format_screen(data, frame, total)
+
+@offload_to_pool
+@tool
+def screen_stocks(filters: str, sort_by: str = "", limit: int = 10, universe: str = "") -> str:
+    """
+    Screens a whole stock universe (default S&P 500; "twse" for Taiwan listings) and returns the matches.
+
+    Args:
+        filters: Conditions separated by commas, e.g. "industry ~ semiconductor, revenue_growth > 20%, pe < 40".
+            Numeric fields: price, market_cap, pe, forward_pe, peg, pb, ps, ev_ebitda, revenue_growth,
+            earnings_growth, gross_margin, operating_margin, profit_margin, roe, debt_to_equity,
+            dividend_yield, beta, return_1m, return_3m, return_1y, return_<N>d, volatility_3m, pct_from_high.
+            Operators: < <= > >= = !=. Ratios accept percentages ("20%"), sizes accept K/M/B/T ("10B").
+            Text fields (sector, industry, name): "=" exact, "~" contains, case-insensitive.
+        sort_by: Field to rank by; prefix with "-" for descending (e.g. "pe" = cheapest first, "-market_cap").
+        limit: Maximum number of rows to return.
+        universe: Universe name; empty for the default.
+    """
+    try:
+        _, table = run_screen(filters, sort_by, max(1, min(limit, 50)), universe or None)
+        return table
+    except (ValueError, LookupError) as e:
+        return f"Screen failed: {e}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.tools.screener", description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    refresh = commands.add_parser("refresh", help="Rebuild a universe (batch job)")
+    refresh.add_argument("universe", help=f"One of {', '.join(UNIVERSES)} or any name with --tickers-file")
+    refresh.add_argument("--tickers-file", help="Newline-separated tickers for a custom universe")
+    refresh.add_argument("--workers", type=int, default=None)
+    screen = commands.add_parser("screen", help="Run a screen from the command line")
+    screen.add_argument("universe")
+    screen.add_argument("filters")
+    screen.add_argument("--sort", default="")
+    screen.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        tickers = load_tickers_file(args.tickers_file) if args.tickers_file else None
+        started = time.time()
+        universe = refresh_universe(args.universe, tickers=tickers, workers=args.workers)
+        print(f"Refreshed {universe.name}: {len(universe)} tickers in {time.time() - started:.1f}s -> {universe.directory}")
+    else:
+        print(run_screen(args.filters, args.sort, args.limit, args.universe)[1])
+
+if __name__ == "__main__":
+    main()
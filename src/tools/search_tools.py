@@ -1,4 +1,8 @@
+import logging
+import os
 import sys
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 try:
     import duckduckgo_search
     # Shim ddgs for langchain_community
@@ -9,63 +13,134 @@ except ImportError:
 
 from langchain_core.tools import tool
 from langchain_community.tools import DuckDuckGoSearchResults
+from .output import news_summary_chars, news_top_k, tool_output_mode, truncate
+from .cassette import get_cassette
+from .pool import offload_to_pool
+from .run_scope import get_ticker, memoize_in_run, record_upstream
+from .news_dedup import dedup_news, news_dedup_enabled
+from .news_index import get_news_index, news_index_window_days
+from .symbols import get_symbol_index, validate_tickers
+from .upstream import DUCKDUCKGO, YAHOO, upstream
 
+logger = logging.getLogger(__name__)
+
+@offload_to_pool
 @tool
 def search_news(query: str) -> str:
     """
     Searches for news about a company using Yahoo Finance.
     Input should be a stock ticker symbol (e.g., 'TSM', 'NVDA', '2330.TW').
     """
-    # Set User-Agent to avoid 403 errors from Yahoo Finance
-    import os
-    import yfinance as yf
-    os.environ["USER_AGENT"] = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    
+    return fetch_ticker_news(query)
+
+@memoize_in_run(key=lambda query: (query or "").strip().upper())
+def fetch_ticker_news(query: str) -> str:
+    """
+    Plain-function body of `search_news`, also used by the prefetch node.
+    """
+    symbols = validate_tickers([query])
+    if not symbols:
+        return f"Invalid ticker symbol: {query}. Use `web_search` for free-text queries."
+    query = symbols[0]
     try:
-        print(f"DEBUG: Searching Yahoo Finance for '{query}'")
-        ticker = yf.Ticker(query)
-        news = ticker.news
+        index = get_news_index()
+        items = index.fresh_fetch(f"ticker:{query}")
+        if items is not None:
+            # Fetched recently: answer from the local index, adding older items seen for the ticker
+            since = datetime.now(timezone.utc) - timedelta(days=news_index_window_days())
+            links = {item["link"] for item in items}
+            items += [item for item in index.search(tickers=[query], since=since, limit=100) if item["link"] not in links]
+        else:
+            logger.debug("Searching Yahoo Finance for %r", query)
+            # The run's shared Ticker object, possibly already used by the data tools
+            def fetch():
+                record_upstream("yahoo_news")
+                return upstream(YAHOO).call(lambda: get_ticker(query).news)
+            news = get_cassette().call("news", query, fetch)
+            items = _parse_news(news or [])
+            index.add(items, tickers=[query], fetch_key=f"ticker:{query}")
         
         # Format the results for the LLM
-        formatted_results = ""
-        if news:
-            for item in news:
-                if not item:
-                    continue
-                # Handle nested content structure if present
-                # Use try-except for safety if item is not a dict
-                try:
-                    content = item.get('content', item)
-                except AttributeError:
-                    print(f"DEBUG: Item is not a dict: {item}")
-                    continue
-                    
-                if content is None:
-                    content = item
-                
-                title = content.get('title', 'No Title')
-                
-                # Link might be in clickThroughUrl or link
-                link = content.get('link')
-                if not link and 'clickThroughUrl' in content:
-                    click_through = content['clickThroughUrl']
-                    if click_through:
-                        link = click_through.get('url')
-                if not link:
-                    link = 'No Link'
-                    
-                summary = content.get('summary', 'No Summary')
-                
-                formatted_results += f"Title: {title}\nLink: {link}\nSummary: {summary}\n---\n"
-        else:
-            formatted_results = "No news found."
+        if news_dedup_enabled():
+            items = dedup_news(items, terms=[query, *get_symbol_index().aliases(query)])
+        formatted_results = _format_news(items) if items else "No news found."
             
-        print(f"DEBUG: Found {len(formatted_results)} characters of results.")
+        logger.debug("Found %d characters of news for %s", len(formatted_results), query)
         return formatted_results
     except Exception as e:
-        print(f"DEBUG: Error in search_news: {e}")
+        logger.warning("Error in search_news for %s: %s", query, e)
         return f"Error searching news for {query}: {str(e)}"
 
+def _parse_news(news):
+    # Normalizes yfinance news items (flat or nested under "content") to plain dicts
+    items = []
+    for item in news:
+        if not item:
+            continue
+        # Handle nested content structure if present
+        # Use try-except for safety if item is not a dict
+        try:
+            content = item.get('content', item)
+        except AttributeError:
+            logger.debug("Skipping news item that is not a dict: %r", item)
+            continue
+            
+        if content is None:
+            content = item
+        
+        # Link might be in clickThroughUrl or link
+        link = content.get('link')
+        if not link and 'clickThroughUrl' in content:
+            click_through = content['clickThroughUrl']
+            if click_through:
+                link = click_through.get('url')
+        if not link and content.get('canonicalUrl'):
+            link = content['canonicalUrl'].get('url')
+        
+        # Older items are flat with a "publisher" string and an epoch "providerPublishTime"
+        provider = content.get('provider') or {}
+        published = content.get('pubDate') or content.get('providerPublishTime')
+        if isinstance(published, (int, float)):
+            published = datetime.fromtimestamp(published, tz=timezone.utc).isoformat()
+        items.append({
+            "title": content.get('title', 'No Title'),
+            "link": link or 'No Link',
+            "summary": content.get('summary', 'No Summary'),
+            "publisher": provider.get('displayName') if isinstance(provider, dict) else content.get('publisher'),
+            "published": published,
+        })
+    return items
+
+def _sources(item):
+    # "Reuters, 2025-06-01, 5 sources" for a story syndicated by several sites
+    parts = [item.get("publisher"), (item.get("published") or "")[:10] or None]
+    if item.get("sources", 1) > 1:
+        parts.append(f"{item['sources']} sources")
+    return ", ".join(part for part in parts if part)
+
+def _format_news(items):
+    if tool_output_mode() != "compact":
+        return "".join(
+            f"Title: {item['title']}\nLink: {item['link']}\nSummary: {item['summary']}\n"
+            + (f"Sources: {item['sources']} ({', '.join(item['publishers'])})\n" if item.get("sources", 1) > 1 else "")
+            + "---\n"
+            for item in items
+        )
+
+    # Top NEWS_TOP_K items (ranked, or newest first without dedup), summaries cut to NEWS_SUMMARY_CHARS
+    top_k, limit = news_top_k(), news_summary_chars()
+    lines = []
+    for item in items[:top_k]:
+        source = _sources(item)
+        lines.append(f"- {item['title']}" + (f" ({source})" if source else "") + f" {item['link']}")
+        summary = truncate(item["summary"], limit) if item["summary"] != "No Summary" else ""
+        if summary and summary != item["title"]:
+            lines.append(f"  {summary}")
+    if len(items) > top_k:
+        lines.append(f"({len(items) - top_k} lower-ranked items omitted)")
+    return "\n".join(lines)
+
+@offload_to_pool
 @tool
 def web_search(query: str) -> str:
     """
@@ -73,11 +148,63 @@ def web_search(query: str) -> str:
     Use this for specific questions, market sentiment, or when company-specific news is insufficient.
     Input should be a search query string (e.g., 'NVDA supply chain issues', 'TSM vs Intel 3nm').
     """
+    return search_web(query)
+
+@memoize_in_run(key=lambda query: " ".join((query or "").lower().split()))
+def search_web(query: str) -> str:
+    """
+    Plain-function body of `web_search`.
+    """
     try:
-        print(f"DEBUG: Performing web search for '{query}'")
-        search = DuckDuckGoSearchResults(backend="news")
-        results = search.run(query)
-        return results
+        index = get_news_index()
+        fetch_key = "web:" + " ".join(query.lower().split())
+        items = index.fresh_fetch(fetch_key)
+        if items is None:
+            logger.debug("Performing web search for %r", query)
+            search = DuckDuckGoSearchResults(
+                backend="news", output_format="list", num_results=int(os.getenv("WEB_SEARCH_RESULTS", "10"))
+            )
+            def fetch():
+                record_upstream("web_search")
+                return upstream(DUCKDUCKGO).call(search.run, query)
+            results = get_cassette().call("web", " ".join(query.lower().split()), fetch)
+            items = [
+                {
+                    "title": result.get("title", "No Title"),
+                    "link": result.get("link", "No Link"),
+                    "summary": result.get("snippet", "No Summary"),
+                    "publisher": result.get("source"),
+                    "published": result.get("date"),
+                }
+                for result in results or []
+            ]
+            # Tag the results with the tickers the query mentions so `search_news` and `search_local_news` find them
+            index.add(items, tickers=get_symbol_index().resolve(query)[0], fetch_key=fetch_key)
+        if news_dedup_enabled():
+            items = dedup_news(items, terms=[term for term in query.split() if len(term) > 1])
+        return _format_news(items) if items else "No results found."
     except Exception as e:
-        print(f"DEBUG: Error in web_search: {e}")
+        logger.warning("Error in web_search for %r: %s", query, e)
         return f"Error performing web search for {query}: {str(e)}"
+
+@offload_to_pool
+@tool
+def search_local_news(query: str = "", tickers: Optional[List[str]] = None, days: int = 30) -> str:
+    """
+    Searches the local index of every news item fetched by earlier `search_news` / `web_search`
+    calls (also from previous research runs). Instant, no web request.
+    `query`: keywords that must all appear (e.g. 'Blackwell delay', '法說會'); `tickers`: only news
+    about these tickers; `days`: only news published in the last N days.
+    """
+    return search_news_index(query, tickers, days)
+
+def search_news_index(query: str = "", tickers: Optional[List[str]] = None, days: int = 30) -> str:
+    """
+    Plain-function body of `search_local_news`.
+    """
+    tickers = validate_tickers(tickers) if tickers else []
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+    items = get_news_index().search(query, tickers=tickers, since=since, limit=100)
+    if news_dedup_enabled():
+        items = dedup_news(items, terms=[*query.split(), *tickers])
+    return _format_news(items) if items else "No matching news in the local index."
@@ -0,0 +1,313 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from ..utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# Built-in symbol table: ticker -> names and aliases (English, Chinese). Taiwan listings use
+# their Chinese names; the US ADR of the same company keeps the English ones.
+SYMBOLS = {
+    "AAPL": ["Apple", "蘋果"],
+    "MSFT": ["Microsoft", "微軟"],
+    "NVDA": ["Nvidia", "輝達", "英偉達"],
+    "GOOGL": ["Google", "Alphabet", "谷歌", "字母"],
+    "AMZN": ["Amazon", "亞馬遜"],
+    "META": ["Meta", "Meta Platforms", "Facebook", "臉書"],
+    "TSLA": ["Tesla", "特斯拉"],
+    "AMD": ["Advanced Micro Devices", "超微"],
+    "INTC": ["Intel", "英特爾"],
+    "QCOM": ["Qualcomm", "高通"],
+    "AVGO": ["Broadcom", "博通"],
+    "MU": ["Micron", "美光"],
+    "ARM": ["Arm Holdings", "安謀"],
+    "ASML": ["ASML", "艾司摩爾"],
+    "SMCI": ["Super Micro", "Supermicro", "超微電腦"],
+    "TSM": ["TSMC", "Taiwan Semiconductor", "台積電ADR"],
+    "UMC": ["United Microelectronics"],
+    "ORCL": ["Oracle", "甲骨文"],
+    "CRM": ["Salesforce"],
+    "ADBE": ["Adobe"],
+    "NFLX": ["Netflix", "網飛"],
+    "PLTR": ["Palantir"],
+    "UBER": ["Uber"],
+    "DIS": ["Disney", "迪士尼"],
+    "JPM": ["JPMorgan", "JP Morgan", "摩根大通"],
+    "BRK-B": ["Berkshire Hathaway", "Berkshire", "波克夏"],
+    "V": ["Visa"],
+    "MA": ["Mastercard"],
+    "JNJ": ["Johnson & Johnson", "嬌生"],
+    "UNH": ["UnitedHealth"],
+    "LLY": ["Eli Lilly", "禮來"],
+    "NVO": ["Novo Nordisk", "諾和諾德"],
+    "XOM": ["Exxon", "ExxonMobil", "埃克森美孚"],
+    "WMT": ["Walmart", "沃爾瑪"],
+    "COST": ["Costco", "好市多"],
+    "KO": ["Coca-Cola", "可口可樂"],
+    "PEP": ["PepsiCo", "百事"],
+    "BABA": ["Alibaba", "阿里巴巴"],
+    "PDD": ["Pinduoduo", "拼多多"],
+    "SPY": ["S&P 500", "標普500"],
+    "QQQ": ["Nasdaq 100", "那斯達克100"],
+    "2330.TW": ["台積電", "台灣積體電路"],
+    "2317.TW": ["鴻海", "Foxconn", "Hon Hai"],
+    "2454.TW": ["聯發科", "MediaTek"],
+    "2308.TW": ["台達電", "Delta Electronics"],
+    "2303.TW": ["聯電"],
+    "2382.TW": ["廣達", "Quanta"],
+    "3231.TW": ["緯創", "Wistron"],
+    "6669.TW": ["緯穎", "Wiwynn"],
+    "3711.TW": ["日月光", "ASE Technology"],
+    "2357.TW": ["華碩", "Asus"],
+    "2376.TW": ["技嘉", "Gigabyte"],
+    "2377.TW": ["微星", "MSI"],
+    "2345.TW": ["智邦", "Accton"],
+    "3661.TW": ["世芯", "Alchip"],
+    "3008.TW": ["大立光", "Largan"],
+    "2412.TW": ["中華電", "中華電信", "Chunghwa Telecom"],
+    "2881.TW": ["富邦金"],
+    "2882.TW": ["國泰金"],
+}
+
+# Upper-case words that look like tickers but are almost always something else
+NOT_TICKERS = {
+    "A", "I", "AI", "AN", "AND", "OR", "VS", "THE", "CEO", "CFO", "CTO", "EPS", "ETF", "IPO", "PE",
+    "PEG", "ROE", "ROI", "EV", "GDP", "CPI", "FED", "FOMC", "USA", "US", "UK", "EU", "YOY", "QOQ",
+    "Q1", "Q2", "Q3", "Q4", "TTM", "ATH", "GPU", "CPU", "HBM", "API", "ESG", "M&A", "IT",
+}
+
+# Words that carry no research intent beyond "look at these tickers"
+SIMPLE_WORDS = {
+    "analyze", "analyse", "analysis", "compare", "comparison", "vs", "versus", "and", "or", "with",
+    "stock", "stocks", "share", "shares", "the", "of", "on", "a", "an", "please", "research", "report",
+    "review", "look", "at", "give", "me", "for", "about", "how", "is", "are", "doing", "outlook", "tell",
+    "company", "companies", "ticker", "tickers", "quick", "full", "deep", "dive", "into",
+}
+SIMPLE_PHRASES = [
+    "分析", "比較", "對比", "研究", "報告", "股票", "個股", "以及", "還有", "和", "與", "跟", "及",
+    "請", "幫我", "一下", "的", "看看", "評估", "怎麼樣", "如何", "展望", "公司",
+]
+
+TOKEN = re.compile(r"(?<![A-Za-z0-9.])([A-Z][A-Z0-9]{0,5}(?:[.\-][A-Z]{1,2})?|\d{4}(?:\.TWO?)?)(?![A-Za-z0-9])")
+# Yahoo Finance symbol shapes: equities (BRK-B, 0700.HK), indices (^GSPC), FX (EURUSD=X, JPY=X),
+# futures (GC=F) and crypto pairs (BTC-USD)
+SYMBOL_FORMAT = re.compile(
+    r"^(?:[A-Z][A-Z0-9]{0,5}(?:[.\-][A-Z]{1,2})?"
+    r"|\d{4,6}\.[A-Z]{1,3}"
+    r"|\^[A-Z0-9][A-Z0-9.\-]{0,9}"
+    r"|(?:[A-Z]{3}){1,2}=X"
+    r"|[A-Z0-9]{1,6}=F"
+    r"|[A-Z0-9]{2,10}-[A-Z]{3,4})$"
+)
+NAME_SUFFIXES = re.compile(r"[,.]?\s+(inc|corp|corporation|co|company|ltd|limited|plc|holdings|group|sa|nv|ag)\.?$", re.IGNORECASE)
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of every pattern in one pass over the text.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns.items():
+            node = 0
+            for char in pattern:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._out[node].append((len(pattern), value))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0) if node else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text):
+        """
+        Yields (start, end, value) for every match, in order of their end position.
+        """
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, value in self._out[node]:
+                yield i + 1 - length, i + 1, value
+
+def _clean_name(name):
+    return NAME_SUFFIXES.sub("", name.strip()).strip()
+
+def _is_word_char(char):
+    return char.isascii() and char.isalnum()
+
+class SymbolIndex:
+    """
+    Resolves tickers, company names and aliases in free text to ticker symbols.
+
+    Names are matched case-insensitively with an Aho-Corasick automaton (whole words for
+    Latin names, anywhere for Chinese ones); ticker-like upper-case tokens and Taiwan
+    stock codes are looked up directly.
+    """
+
+    def __init__(self, symbols):
+        self.tickers = {ticker.upper() for ticker in symbols}
+        names, self._aliases = {}, {}
+        for ticker, aliases in symbols.items():
+            self._aliases.setdefault(ticker.upper(), []).extend(aliases)
+            for alias in aliases:
+                names.setdefault(alias.lower(), ticker.upper())
+        self._names = names
+        self._matcher = AhoCorasick(names)
+
+    def lookup(self, text):
+        """
+        Returns the ticker for an exact ticker, Taiwan code or name, else None.
+        """
+        text = (text or "").strip()
+        if text.upper() in self.tickers:
+            return text.upper()
+        if re.fullmatch(r"\d{4}", text) and f"{text}.TW" in self.tickers:
+            return f"{text}.TW"
+        return self._names.get(text.lower())
+
+    def aliases(self, ticker):
+        """
+        Company names and aliases of `ticker` (empty if unknown).
+        """
+        return list(self._aliases.get((ticker or "").upper(), []))
+
+    def resolve(self, query):
+        """
+        Returns (tickers, unknown_tokens, remainder): tickers in order of appearance,
+        ticker-like tokens that are not in the index, and the query text left after
+        removing every matched span.
+        """
+        # lower() (unlike casefold()) keeps offsets aligned with `query`
+        folded = query.lower()
+        matches = []
+        for start, end, ticker in self._matcher.find(folded):
+            # Latin names must be whole words ("Meta" in "metaverse" is not a match)
+            if folded[start].isascii() and start > 0 and _is_word_char(folded[start - 1]):
+                continue
+            if folded[end - 1].isascii() and end < len(folded) and _is_word_char(folded[end]):
+                continue
+            matches.append((start, end, ticker))
+
+        unknown = []
+        for token in TOKEN.finditer(query):
+            ticker = self.lookup(token.group(1))
+            if ticker:
+                matches.append((token.start(1), token.end(1), ticker))
+            elif token.group(1) not in NOT_TICKERS and not token.group(1)[0].isdigit():
+                unknown.append(token.group(1))
+
+        # Leftmost-longest, non-overlapping
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        tickers, spans, position = [], [], 0
+        for start, end, ticker in matches:
+            if start < position:
+                continue
+            spans.append((start, end))
+            position = end
+            if ticker not in tickers:
+                tickers.append(ticker)
+
+        remainder, last = [], 0
+        for start, end in spans:
+            remainder.append(query[last:start])
+            last = end
+        remainder.append(query[last:])
+        return tickers, unknown, " ".join(remainder)
+
+def is_simple_query(remainder):
+    """
+    True when the text left after removing the resolved tickers/names has no research
+    intent of its own ("Analyze ... and ...", "比較 ... 跟 ..."), so templated instructions suffice.
+    """
+    text = remainder.lower()
+    for phrase in SIMPLE_PHRASES:
+        text = text.replace(phrase, " ")
+    words = re.findall(r"[^\W\d_]+", text)
+    return all(word in SIMPLE_WORDS for word in words)
+
+def _load_symbols():
+    symbols = {ticker: list(names) for ticker, names in SYMBOLS.items()}
+
+    # Tickers and multi-word company names from any refreshed screener universe
+    screener_root = get_data_dir("screener")
+    for universe in os.listdir(screener_root):
+        try:
+            with open(os.path.join(screener_root, universe, "CURRENT")) as f:
+                version = f.read().strip()
+            with open(os.path.join(screener_root, universe, version, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for ticker, name in zip(meta["tickers"], meta["text"]["name"]):
+            aliases = symbols.setdefault(ticker, [])
+            name = _clean_name(name)
+            # Single words are too often ordinary English ("Target", "Block")
+            if len(name.split()) > 1 and name not in aliases:
+                aliases.append(name)
+
+    # User-maintained additions: {"TICKER": ["name", "alias", ...]}
+    path = os.getenv("SYMBOLS_PATH")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for ticker, aliases in json.load(f).items():
+                symbols.setdefault(ticker.upper(), []).extend(aliases)
+    return symbols
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_symbol_index():
+    """
+    Returns the process-wide symbol index, built on first use.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SymbolIndex(_load_symbols())
+    return _index
+
+def is_valid_symbol(symbol):
+    """
+    Format check for a Yahoo Finance symbol; with SYMBOL_VALIDATION=strict the symbol
+    must also be in the symbol index.
+    """
+    symbol = (symbol or "").strip().upper()
+    if not SYMBOL_FORMAT.match(symbol):
+        return False
+    if os.getenv("SYMBOL_VALIDATION", "format").lower() == "strict":
+        return symbol in get_symbol_index().tickers
+    return True
+
+def validate_tickers(tickers):
+    """
+    Normalizes LLM- or user-provided tickers: names/aliases are mapped to their ticker
+    and invalid symbols are dropped, so they never reach yfinance.
+    """
+    index = get_symbol_index()
+    valid = []
+    for ticker in tickers or []:
+        symbol = index.lookup(ticker) or (ticker or "").strip().upper()
+        if is_valid_symbol(symbol):
+            if symbol not in valid:
+                valid.append(symbol)
+        else:
+            logger.info("Dropping invalid ticker: %r", ticker)
+    return valid
@@ -0,0 +1,297 @@
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from ..telemetry import record_upstream_error
+try:
+    from curl_cffi import requests as curl_requests
+except ImportError:
+    curl_requests = None
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:
+    YFRateLimitError = None
+try:
+    from duckduckgo_search.exceptions import RatelimitException, TimeoutException
+except ImportError:
+    RatelimitException = TimeoutException = None
+
+# Every request to Yahoo Finance, DuckDuckGo and the screener's constituent lists goes through
+# `upstream(host).call(...)`: a token bucket per host, jittered exponential backoff on rate
+# limits / transport errors / 5xx, and a circuit breaker that fails fast while a host is down.
+
+YAHOO = "finance.yahoo.com"
+DUCKDUCKGO = "duckduckgo.com"
+
+# host -> (env prefix, requests per second, burst)
+HOSTS = {
+    YAHOO: ("YAHOO", 4.0, 8),
+    DUCKDUCKGO: ("DUCKDUCKGO", 1.0, 3),
+}
+DEFAULT_LIMIT = (None, 4.0, 8)
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+RETRYABLE_ERRORS = tuple(
+    error for error in (
+        requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError,
+        curl_requests.exceptions.ConnectionError if curl_requests else None,
+        curl_requests.exceptions.Timeout if curl_requests else None,
+        YFRateLimitError, RatelimitException, TimeoutException,
+    )
+    if error is not None
+)
+
+class UpstreamUnavailable(RuntimeError):
+    """
+    Raised without contacting the host while its circuit breaker is open.
+    """
+
+def is_retryable(error):
+    """
+    Rate limits, timeouts, connection errors and 5xx responses are worth retrying;
+    anything else (bad symbol, parse error) is the caller's problem.
+    """
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `burst`.
+
+    Tokens are reserved under the lock (the count may go negative), so concurrent
+    callers queue up in order and each sleeps only for its own slot.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until it is available. Returns the seconds waited.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+        return wait
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed calls (a call fails once its retries are
+    exhausted). While open every call fails fast; after `reset_after` seconds a single trial
+    call is let through (half-open), which closes the breaker on success and re-opens it on
+    failure.
+    """
+
+    def __init__(self, threshold, reset_after, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._clock() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        """
+        Returns None if a call may proceed, else the seconds until the next trial call.
+        """
+        if self.threshold <= 0:
+            return None
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return None
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return None
+            return max(self.reset_after - (self._clock() - self.opened_at), 0.0)
+
+    @property
+    def trial(self):
+        """
+        True while the half-open trial call is in flight.
+        """
+        with self._lock:
+            return self._trial
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self._clock()
+            self._trial = False
+
+class Upstream:
+    """
+    Rate limiter, retry policy and circuit breaker of one host.
+    """
+
+    def __init__(self, host, rate, burst, retries=3, backoff=0.5, backoff_max=8.0,
+                 breaker_threshold=5, breaker_reset=30.0, clock=time.monotonic, sleep=time.sleep):
+        self.host = host
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset, clock=clock)
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "throttled_seconds": 0.0}
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs `func(*args, **kwargs)` against the host, retrying transient errors with
+        full-jitter exponential backoff. Raises `UpstreamUnavailable` while the breaker is open.
+
+        The breaker is checked once per call and counts one failure per call whose retries
+        are exhausted. A half-open trial call is not retried: its first failure re-opens the
+        breaker, and retries stop early if other calls open it meanwhile.
+        """
+        retry_in = self.breaker.allow()
+        if retry_in is not None:
+            self._count("rejected")
+            record_upstream_error(self.host, "rejected")
+            raise UpstreamUnavailable(
+                f"{self.host} is unavailable after {self.breaker.failures} consecutive failures; "
+                f"retrying in {retry_in:.0f}s"
+            )
+        trial = self.breaker.trial
+        for attempt in range(self.retries + 1):
+            self._count("throttled_seconds", self.bucket.acquire())
+            self._count("calls")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The host answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                # Stop early if other calls opened the breaker meanwhile, without extending it
+                opened = self.breaker.state == "open"
+                if trial or attempt == self.retries or opened:
+                    if not opened:
+                        self.breaker.record_failure()
+                    self._count("failures")
+                    record_upstream_error(self.host, "failed")
+                    raise
+                self._count("retries")
+                record_upstream_error(self.host, "retried")
+                self._sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.counts[name] += value
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts["throttled_seconds"] = round(counts["throttled_seconds"], 3)
+        return {**counts, "breaker": self.breaker.state}
+
+_upstreams = {}
+_sessions = {}
+_lock = threading.Lock()
+
+def _env(name, default, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else default
+
+def upstream(host):
+    """
+    Returns the process-wide `Upstream` of `host`. Limits come from <PREFIX>_RATE_LIMIT
+    (requests/second, 0 disables) and <PREFIX>_RATE_BURST for the hosts in HOSTS; retries
+    and the breaker from UPSTREAM_RETRIES, UPSTREAM_BACKOFF, UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_BREAKER_FAILURES and UPSTREAM_BREAKER_RESET.
+    """
+    with _lock:
+        if host not in _upstreams:
+            prefix, rate, burst = HOSTS.get(host, DEFAULT_LIMIT)
+            if prefix:
+                rate = _env(f"{prefix}_RATE_LIMIT", rate)
+                burst = _env(f"{prefix}_RATE_BURST", burst, int)
+            _upstreams[host] = Upstream(
+                host, rate, burst,
+                retries=_env("UPSTREAM_RETRIES", 3, int),
+                backoff=_env("UPSTREAM_BACKOFF", 0.5),
+                backoff_max=_env("UPSTREAM_BACKOFF_MAX", 8.0),
+                breaker_threshold=_env("UPSTREAM_BREAKER_FAILURES", 5, int),
+                breaker_reset=_env("UPSTREAM_BREAKER_RESET", 30.0),
+            )
+        return _upstreams[host]
+
+def http_session():
+    """
+    Pooled `requests.Session` shared by plain HTTP fetches, with a browser User-Agent.
+    """
+    with _lock:
+        session = _sessions.get("http")
+        if session is None:
+            session = _sessions["http"] = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=int(os.getenv("UPSTREAM_POOL_SIZE", "16")))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        return session
+
+def yahoo_session():
+    """
+    Session shared by every yfinance call (cookies and crumb are fetched once). yfinance
+    needs a browser-impersonating curl_cffi session; without curl_cffi, `http_session()`.
+    """
+    if curl_requests is None:
+        return http_session()
+    with _lock:
+        session = _sessions.get("yahoo")
+        if session is None:
+            session = _sessions["yahoo"] = curl_requests.Session(impersonate="chrome")
+        return session
+
+def upstream_stats():
+    with _lock:
+        upstreams = list(_upstreams.values())
+    return {u.host: u.stats() for u in upstreams}
+
+def close_upstreams():
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        _upstreams.clear()
+    for session in sessions:
+        session.close()
@@ -0,0 +1,349 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from langchain_core.callbacks import BaseCallbackHandler
+from .telemetry import is_cached_generation
+
+logger = logging.getLogger(__name__)
+
+# Span tracing of graph runs: one trace per research run with a span per node, tool call and
+# LLM call. The trace id comes from the request (W3C `traceparent` or `X-Trace-Id` header) so a
+# run can be found next to the caller's own traces. Finished traces are written by the exporter
+# selected with TRACE_EXPORTER: "jsonl" (one span per line in TRACE_FILE), "otlp" (OTLP/HTTP JSON
+# to OTEL_EXPORTER_OTLP_ENDPOINT, e.g. a local OpenTelemetry Collector or Jaeger) or "none".
+
+TRACE_EXPORTERS = ("none", "jsonl", "otlp")
+SERVICE_NAME = "investment-research"
+
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+def trace_exporter_name():
+    name = os.getenv("TRACE_EXPORTER", "none").lower()
+    if name not in TRACE_EXPORTERS:
+        raise ValueError(f"Unknown TRACE_EXPORTER {name!r}, expected one of {', '.join(TRACE_EXPORTERS)}")
+    return name
+
+def new_trace_id():
+    return secrets.token_hex(16)
+
+def parse_trace_headers(headers):
+    """
+    (trace_id, parent_span_id) from a W3C `traceparent` header or a bare 32-hex `X-Trace-Id`;
+    (None, None) when neither is present or valid.
+    """
+    match = TRACEPARENT.match((headers.get("traceparent") or "").strip().lower())
+    if match and set(match.group(1)) != {"0"} and set(match.group(2)) != {"0"}:
+        return match.group(1), match.group(2)
+    trace_id = (headers.get("x-trace-id") or "").strip().lower()
+    if TRACE_ID.match(trace_id) and set(trace_id) != {"0"}:
+        return trace_id, None
+    return None, None
+
+class Span:
+    def __init__(self, trace, name, kind, parent_id=None, attributes=None):
+        self.trace = trace
+        self.trace_id = trace.trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_error(self, error):
+        self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.finish(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+class Trace:
+    """
+    Spans of one run, exported together when the root span ends. Spans that end later
+    (e.g. an abandoned background call) are exported on their own.
+    """
+
+    def __init__(self, trace_id, exporter):
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self.root = None
+        self._lock = threading.Lock()
+        self._spans = []
+
+    def finish(self, span):
+        with self._lock:
+            if span is self.root:
+                spans, self._spans = [*self._spans, span], []
+            elif self.root.end_ns is None:
+                self._spans.append(span)
+                return
+            else:
+                spans = [span]
+        self.exporter.export(spans)
+
+class NoopExporter:
+    def export(self, spans):
+        pass
+
+    def close(self):
+        pass
+
+class JsonlExporter:
+    """
+    Appends one JSON object per span to a local file (TRACE_FILE).
+    """
+
+    def __init__(self, path=None):
+        from .utils import get_data_dir
+
+        self.path = path or os.getenv("TRACE_FILE") or os.path.join(get_data_dir(), "traces.jsonl")
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def close(self):
+        pass
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+# OTLP span kinds: LLM and upstream-facing tool calls are client calls, the rest internal work
+OTLP_KINDS = {"llm": 3, "tool": 3}
+
+def otlp_payload(spans):
+    """
+    OTLP/HTTP JSON `ExportTraceServiceRequest` body for `spans`.
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [
+                    {
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                        "name": span.name,
+                        "kind": OTLP_KINDS.get(span.kind, 1),
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": _otlp_attributes({**span.attributes, "span.kind": span.kind}),
+                        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                    }
+                    for span in spans
+                ],
+            }],
+        }],
+    }
+
+class OtlpExporter:
+    """
+    Posts finished traces to an OTLP/HTTP collector (OTEL_EXPORTER_OTLP_ENDPOINT, default
+    http://localhost:4318) in the JSON encoding, from a background thread.
+    """
+
+    def __init__(self, endpoint=None, timeout=5):
+        endpoint = endpoint or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or "http://localhost:4318"
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="otlp-export")
+
+    def export(self, spans):
+        self._executor.submit(self._post, otlp_payload(spans))
+
+    def _post(self, payload):
+        try:
+            response = self._session.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning("Failed to export trace to %s: %s", self.url, e)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+EXPORTERS = {"none": NoopExporter, "jsonl": JsonlExporter, "otlp": OtlpExporter}
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def get_trace_exporter():
+    """
+    Returns the process-wide exporter selected by TRACE_EXPORTER.
+    """
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = EXPORTERS[trace_exporter_name()]()
+    return _exporter
+
+def close_trace_exporter():
+    global _exporter
+    with _exporter_lock:
+        exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.close()
+
+_span = contextvars.ContextVar("trace_span", default=None)
+
+def current_span():
+    return _span.get()
+
+def current_trace_id():
+    span = _span.get()
+    return span.trace_id if span is not None else None
+
+@contextlib.contextmanager
+def trace(name, trace_id=None, parent_id=None, **attributes):
+    """
+    Opens the root span of a run. `trace_id` / `parent_id` continue the caller's trace
+    (see `parse_trace_headers`); without them a new trace is started.
+    """
+    run = Trace(trace_id or new_trace_id(), get_trace_exporter())
+    root = run.root = Span(run, name, "run", parent_id=parent_id, attributes=attributes)
+    token = _span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.set_error(e)
+        raise
+    finally:
+        _span.reset(token)
+        root.end()
+
+def start_span(name, kind, parent=None, **attributes):
+    """
+    Starts a child of `parent` (default: the current span); None outside a trace.
+    The caller must `end()` it.
+    """
+    parent = parent or _span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, kind, parent_id=parent.span_id, attributes=attributes)
+
+@contextlib.contextmanager
+def span(name, kind="internal", **attributes):
+    """
+    Child span of the current one around the code inside; a no-op outside a trace.
+    """
+    child = start_span(name, kind, **attributes)
+    if child is None:
+        yield None
+        return
+    token = _span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        _span.reset(token)
+        child.end()
+
+def trace_tool(name, func):
+    """
+    Wraps a tool body in a "tool" span with its arguments.
+    """
+    def wrapper(*args, **kwargs):
+        with span(f"tool {name}", "tool", **{"tool.name": name, "tool.args": json.dumps([args, kwargs], default=str)[:500]}) as current:
+            result = func(*args, **kwargs)
+            # Data tools report failures as "Error ..." strings rather than raising
+            if current is not None and isinstance(result, str) and result.startswith("Error"):
+                current.set_error(result[:500])
+            return result
+
+    wrapper.__wrapped__ = func
+    return wrapper
+
+class LLMTraceHandler(BaseCallbackHandler):
+    """
+    Callback attached to every chat model: one "llm" span per call, child of the node or
+    tool span it was made from, with the model and token usage.
+    """
+
+    run_inline = True
+
+    def __init__(self, model=None):
+        self.model = model
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        current = start_span("llm " + (self.model or "chat"), "llm", **{"llm.model": self.model})
+        if current is not None:
+            with self._lock:
+                self._spans[run_id] = current
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def _pop(self, run_id):
+        with self._lock:
+            return self._spans.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        current = self._pop(run_id)
+        if current is None:
+            return
+        for generations in response.generations:
+            for generation in generations:
+                if is_cached_generation(generation):
+                    current.attributes["llm.cache_hit"] = True
+                    continue
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key, attribute in (("input_tokens", "llm.prompt_tokens"), ("output_tokens", "llm.completion_tokens")):
+                    if key in usage:
+                        current.attributes[attribute] = current.attributes.get(attribute, 0) + usage[key]
+        current.end()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        current = self._pop(run_id)
+        if current is not None:
+            current.set_error(error)
+            current.end()
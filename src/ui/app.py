@@ -1,10 +1,17 @@
+import json
+import os
+import sys
 import streamlit as st
 import requests
-import yfinance as yf
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import re
 
+# Allow `streamlit run src/ui/app.py` to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.tools.market_data import get_history, get_info
+
 # Page config
 st.set_page_config(
     page_title="AI Investment Analyst",
@@ -148,9 +155,9 @@ def render_sections_markdown(raw_text: str, heading_level: int = 3):
 # ---------------------------------------------------------
 
 def get_stock_data(ticker, period="1d"):
+    # 透過共用的市場數據快取 (與 agent 工具共用)，避免重複向 Yahoo 請求
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = get_info(ticker)
         
         interval = "1d"
         if period == "1d":
@@ -160,9 +167,9 @@ def get_stock_data(ticker, period="1d"):
         elif period in ["1mo", "3mo"]:
             interval = "1h"
             
-        history = stock.history(period=period, interval=interval)
+        history = get_history(ticker, period=period, interval=interval)
         if history.empty and period == "1d":
-            history = stock.history(period="1d", interval="15m")
+            history = get_history(ticker, period="1d", interval="15m")
         return info, history
     except Exception:
         return None, None
@@ -254,6 +261,42 @@ def format_large_number(num):
         return f"{num/1_000_000:.2f}百萬"
     return f"{num:,.2f}"
 
+# ---------------------------------------------------------
+# Helper: 串流研究進度 (Server-Sent Events)
+# ---------------------------------------------------------
+
+API_URL = "http://localhost:8000"
+
+NODE_LABELS = {
+    "router": "研究主管 (Router)",
+    "screener": "選股篩選器 (Screener)",
+    "prefetch": "資料預取 (Prefetch)",
+    "data_analyst": "財務數據分析師",
+    "news_analyst": "財經新聞分析師",
+    "ticker_data_analyst": "個股財務數據分析師",
+    "ticker_news_analyst": "個股新聞分析師",
+    "merge_analyses": "彙整個股分析",
+    "quant_metrics": "量化風險指標",
+    "risk_manager": "風險管理長",
+    "editor": "主編",
+}
+
+
+def iter_sse_events(response):
+    """解析 /research/stream 回傳的 SSE，逐一產生 (event, data)。"""
+    event, data_lines = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if event and data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 # ---------------------------------------------------------
 # Main Application
 # ---------------------------------------------------------
@@ -270,15 +313,28 @@ if st.button("🚀 開始分析", type="primary"):
     if not query:
         st.warning("請輸入問題")
     else:
-        with st.spinner("代理人團隊正在進行深度研究..."):
-            try:
-                response = requests.post("http://localhost:8000/research", json={"query": query})
-                if response.status_code == 200:
-                    st.session_state.research_result = response.json()
-                else:
-                    st.error(f"API Error: {response.text}")
-            except Exception as e:
-                st.error(f"Connection Error: {str(e)}")
+        try:
+            with st.status("代理人團隊正在進行深度研究...", expanded=True) as status:
+                report_placeholder = st.empty()
+                report_text = ""
+                with requests.post(f"{API_URL}/research/stream", json={"query": query}, stream=True) as response:
+                    if response.status_code != 200:
+                        st.error(f"API Error: {response.text}")
+                    for event, data in iter_sse_events(response):
+                        if event == "node":
+                            status.write(f"✅ {NODE_LABELS.get(data['node'], data['node'])} 完成")
+                        elif event == "token":
+                            # 即時顯示主編正在撰寫的報告
+                            report_text += data["content"]
+                            report_placeholder.markdown(report_text)
+                        elif event == "final":
+                            st.session_state.research_result = data
+                        elif event == "error":
+                            st.error(f"API Error: {data.get('detail')}")
+                report_placeholder.empty()
+                status.update(label="研究完成", state="complete", expanded=False)
+        except Exception as e:
+            st.error(f"Connection Error: {str(e)}")
 
 if 'research_result' in st.session_state:
     result = st.session_state.research_result
@@ -301,8 +357,10 @@ if 'research_result' in st.session_state:
         if 'selected_period_label' not in st.session_state:
             st.session_state.selected_period_label = "1 個月"
             
-        stock = yf.Ticker(selected_ticker)
-        info = stock.info
+        try:
+            info = get_info(selected_ticker)
+        except Exception:
+            info = None
         
         if info:
             st.markdown(
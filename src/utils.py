@@ -1,24 +1,140 @@
 import os
+import re
+import threading
+import unicodedata
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
+from .telemetry import LLMUsageHandler
 
-def get_llm(temperature=0):
+# Chat models and agents are expensive to build (each one owns its own HTTP
+# client and connection pool), so they are memoized per process and keyed by
+# (provider, model, temperature).
+_llm_cache = {}
+_agent_cache = {}
+_http_clients = []
+_cache_lock = threading.Lock()
+
+def get_data_dir(*parts):
     """
-    Returns the configured LLM based on environment variables.
-    Defaults to OpenAI if not specified.
+    Returns (and creates) a directory under DATA_DIR for local persistent state.
+    Defaults to `.data/` in the project root.
+    """
+    root = os.getenv("DATA_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".data")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a research query used for coalescing and caching:
+    NFKC-normalized (full-width -> half-width), case-folded, whitespace collapsed,
+    trailing punctuation removed. "Analyze  NVDA?" and "analyze nvda" map to the same key.
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s+", " ", query).strip()
+    return query.rstrip(" ?!.。？！")
+
+def get_llm_config(temperature=0):
+    """
+    Resolves the (provider, model, temperature) triple from environment variables.
     """
     provider = os.getenv("LLM_PROVIDER", "openai").lower()
     model_name = os.getenv("LLM_MODEL")
 
     if provider == "google":
-        if not model_name:
-            model_name = "gemini-2.5-flash"
-        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature)
-    
+        model_name = model_name or "gemini-2.5-flash"
     elif provider == "openai":
-        if not model_name:
-            model_name = "gpt-5-mini"
-        return ChatOpenAI(model=model_name, temperature=temperature)
-    
+        model_name = model_name or "gpt-5-mini"
     else:
         raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
+
+    return provider, model_name, temperature
+
+def _http_limits():
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")),
+    )
+
+def _create_llm(provider, model_name, temperature, cache=None):
+    from .tracing import LLMTraceHandler
+
+    # Per-node call, token and cost metrics and an LLM span per call, see src/telemetry.py and src/tracing.py
+    callbacks = [LLMUsageHandler(model_name), LLMTraceHandler(model_name)]
+    if provider == "google":
+        return ChatGoogleGenerativeAI(
+            model=model_name, temperature=temperature, cache=cache, callbacks=callbacks
+        )
+
+    # Explicit pooled clients so keep-alive connections survive across requests
+    http_client = httpx.Client(limits=_http_limits())
+    http_async_client = httpx.AsyncClient(limits=_http_limits())
+    _http_clients.extend([http_client, http_async_client])
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        http_client=http_client,
+        http_async_client=http_async_client,
+        cache=cache,
+        callbacks=callbacks,
+    )
+
+def get_llm(temperature=0, node=None):
+    """
+    Returns the configured LLM based on environment variables.
+    Defaults to OpenAI if not specified.
+    `node` names the calling graph node: when it is listed in LLM_CACHE_NODES, the model
+    answers repeated prompts from the persistent LLM response cache (see src/llm_cache.py).
+    The instance is shared by every caller with the same (provider, model, temperature, cached node).
+    """
+    from .llm_cache import get_llm_cache, llm_cache_enabled
+
+    cached_node = node if llm_cache_enabled(node) else None
+    key = (*get_llm_config(temperature), cached_node)
+    with _cache_lock:
+        llm = _llm_cache.get(key)
+        if llm is None:
+            cache = get_llm_cache().view(cached_node) if cached_node else None
+            llm = _create_llm(*key[:3], cache)
+            _llm_cache[key] = llm
+    return llm
+
+def get_agent(name, factory, temperature=0):
+    """
+    Returns a memoized agent for the given node name.
+    `factory` is only called on a cache miss, i.e. once per (name, provider, model, temperature)
+    and LLM response caching setting of the node.
+    """
+    from .llm_cache import llm_cache_enabled
+
+    key = (name, *get_llm_config(temperature), llm_cache_enabled(name.split(":")[0]))
+    with _cache_lock:
+        agent = _agent_cache.get(key)
+    if agent is None:
+        agent = factory()
+        with _cache_lock:
+            agent = _agent_cache.setdefault(key, agent)
+    return agent
+
+def clear_client_caches():
+    """
+    Drops all memoized LLMs and agents and closes their synchronous HTTP clients.
+    """
+    with _cache_lock:
+        clients = list(_http_clients)
+        _http_clients.clear()
+        _llm_cache.clear()
+        _agent_cache.clear()
+    for client in clients:
+        if isinstance(client, httpx.Client):
+            client.close()
+    return clients
+
+async def aclose_client_caches():
+    """
+    Async variant of `clear_client_caches` that also closes the async HTTP clients.
+    """
+    for client in clear_client_caches():
+        if isinstance(client, httpx.AsyncClient):
+            await client.aclose()
@@ -5,6 +5,14 @@ from src.agents.data_analyst import data_analyst_node
 from src.agents.news_analyst import news_analyst_node
 from src.agents.risk_manager import risk_manager_node
 from src.agents.editor import editor_node
+from src.utils import clear_client_caches
+
+# Agents are memoized per process; start every test from an empty cache
+@pytest.fixture(autouse=True)
+def clear_agent_cache():
+    clear_client_caches()
+    yield
+    clear_client_caches()
 
 # Mock the LLM to avoid actual API calls during testing
 @pytest.fixture(autouse=True)
@@ -144,4 +152,173 @@ def test_editor_node(mock_create_agent_editor):
     
     assert "final_report" in result
     assert "Final Report" in result["final_report"]
+    assert result["context_tokens"]["editor"]["tokens_in"] > 0
     mock_create_agent_editor.assert_called_once()
+
+def test_editor_compacts_upstream_context(mock_create_agent_editor, monkeypatch):
+    monkeypatch.setenv("EDITOR_TOKEN_BUDGET", "60")
+    mock_agent_executor = MagicMock()
+    mock_create_agent_editor.return_value = mock_agent_executor
+    mock_agent_executor.invoke.return_value = {"messages": [MagicMock(content="Report")]}
+    prose = "Management reiterated its confidence in the roadmap during the call. " * 20
+
+    result = editor_node({
+        "query": "Report?",
+        "data_analysis": f"{prose}\n\n| P/E | 28.5 |",
+        "news_analysis": prose,
+        "risk_assessment": "Risk Score: 7/10",
+    })
+
+    message = mock_agent_executor.invoke.call_args[0][0]["messages"][0][1]
+    assert "| P/E | 28.5 |" in message
+    assert "Risk Score: 7/10" in message
+    stats = result["context_tokens"]["editor"]
+    assert stats["tokens_out"] <= 60 < stats["tokens_in"]
+
+def test_agent_is_memoized_across_invocations(mock_create_agent):
+    mock_agent_executor = MagicMock()
+    mock_create_agent.return_value = mock_agent_executor
+    mock_agent_executor.invoke.return_value = {"messages": [MagicMock(content="Analysis")]}
+
+    state = {"tickers": ["AAPL"], "query": "Is AAPL undervalued?"}
+    data_analyst_node(state)
+    data_analyst_node(state)
+
+    mock_create_agent.assert_called_once()
+    assert mock_agent_executor.invoke.call_count == 2
+
+def test_async_data_analyst_node(mock_create_agent):
+    import asyncio
+    from unittest.mock import AsyncMock
+    from src.agents.data_analyst import adata_analyst_node
+
+    mock_agent_executor = MagicMock()
+    mock_agent_executor.ainvoke = AsyncMock(return_value={"messages": [MagicMock(content="Async analysis of AAPL")]})
+    mock_create_agent.return_value = mock_agent_executor
+
+    result = asyncio.run(adata_analyst_node({"tickers": ["AAPL"], "query": "Is AAPL undervalued?"}))
+
+    assert result["data_analysis"] == "Async analysis of AAPL"
+    mock_agent_executor.ainvoke.assert_awaited_once()
+    mock_agent_executor.invoke.assert_not_called()
+
+def test_open_ended_queries_are_routed_through_the_screener(monkeypatch):
+    from src import graph
+    from src.agents import screener
+
+    route = graph._after_router(graph.ANALYSTS)
+    assert route({"query": "q", "tickers": ["NVDA"]}) == graph.ANALYSTS
+    assert route({"query": "q", "tickers": [], "screen_filters": "pe < 20"}) == "screener"
+
+    monkeypatch.setattr(screener, "run_screen", lambda filters, sort_by, limit: (["AMD", "NVDA"], "table"))
+    update = screener.screener_node({"query": "q", "tickers": [], "screen_filters": "pe < 20", "screen_sort": "pe"})
+    assert update == {"tickers": ["AMD", "NVDA"], "screen_results": "table"}
+
+def test_prefetch_node_fetches_data_and_news_for_every_ticker(monkeypatch):
+    import asyncio
+    from src.agents import prefetch
+
+    monkeypatch.setattr(prefetch, "format_stock_data", lambda ticker: f"data:{ticker}")
+    monkeypatch.setattr(prefetch, "format_comparison", lambda tickers: "table")
+    monkeypatch.setattr(prefetch, "fetch_ticker_news", lambda ticker: f"news:{ticker}")
+
+    state = {"query": "q", "tickers": ["NVDA", "AMD"]}
+    for update in (prefetch.prefetch_node(state), asyncio.run(prefetch.aprefetch_node(state))):
+        assert update["prefetched_data"].index("table") < update["prefetched_data"].index("data:NVDA")
+        assert "data:AMD" in update["prefetched_data"]
+        assert "news:NVDA" in update["prefetched_news"] and "news:AMD" in update["prefetched_news"]
+
+def test_prefetched_data_uses_a_tool_free_data_analyst(mock_create_agent):
+    mock_agent_executor = MagicMock()
+    mock_create_agent.return_value = mock_agent_executor
+    mock_agent_executor.invoke.return_value = {"messages": [MagicMock(content="Analysis")]}
+
+    data_analyst_node({"tickers": ["AAPL"], "query": "q", "prefetched_data": "P/E 30"})
+
+    assert mock_create_agent.call_args.kwargs["tools"] == []
+    message = mock_agent_executor.invoke.call_args.args[0]["messages"][0][1]
+    assert "P/E 30" in message
+
+def test_fanout_graph_runs_one_analyst_task_per_ticker(monkeypatch):
+    from src import graph
+    from src.agents import fanout
+
+    seen = []
+    monkeypatch.setattr(graph, "router_node", lambda state: {"tickers": ["NVDA", "AMD", "TSM"]})
+    monkeypatch.setattr(graph, "quant_metrics_node", lambda state: {"risk_metrics": {}})
+    monkeypatch.setattr(graph, "risk_manager_node", lambda state: {"risk_assessment": "risk"})
+    monkeypatch.setattr(graph, "editor_node", lambda state: {"final_report": state["data_analysis"] + "\n" + state["news_analysis"]})
+
+    def fake_data_analyst(task):
+        seen.append(task["tickers"])
+        return {"data_analysis": f"data {task['tickers'][0]}"}
+
+    monkeypatch.setattr(fanout, "data_analyst_node", fake_data_analyst)
+    monkeypatch.setattr(fanout, "news_analyst_node", lambda task: {"news_analysis": f"news {task['tickers'][0]}"})
+
+    result = graph.create_graph("fanout").invoke(graph.initial_state("Compare NVDA, AMD and TSM"))
+
+    assert sorted(seen) == [["AMD"], ["NVDA"], ["TSM"]]
+    assert set(result["ticker_data_analyses"]) == {"NVDA", "AMD", "TSM"}
+    # Merged in the router's ticker order, one section per ticker
+    assert result["data_analysis"].index("## NVDA") < result["data_analysis"].index("## AMD") < result["data_analysis"].index("## TSM")
+    assert "news TSM" in result["final_report"]
+
+def test_router_fast_path_skips_the_llm_for_simple_queries():
+    from src.agents import router
+
+    with patch.object(router, "create_agent") as mock_create:
+        routing = router.router_node({"query": "比較台積電跟輝達"})
+        mock_create.assert_not_called()
+    assert routing["tickers"] == ["2330.TW", "NVDA"]
+    assert "2330.TW, NVDA" in routing["data_analyst_instructions"]
+
+    assert router.fast_route("Is NVDA overvalued given Blackwell delays?") is None
+    assert router.fast_route("Analyze XYZQ") is None
+
+def test_router_validates_llm_tickers():
+    from langchain_core.messages import AIMessage
+    from src.agents import router
+
+    message = AIMessage(content="", tool_calls=[{
+        "name": "submit_routing_instructions", "id": "1",
+        "args": {"tickers": ["Nvidia", "N/A", "TSM"], "data_analyst_instructions": "d", "news_analyst_instructions": "n"},
+    }])
+    routing = router._parse_routing({"messages": [message]}, {"query": "q"})
+    assert routing["tickers"] == ["NVDA", "TSM"]
+
+def test_run_scope_shares_tool_results_across_parallel_analysts(monkeypatch, tmp_path):
+    import yfinance
+    from src import graph
+    from src.tools import news_index
+    from src.tools.run_scope import run_scope
+    from src.tools.search_tools import fetch_ticker_news
+
+    created = []
+
+    class FakeTicker:
+        def __init__(self, ticker, session=None):
+            created.append(ticker)
+            self.news = [{"content": {"title": f"{ticker} news", "summary": "s", "link": "https://example.com"}}]
+
+    monkeypatch.setattr(yfinance, "Ticker", FakeTicker)
+    monkeypatch.setattr(news_index, "_index", news_index.NewsIndex(str(tmp_path / "news.sqlite3")))
+    monkeypatch.setenv("NEWS_INDEX_TTL", "0")
+    monkeypatch.setattr(graph, "router_node", lambda state: {"tickers": ["NVDA"]})
+    monkeypatch.setattr(graph, "quant_metrics_node", lambda state: {"risk_metrics": {}})
+    # Both analysts (running in parallel) ask for the same news, the news analyst twice
+    monkeypatch.setattr(graph, "data_analyst_node", lambda state: {"data_analysis": fetch_ticker_news("NVDA")})
+    monkeypatch.setattr(graph, "news_analyst_node", lambda state: {"news_analysis": fetch_ticker_news("nvda") + fetch_ticker_news("NVDA")})
+    monkeypatch.setattr(graph, "risk_manager_node", lambda state: {"risk_assessment": "risk"})
+    monkeypatch.setattr(graph, "editor_node", lambda state: {"final_report": "report"})
+
+    with run_scope() as scope:
+        result = graph.create_graph("react").invoke(graph.initial_state("Analyze NVDA"))
+
+    assert created == ["NVDA"]
+    assert result["upstream_calls"] == {"yahoo_news": 1}
+    assert scope.memo_hits == 2
+
+    # Outside a run scope nothing is memoized or counted
+    fetch_ticker_news("NVDA")
+    assert len(created) == 2
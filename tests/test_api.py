@@ -0,0 +1,159 @@
+import json
+import time
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph, END
+from src.state import AgentState
+from src.api import app
+
+def _fake_graph():
+    editor_agent = create_agent(
+        model=GenericFakeChatModel(messages=iter([AIMessage(content="Buy AAPL now")])),
+        tools=[],
+        system_prompt="editor",
+    )
+
+    async def editor(state):
+        result = await editor_agent.ainvoke({"messages": [("human", "report")]})
+        return {
+            "final_report": result["messages"][-1].content,
+            "context_tokens": {"editor": {"tokens_in": 120, "tokens_out": 80, "budget": 100}},
+        }
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("router", lambda state: {"tickers": ["AAPL"]})
+    workflow.add_node("data_analyst", lambda state: {"data_analysis": "Data"})
+    workflow.add_node("news_analyst", lambda state: {"news_analysis": "News"})
+    workflow.add_node("risk_manager", lambda state: {
+        "risk_assessment": "Risk",
+        "context_tokens": {"risk_manager": {"tokens_in": 90, "tokens_out": 90, "budget": 100}},
+    })
+    workflow.add_node("editor", editor)
+    workflow.set_entry_point("router")
+    workflow.add_edge("router", "data_analyst")
+    workflow.add_edge("router", "news_analyst")
+    workflow.add_edge(["data_analyst", "news_analyst"], "risk_manager")
+    workflow.add_edge("risk_manager", "editor")
+    workflow.add_edge("editor", END)
+    return workflow.compile()
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    return tmp_path
+
+def _wait_for_job(client, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def _parse_sse(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_research_stream_emits_node_and_token_events():
+    with patch("src.api.get_graph", return_value=_fake_graph()), TestClient(app) as client:
+        response = client.post("/research/stream", json={"query": "Analyze AAPL"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+
+    assert events[0][0] == "start" and events[0][1]["query"] == "Analyze AAPL"
+    nodes = [data["node"] for event, data in events if event == "node"]
+    assert nodes[0] == "router" and nodes[-1] == "editor"
+    assert set(nodes) == {"router", "data_analyst", "news_analyst", "risk_manager", "editor"}
+
+    tokens = "".join(data["content"] for event, data in events if event == "token")
+    assert tokens == "Buy AAPL now"
+
+    event, final = events[-1]
+    assert event == "final"
+    assert final["tickers"] == ["AAPL"]
+    assert final["final_report"] == "Buy AAPL now"
+
+def test_research_returns_job_id_and_job_completes():
+    with patch("src.api.get_graph", return_value=_fake_graph()), TestClient(app) as client:
+        response = client.post("/research", json={"query": "Analyze AAPL"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        job = _wait_for_job(client, job_id)
+
+    assert job["status"] == "completed"
+    assert job["state"]["tickers"] == ["AAPL"]
+    assert job["state"]["final_report"] == "Buy AAPL now"
+
+def test_job_and_stream_final_states_merge_context_tokens_of_every_node():
+    # A fresh graph per run, as the fake editor model answers only once
+    with patch("src.api.get_graph", side_effect=lambda: _fake_graph()), TestClient(app) as client:
+        streamed = client.post("/research/stream", json={"query": "Analyze AAPL", "bypass_cache": True})
+        job_id = client.post("/research", json={"query": "Analyze AAPL", "bypass_cache": True}).json()["job_id"]
+        job = _wait_for_job(client, job_id)
+
+    event, final = _parse_sse(streamed.text)[-1]
+    assert event == "final"
+    for state in (final, job["state"]):
+        assert set(state["context_tokens"]) == {"risk_manager", "editor"}
+        assert state["context_tokens"]["risk_manager"]["tokens_in"] == 90
+
+def test_unknown_job_returns_404():
+    with patch("src.api.get_graph", return_value=_fake_graph()), TestClient(app) as client:
+        assert client.get("/jobs/does-not-exist").status_code == 404
+
+def test_repeat_research_is_served_from_report_cache():
+    with patch("src.api.get_graph", return_value=_fake_graph()), TestClient(app) as client:
+        first = client.post("/research", json={"query": "Analyze AAPL"}).json()
+        _wait_for_job(client, first["job_id"])
+
+        second = client.post("/research", json={"query": "analyze aapl"}).json()
+        bypass = client.post("/research", json={"query": "analyze aapl", "bypass_cache": True}).json()
+        stats = client.get("/stats").json()
+
+        cached_job = client.get(f"/jobs/{second['job_id']}").json()
+
+    assert second["cached"] and second["status"] == "completed"
+    assert cached_job["state"]["final_report"] == "Buy AAPL now"
+    assert not bypass["cached"] and bypass["status"] == "queued"
+    assert stats["report_cache"]["hits"] == 1
+
+def test_metrics_endpoint_exposes_run_metrics():
+    with patch("src.api.get_graph", return_value=_fake_graph()), TestClient(app) as client:
+        client.post("/research/stream", json={"query": "Analyze AAPL", "bypass_cache": True})
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE research_run_duration_seconds histogram" in response.text
+    assert 'research_run_duration_seconds_count{status="ok"}' in response.text
+
+def test_research_continues_the_callers_trace(monkeypatch, data_dir):
+    from src import tracing
+
+    monkeypatch.setenv("TRACE_EXPORTER", "jsonl")
+    monkeypatch.setenv("TRACE_FILE", str(data_dir / "traces.jsonl"))
+    monkeypatch.setattr(tracing, "_exporter", None)
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    with patch("src.api.get_graph", return_value=_fake_graph()), TestClient(app) as client:
+        response = client.post(
+            "/research", json={"query": "Analyze MSFT"}, headers={"traceparent": f"00-{trace_id}-{parent_id}-01"}
+        )
+        assert response.json()["trace_id"] == trace_id
+        _wait_for_job(client, response.json()["job_id"])
+
+    spans = [json.loads(line) for line in (data_dir / "traces.jsonl").read_text().splitlines()]
+    root = next(span for span in spans if span["name"] == "research")
+    assert root["trace_id"] == trace_id and root["parent_span_id"] == parent_id
+    assert root["attributes"]["query"] == "Analyze MSFT"
@@ -0,0 +1,47 @@
+from src.compaction import compact, compact_sections, count_tokens
+
+FILLER = "The company continues to execute well and management remains confident about the long-term outlook. " * 6
+
+ANALYSIS = f"""## AAPL
+
+{FILLER}
+
+| Metric | Value |
+|---|---|
+| P/E | 28.5 |
+| Revenue Growth | 6.1% |
+
+{FILLER}
+
+Source: [Reuters](https://www.reuters.com/markets/aapl)
+
+**Risk Score (風險評分)**: 6/10
+"""
+
+def test_compact_keeps_tables_links_and_scores():
+    budget = count_tokens(ANALYSIS) // 3
+    compacted = compact(ANALYSIS, budget)
+
+    assert count_tokens(compacted) <= budget
+    assert "| P/E | 28.5 |\n| Revenue Growth | 6.1% |" in compacted
+    assert "https://www.reuters.com/markets/aapl" in compacted
+    assert "6/10" in compacted
+    assert "## AAPL" in compacted
+
+def test_compact_truncates_when_key_content_exceeds_budget():
+    compacted = compact(ANALYSIS, 20)
+    assert compacted.endswith("[... truncated to fit the token budget]")
+    assert compacted.startswith("## AAPL")
+
+def test_compact_sections_keeps_small_sections_and_reports_tokens(monkeypatch):
+    monkeypatch.setenv("EDITOR_TOKEN_BUDGET", str(count_tokens(ANALYSIS)))
+    sections, stats = compact_sections("editor", {"data_analysis": ANALYSIS, "news_analysis": ANALYSIS, "risk_assessment": "Low risk."})
+
+    assert sections["risk_assessment"] == "Low risk."
+    assert stats["tokens_in"] == 2 * count_tokens(ANALYSIS) + count_tokens("Low risk.")
+    assert stats["tokens_out"] <= stats["budget"] < stats["tokens_in"]
+
+    monkeypatch.setenv("EDITOR_TOKEN_BUDGET", "0")
+    sections, stats = compact_sections("editor", {"data_analysis": ANALYSIS})
+    assert sections["data_analysis"] == ANALYSIS
+    assert stats["tokens_out"] == stats["tokens_in"]
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from src.jobs import JobManager, JobQueueFull, JobStore, QUEUED, RUNNING, COMPLETED, FAILED
+
+class FakeGraph:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.queries = []
+
+    async def astream(self, state, stream_mode):
+        self.queries.append(state["query"])
+        state = {**state, "tickers": ["AAPL"]}
+        yield state
+        if self.fail:
+            raise RuntimeError("upstream down")
+        yield {**state, "final_report": f"Report for {state['query']}"}
+
+async def _drain(manager):
+    await manager._queue.join()
+
+def test_queued_jobs_survive_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    queued = store.create("Analyze AAPL")
+    interrupted = store.create("Analyze MSFT")
+    store.update(interrupted["job_id"], RUNNING, {"query": "Analyze MSFT"})
+    store.close()
+
+    async def restart():
+        graph = FakeGraph()
+        manager = JobManager(JobStore(path), lambda: graph, workers=1)
+        await manager.start()
+        await _drain(manager)
+        await manager.stop()
+        return manager, graph
+
+    manager, graph = asyncio.run(restart())
+
+    assert graph.queries == ["Analyze AAPL", "Analyze MSFT"]
+    for job_id in (queued["job_id"], interrupted["job_id"]):
+        job = manager.get(job_id)
+        assert job["status"] == COMPLETED
+        assert job["state"]["final_report"].startswith("Report for")
+
+def test_failed_job_keeps_partial_state(tmp_path):
+    async def run():
+        manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")), lambda: FakeGraph(fail=True), workers=1)
+        await manager.start()
+        job = manager.submit("Analyze AAPL")
+        await _drain(manager)
+        await manager.stop()
+        return manager.get(job["job_id"])
+
+    job = asyncio.run(run())
+
+    assert job["status"] == FAILED
+    assert job["error"] == "upstream down"
+    assert job["state"]["tickers"] == ["AAPL"]
+
+def test_submit_applies_backpressure(tmp_path):
+    async def run():
+        # No workers started, so nothing drains the queue
+        manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")), FakeGraph, workers=1, queue_size=2)
+        manager.submit("a")
+        manager.submit("b")
+        with pytest.raises(JobQueueFull):
+            manager.submit("c")
+        return manager
+
+    manager = asyncio.run(run())
+    assert manager.store.unfinished() and all(
+        manager.get(job_id)["status"] == QUEUED for job_id in manager.store.unfinished()
+    )
+
+def test_identical_queries_attach_to_in_flight_job(tmp_path):
+    async def run():
+        graph = FakeGraph()
+        manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")), lambda: graph, workers=1)
+        first = manager.submit("Analyze NVDA")
+        second = manager.submit("  analyze   nvda?")
+        await manager.start()
+        await _drain(manager)
+        # Once the first run has finished, the same query starts a new job
+        third = manager.submit("Analyze NVDA")
+        await _drain(manager)
+        await manager.stop()
+        return manager, graph, first, second, third
+
+    manager, graph, first, second, third = asyncio.run(run())
+
+    assert second["job_id"] == first["job_id"]
+    assert second["coalesced"] and not first["coalesced"]
+    assert third["job_id"] != first["job_id"]
+    assert manager.coalesced == 1
+    assert graph.queries == ["Analyze NVDA", "Analyze NVDA"]
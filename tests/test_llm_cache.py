@@ -0,0 +1,46 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from src.llm_cache import SQLiteLLMCache
+from src import utils
+
+def test_identical_prompts_are_answered_from_the_cache(tmp_path):
+    cache = SQLiteLLMCache(path=str(tmp_path / "llm.sqlite3"))
+    responses = iter([AIMessage(content="first"), AIMessage(content="second")])
+    llm = GenericFakeChatModel(messages=responses, cache=cache.view("editor"))
+
+    assert llm.invoke("Write the report").content == "first"
+    assert llm.invoke("Write the report").content == "first"
+    assert llm.invoke("Write another report").content == "second"
+
+    stats = cache.stats()
+    assert stats["nodes"]["editor"] == {"hits": 1, "misses": 2, "hit_rate": 0.3333}
+    assert stats["entries"] == 2
+
+def test_cache_persists_and_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = SQLiteLLMCache(path=path)
+    generations = [AIMessage(content="x" * 1000)]
+    cache.update("editor", "p1", "llm", generations)
+    cache.update("editor", "p2", "llm", generations)
+    cache.close()
+
+    reopened = SQLiteLLMCache(path=path, max_bytes=2500)
+    assert reopened.lookup("editor", "p1", "llm")[0].content == "x" * 1000
+    # p1 is now the most recently used; adding p3 over the budget evicts p2
+    reopened.update("editor", "p3", "llm", generations)
+    assert reopened.lookup("editor", "p2", "llm") is None
+    assert reopened.lookup("editor", "p1", "llm") is not None
+
+def test_get_llm_enables_the_cache_per_node(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_NODES", "editor")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(utils, "_create_llm", lambda provider, model, temperature, cache: {"cache": cache})
+    utils.clear_client_caches()
+    try:
+        assert utils.get_llm(node="editor")["cache"].node == "editor"
+        assert utils.get_llm(node="data_analyst")["cache"] is None
+        assert utils.get_llm(node="data_analyst") is utils.get_llm(node="router")
+    finally:
+        utils.clear_client_caches()
+        from src.llm_cache import close_llm_cache
+        close_llm_cache()
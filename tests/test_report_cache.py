@@ -0,0 +1,48 @@
+import time
+from datetime import datetime
+from src.report_cache import ReportCache, MARKET_TZ, trading_session_date
+
+def _state(query, report="Report"):
+    return {"query": query, "tickers": ["NVDA"], "final_report": report}
+
+def test_trading_session_date_rolls_back_before_open_and_on_weekends():
+    # Monday before the open belongs to Friday's session
+    assert trading_session_date(datetime(2026, 10, 12, 8, 0, tzinfo=MARKET_TZ)) == "2026-10-09"
+    assert trading_session_date(datetime(2026, 10, 12, 10, 0, tzinfo=MARKET_TZ)) == "2026-10-12"
+    assert trading_session_date(datetime(2026, 10, 11, 15, 0, tzinfo=MARKET_TZ)) == "2026-10-09"
+
+def test_lookup_hits_on_normalized_query_within_session(tmp_path):
+    cache = ReportCache(str(tmp_path / "cache.sqlite3"), ttl=3600)
+    assert cache.lookup("Analyze NVDA", session_date="2026-10-16") is None
+
+    cache.store(_state("Analyze NVDA"), session_date="2026-10-16")
+    hit = cache.lookup("analyze  nvda?", session_date="2026-10-16")
+
+    assert hit["final_report"] == "Report"
+    assert hit["cache"]["hit"] is True
+    assert cache.lookup("Analyze NVDA", session_date="2026-10-19") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_max_age_and_ttl_expire_entries(tmp_path):
+    cache = ReportCache(str(tmp_path / "cache.sqlite3"), ttl=3600)
+    cache.store(_state("Analyze NVDA"), session_date="2026-10-16")
+    time.sleep(0.01)
+
+    assert cache.lookup("Analyze NVDA", max_age=0, session_date="2026-10-16") is None
+    assert cache.lookup("Analyze NVDA", max_age=60, session_date="2026-10-16") is not None
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = ReportCache(str(tmp_path / "cache.sqlite3"), ttl=3600, max_entries=2)
+    cache.store(_state("q1"), session_date="2026-10-16")
+    cache.store(_state("q2"), session_date="2026-10-16")
+    cache.lookup("q1", session_date="2026-10-16")
+    cache.store(_state("q3"), session_date="2026-10-16")
+
+    assert cache.lookup("q1", session_date="2026-10-16") is not None
+    assert cache.lookup("q2", session_date="2026-10-16") is None
+    assert cache.stats()["entries"] == 2
+
+def test_runs_without_report_are_not_cached(tmp_path):
+    cache = ReportCache(str(tmp_path / "cache.sqlite3"))
+    cache.store({"query": "q", "tickers": [], "final_report": None}, session_date="2026-10-16")
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,28 @@
+import asyncio
+from src.singleflight import SingleFlight
+
+def test_concurrent_streams_share_one_source():
+    started = []
+
+    async def source(name):
+        started.append(name)
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield f"{name}-{i}"
+
+    async def collect(flights, name):
+        return [item async for item in flights.stream("nvda", lambda: source(name))]
+
+    async def run():
+        flights = SingleFlight()
+        first = asyncio.create_task(collect(flights, "a"))
+        await asyncio.sleep(0.015)  # join after the first item was produced
+        second = asyncio.create_task(collect(flights, "b"))
+        results = await asyncio.gather(first, second)
+        return flights, results
+
+    flights, (first, second) = asyncio.run(run())
+
+    assert started == ["a"]
+    assert first == second == ["a-0", "a-1", "a-2"]
+    assert (flights.executed, flights.coalesced, flights.in_flight()) == (1, 1, 0)
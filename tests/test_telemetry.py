@@ -0,0 +1,69 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+def _llm():
+    from src.telemetry import LLMUsageHandler
+
+    message = AIMessage(content="ok", usage_metadata={"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200})
+    return GenericFakeChatModel(messages=iter([message]), callbacks=[LLMUsageHandler("gpt-5-mini")])
+
+def test_graph_run_reports_per_node_timings_and_metrics(monkeypatch):
+    from src import graph, telemetry
+    from src.tools import finance_tools
+    from src.tools.finance_tools import get_stock_data
+    from src.tools.run_scope import run_scope
+
+    monkeypatch.setattr(finance_tools, "format_stock_data", lambda ticker: f"Error fetching data for {ticker}: 429")
+    monkeypatch.setattr(graph, "router_node", lambda state: {"tickers": ["NVDA"]})
+    monkeypatch.setattr(graph, "data_analyst_node", lambda state: {"data_analysis": get_stock_data.invoke({"ticker": "NVDA"})})
+    monkeypatch.setattr(graph, "news_analyst_node", lambda state: {"news_analysis": _llm().invoke("news").content})
+    monkeypatch.setattr(graph, "quant_metrics_node", lambda state: {"risk_metrics": {}})
+    monkeypatch.setattr(graph, "risk_manager_node", lambda state: {"risk_assessment": "risk"})
+    monkeypatch.setattr(graph, "editor_node", lambda state: {"final_report": "report"})
+    tool_errors = telemetry.TOOL_ERRORS.value(tool="get_stock_data", node="data_analyst")
+
+    with run_scope():
+        state = graph.create_graph("react").invoke(graph.initial_state("NVDA"))
+
+    timings = state["timings"]
+    assert set(timings) == {"router", "data_analyst", "news_analyst", "quant_metrics", "risk_manager", "editor", "run"}
+    assert timings["news_analyst"]["llm_calls"] == 1
+    assert timings["news_analyst"]["prompt_tokens"] == 1000 and timings["news_analyst"]["completion_tokens"] == 200
+    # gpt-5-mini: $0.25 / $2.00 per million prompt / completion tokens
+    assert timings["news_analyst"]["cost_usd"] == 0.00065
+    assert timings["data_analyst"]["tool_calls"] == 1 and timings["data_analyst"]["errors"] == 1
+    assert timings["run"]["llm_calls"] == 1 and timings["run"]["seconds"] >= timings["editor"]["seconds"]
+
+    assert telemetry.TOOL_ERRORS.value(tool="get_stock_data", node="data_analyst") == tool_errors + 1
+    metrics = telemetry.render_metrics()
+    assert '# TYPE research_node_duration_seconds histogram' in metrics
+    assert 'research_node_duration_seconds_bucket{node="editor",le="+Inf"}' in metrics
+    assert 'research_llm_tokens_total{node="news_analyst",model="gpt-5-mini",kind="completion"}' in metrics
+
+def test_histogram_buckets_are_cumulative():
+    from src.telemetry import Histogram
+
+    histogram = Histogram("latency_seconds", "Latency", ["node"], buckets=(1, 5))
+    for value in (0.5, 2, 2, 10):
+        histogram.observe(value, node='a"b')
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{node="a\\"b",le="1"} 1' in lines
+    assert 'latency_seconds_bucket{node="a\\"b",le="5"} 3' in lines
+    assert 'latency_seconds_bucket{node="a\\"b",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{node="a\\"b"} 14.5' in lines
+
+def test_cached_llm_responses_count_as_hits_without_tokens_or_cost(tmp_path):
+    from src.llm_cache import SQLiteLLMCache
+    from src.telemetry import LLMUsageHandler, node_span, run_timings
+
+    cache = SQLiteLLMCache(path=str(tmp_path / "llm.sqlite3"))
+    message = AIMessage(content="report", usage_metadata={"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200})
+    llm = GenericFakeChatModel(messages=iter([message]), cache=cache.view("editor"), callbacks=[LLMUsageHandler("gpt-5-mini")])
+
+    with run_timings() as timings, node_span("editor"):
+        assert llm.invoke("Write the report").content == llm.invoke("Write the report").content == "report"
+
+    editor = timings.snapshot()["editor"]
+    assert editor["llm_calls"] == 1 and editor["llm_cache_hits"] == 1
+    assert editor["prompt_tokens"] == 1000 and editor["completion_tokens"] == 200 and editor["cost_usd"] == 0.00065
+    cache.close()
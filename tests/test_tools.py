@@ -0,0 +1,617 @@
+import asyncio
+import threading
+import pytest
+from langchain_core.tools import tool
+from src.tools.pool import offload_to_pool
+
+def test_offloaded_tool_runs_on_tool_pool():
+    @offload_to_pool
+    @tool
+    def whoami(label: str) -> str:
+        """Returns the label and the executing thread name."""
+        return f"{label}:{threading.current_thread().name}"
+
+    # Sync invocation is unchanged
+    assert whoami.invoke({"label": "sync"}) == f"sync:{threading.current_thread().name}"
+
+    result = asyncio.run(whoami.ainvoke({"label": "async"}))
+    assert result.startswith("async:tool")
+
+def _wait_until(predicate, timeout=2):
+    import time
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_market_data_cache_serves_stale_and_refreshes_in_background(tmp_path, monkeypatch):
+    from src.tools import market_data
+    calls = []
+
+    def fake_fetch_info(ticker):
+        calls.append(ticker)
+        return {"symbol": ticker, "version": len(calls)}
+
+    monkeypatch.setattr(market_data, "fetch_info", fake_fetch_info)
+    cache = market_data.MarketDataCache(cache_dir=str(tmp_path), info_ttl=0, stale_ttl=3600)
+
+    assert cache.get_info("nvda")["version"] == 1
+    # Past the TTL: the stale value is returned immediately and refreshed in the background
+    assert cache.get_info("NVDA")["version"] == 1
+    assert _wait_until(lambda: cache.stats["refreshes"] == 1)
+    assert cache._entries[("info", "NVDA")][1]["version"] == 2
+
+def test_market_data_cache_persists_to_disk(tmp_path, monkeypatch):
+    from src.tools import market_data
+    calls = []
+    monkeypatch.setattr(market_data, "fetch_info", lambda ticker: calls.append(ticker) or {"symbol": ticker})
+
+    market_data.MarketDataCache(cache_dir=str(tmp_path), info_ttl=3600).get_info("AAPL")
+    restarted = market_data.MarketDataCache(cache_dir=str(tmp_path), info_ttl=3600)
+
+    assert restarted.get_info("AAPL") == {"symbol": "AAPL"}
+    assert calls == ["AAPL"]
+    assert restarted.stats["hits"] == 1
+
+def _price_history(start=100.0, end=150.0, days=260):
+    import numpy as np
+    import pandas as pd
+    index = pd.date_range("2025-01-01", periods=days, freq="B")
+    close = np.linspace(start, end, days)
+    return pd.DataFrame(
+        {"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1_000_000.0},
+        index=index,
+    )
+
+def test_get_histories_batches_uncached_tickers(tmp_path, monkeypatch):
+    from src.tools import market_data
+    batches = []
+
+    def fake_fetch_histories(tickers, period="1y", interval="1d"):
+        batches.append(list(tickers))
+        return {ticker: _price_history() for ticker in tickers}
+
+    monkeypatch.setattr(market_data, "fetch_histories", fake_fetch_histories)
+    cache = market_data.MarketDataCache(cache_dir=str(tmp_path), history_ttl=3600)
+
+    cache.get_histories(["NVDA", "AMD"])
+    histories = cache.get_histories(["NVDA", "AMD", "INTC"])
+
+    assert batches == [["NVDA", "AMD"], ["INTC"]]
+    assert set(histories) == {"NVDA", "AMD", "INTC"}
+
+def test_get_multi_stock_data_returns_comparison_table(monkeypatch):
+    from src.tools import finance_tools
+
+    monkeypatch.setattr(finance_tools, "get_histories", lambda tickers, period: {"NVDA": _price_history(), "AMD": _price_history(100, 80)})
+    monkeypatch.setattr(finance_tools, "get_infos", lambda tickers: {"NVDA": {"marketCap": 4.1e12, "trailingPE": 50.123}, "AMD": {}})
+
+    table = finance_tools.get_multi_stock_data.invoke({"tickers": ["nvda", "AMD"]})
+    lines = table.splitlines()
+
+    assert lines[0].startswith("| Ticker | Price |")
+    assert lines[2].startswith("| NVDA | 150.00 |") and "4.10T" in lines[2] and "50.12" in lines[2]
+    assert lines[3].startswith("| AMD | 80.00 |") and "-20.0%" in lines[3]
+
+def test_compact_stock_data_rounds_and_omits_missing_fields(monkeypatch):
+    from src.tools import finance_tools
+
+    monkeypatch.setattr(finance_tools, "get_history", lambda ticker, period: _price_history())
+    monkeypatch.setattr(finance_tools, "get_info", lambda ticker: {"marketCap": 4.1234e12, "trailingPE": 50.1234567, "pegRatio": None})
+
+    compact = finance_tools.format_stock_data("NVDA")
+    assert "| 4.12T | 50.12 |" in compact
+    assert "PEG" not in compact and "None" not in compact
+
+    monkeypatch.setenv("TOOL_OUTPUT_MODE", "verbose")
+    verbose = finance_tools.format_stock_data("NVDA")
+    assert "'PEG Ratio': None" in verbose and "50.1234567" in verbose
+
+    # Non-numeric values reported by yfinance are treated as missing rather than failing the tool
+    monkeypatch.setattr(finance_tools, "get_info", lambda ticker: {"marketCap": 4.1234e12, "trailingPE": "Infinity", "forwardPE": float("nan")})
+    monkeypatch.setenv("TOOL_OUTPUT_MODE", "compact")
+    compact = finance_tools.format_stock_data("NVDA")
+    assert "| 4.12T |" in compact and "P/E" not in compact and "Error" not in compact
+
+@pytest.fixture
+def news_index(tmp_path, monkeypatch):
+    from src.tools import news_index
+
+    index = news_index.NewsIndex(str(tmp_path / "news_index.sqlite3"))
+    monkeypatch.setattr(news_index, "_index", index)
+    yield index
+    index.close()
+
+def test_compact_news_caps_items_and_truncates_summaries(monkeypatch, news_index):
+    import yfinance
+    from src.tools import search_tools
+
+    class FakeTicker:
+        def __init__(self, ticker, session=None):
+            self.news = [
+                {"content": {"title": f"Headline {i}", "summary": " ".join(f"story{i}-word{k}" for k in range(100)), "pubDate": "2025-06-01T00:00:00Z",
+                             "provider": {"displayName": "Reuters"}, "clickThroughUrl": {"url": f"https://example.com/{i}"}}}
+                for i in range(12)
+            ]
+
+    monkeypatch.setattr(yfinance, "Ticker", FakeTicker)
+    monkeypatch.setenv("NEWS_TOP_K", "3")
+    monkeypatch.setenv("NEWS_SUMMARY_CHARS", "50")
+
+    news = search_tools.fetch_ticker_news("NVDA")
+    lines = news.splitlines()
+    assert lines[0] == "- Headline 0 (Reuters, 2025-06-01) https://example.com/0"
+    assert len(lines[1].strip()) <= 51 and lines[1].endswith("…")
+    assert "Headline 3" not in news and lines[-1] == "(9 lower-ranked items omitted)"
+
+def test_compute_metrics_matches_pandas_reference():
+    import numpy as np
+    import pandas as pd
+    from src.tools.metrics import compute_metrics
+
+    rng = np.random.default_rng(7)
+    index = pd.bdate_range("2025-01-01", periods=252)
+    bench_returns = rng.normal(0, 0.01, 252)
+    stock_close = 100 * np.exp(np.cumsum(1.5 * bench_returns + rng.normal(0, 0.005, 252)))
+    volume = rng.integers(1_000_000, 2_000_000, 252).astype(float)
+
+    def frame(close):
+        return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": volume}, index=index)
+
+    stock, bench = frame(stock_close), frame(100 * np.exp(np.cumsum(bench_returns)))
+    # A second ticker with a shorter history exercises the alignment path
+    metrics = compute_metrics({"AAA": stock, "BBB": stock.iloc[100:]}, benchmark=bench, risk_free_rate=0.0)
+
+    close = stock["Close"]
+    log_returns = np.log(close).diff().dropna()
+    bench_log_returns = np.log(bench["Close"]).diff().dropna()
+    true_range = pd.concat([stock["High"] - stock["Low"], (stock["High"] - close.shift()).abs(), (stock["Low"] - close.shift()).abs()], axis=1).max(axis=1)
+
+    m = metrics["AAA"]
+    assert m["volatility_1y"] == round(log_returns.std() * np.sqrt(252), 4)
+    assert m["max_drawdown"] == round((close / close.cummax() - 1).min(), 4)
+    assert abs(m["beta_1y"] - log_returns.cov(bench_log_returns) / bench_log_returns.var()) < 1e-3
+    assert m["atr_14_pct"] == round(true_range.rolling(14).mean().iloc[-1] / close.iloc[-1], 4)
+    assert m["sma_50"] == round(close.rolling(50).mean().iloc[-1], 4)
+    assert metrics["BBB"]["sma_200"] is None
+    assert metrics["BBB"]["return_1y"] == round(close.iloc[-1] / close.iloc[100] - 1, 4)
+
+def test_compute_metrics_aligns_tickers_from_different_exchanges():
+    import numpy as np
+    import pandas as pd
+    from src.tools.metrics import compute_metrics
+
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range("2025-01-01", periods=252)
+
+    def frame(tz):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1e6},
+                            index=dates.tz_localize(tz))
+
+    us, tw, bench = frame("America/New_York"), frame("Asia/Taipei"), frame("America/New_York")
+    mixed = compute_metrics({"NVDA": us, "2330.TW": tw}, benchmark=bench)
+
+    assert mixed["NVDA"] == compute_metrics({"NVDA": us}, benchmark=bench)["NVDA"]
+    assert mixed["2330.TW"] == compute_metrics({"2330.TW": tw}, benchmark=bench)["2330.TW"]
+    for name in ("volatility_1y", "volatility_20d", "sharpe", "beta_1y", "beta_60d"):
+        assert mixed["NVDA"][name] is not None and mixed["2330.TW"][name] is not None
+
+def test_compute_metrics_of_a_ticker_do_not_depend_on_other_tickers_sessions():
+    import numpy as np
+    import pandas as pd
+    from src.tools.metrics import compute_metrics
+
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range("2025-01-01", periods=253)
+
+    def frame(index):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        volume = rng.integers(1_000_000, 2_000_000, len(index)).astype(float)
+        return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": volume}, index=index)
+
+    # 2330.TW trades a final session NVDA does not, and NVDA trades one 2330.TW does not
+    us = frame(dates[:-1].tz_localize("America/New_York"))
+    tw = frame(dates.delete(200).tz_localize("Asia/Taipei"))
+    bench = frame(dates[:-1].tz_localize("America/New_York"))
+
+    mixed = compute_metrics({"NVDA": us, "2330.TW": tw}, benchmark=bench)
+    assert mixed["NVDA"] == compute_metrics({"NVDA": us}, benchmark=bench)["NVDA"]
+    assert mixed["2330.TW"] == compute_metrics({"2330.TW": tw}, benchmark=bench)["2330.TW"]
+    assert mixed["NVDA"]["atr_14_pct"] is not None and mixed["NVDA"]["volume_zscore"] is not None
+
+def _daily_bars(start, days, base=100.0):
+    import numpy as np
+    import pandas as pd
+    index = pd.bdate_range(start, periods=days, tz="America/New_York")
+    close = base + np.arange(days, dtype=float)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1000.0}, index=index)
+
+def test_price_store_fetches_only_missing_bars(tmp_path, monkeypatch):
+    import os
+    import pandas as pd
+    from src.tools import price_store
+
+    now = pd.Timestamp.now(tz="America/New_York").normalize()
+    full = _daily_bars(now - pd.Timedelta(days=400), 280)
+    calls = []
+
+    def fake_download(ticker, interval="1d", period=None, start=None):
+        calls.append({"period": period, "start": start})
+        if start is None:
+            return full
+        # The revised last bar plus two new ones
+        extra = _daily_bars(full.index[-1] + pd.offsets.BDay(1), 2, base=full["Close"].iloc[-1] + 1)
+        return pd.concat([full.iloc[-1:], extra])
+
+    monkeypatch.setattr(price_store, "download_history", fake_download)
+    store = price_store.PriceStore(root=str(tmp_path), min_refresh=0)
+
+    first = store.get("NVDA", period="1y")
+    second = store.get("NVDA", period="1y")
+    one_month = store.get("NVDA", period="1mo")
+
+    assert calls[0] == {"period": "1y", "start": None}
+    assert all(call["period"] is None for call in calls[1:])
+    assert calls[1]["start"].normalize() == full.index[-1].normalize()
+    assert len(store.read("NVDA")) == len(full) + 2
+    # An unchanged re-fetched last bar is not appended again
+    data_path, _ = store._paths("NVDA", "1d")
+    assert os.path.getsize(data_path) == (len(full) + 2) * price_store.BAR_DTYPE.itemsize
+    assert second.index[-1] > first.index[-1]
+    assert one_month.index[0] >= now - pd.Timedelta(days=31)
+    assert store.stats["full_fetches"] == 1
+
+def test_price_store_refetches_when_history_is_readjusted(tmp_path, monkeypatch):
+    from src.tools import price_store
+
+    bars = _daily_bars("2025-01-01", 30)
+    adjusted = bars / 2  # e.g. a 2:1 split re-adjusts every past bar
+    responses = iter([bars, adjusted.iloc[-1:], adjusted])
+    monkeypatch.setattr(price_store, "download_history", lambda *args, **kwargs: next(responses))
+    store = price_store.PriceStore(root=str(tmp_path), min_refresh=0)
+
+    store.get("AAPL", period="max")
+    history = store.get("AAPL", period="max")
+
+    assert store.stats["full_fetches"] == 2
+    assert history["Close"].iloc[0] == bars["Close"].iloc[0] / 2
+
+def _write_test_universe(root):
+    import numpy as np
+    import pandas as pd
+    from src.tools import screener
+
+    tickers = ["NVDA", "AMD", "INTC", "KO"]
+    infos = [
+        {"shortName": "NVIDIA", "sector": "Technology", "industry": "Semiconductors", "trailingPE": 45.0, "revenueGrowth": 0.9, "marketCap": 3e12},
+        {"shortName": "AMD", "sector": "Technology", "industry": "Semiconductors", "trailingPE": 30.0, "revenueGrowth": 0.25, "marketCap": 2.5e11},
+        {"shortName": "Intel", "sector": "Technology", "industry": "Semiconductors", "trailingPE": None, "revenueGrowth": -0.05},
+        {"shortName": "Coca-Cola", "sector": "Consumer Defensive", "industry": "Beverages", "trailingPE": 22.0, "revenueGrowth": 0.03, "dividendYield": 2.9},
+    ]
+    dates = pd.bdate_range("2025-01-01", periods=30)
+    closes = pd.DataFrame({t: np.linspace(100, 100 + 10 * i, len(dates)) for i, t in enumerate(tickers)}, index=dates)
+    return screener.write_universe("test", tickers, infos, closes, root=str(root))
+
+def test_screener_filters_and_ranks_memory_mapped_columns(tmp_path):
+    import numpy as np
+    universe = _write_test_universe(tmp_path)
+
+    assert isinstance(universe.columns["pe"], np.memmap)
+    frame, total = universe.screen("industry ~ semi, revenue_growth > 20%", sort_by="pe")
+    assert total == 2
+    assert list(frame["ticker"]) == ["AMD", "NVDA"]
+
+    frame, _ = universe.screen("", sort_by="-market_cap", limit=1)
+    assert list(frame["ticker"]) == ["NVDA"]
+
+    # Missing values never match a numeric condition
+    frame, _ = universe.screen("pe < 100")
+    assert "INTC" not in set(frame["ticker"])
+
+    frame, _ = universe.screen("dividend_yield >= 2.5%, return_5d > 0")
+    assert list(frame["ticker"]) == ["KO"]
+
+def test_screener_rejects_bad_filters(tmp_path):
+    import pytest
+    universe = _write_test_universe(tmp_path)
+    with pytest.raises(ValueError):
+        universe.screen("pe is cheap")
+    with pytest.raises(ValueError):
+        universe.screen("moat > 3")
+
+def test_screener_picks_up_a_new_refresh(tmp_path):
+    from src.tools import screener
+    first = _write_test_universe(tmp_path)
+    assert screener.get_universe("test", root=str(tmp_path)) is first
+    second = _write_test_universe(tmp_path)
+    assert second is not first
+    assert screener.get_universe("test", root=str(tmp_path)) is second
+    assert screener.get_universe("missing", root=str(tmp_path)) is None
+
+def test_symbol_index_resolves_tickers_names_and_chinese_aliases():
+    from src.tools.symbols import SymbolIndex, SYMBOLS, is_simple_query
+
+    index = SymbolIndex(SYMBOLS)
+    assert index.resolve("台積電和輝達的比較")[0] == ["2330.TW", "NVDA"]
+    assert index.resolve("Compare TSMC vs Nvidia")[0] == ["TSM", "NVDA"]
+    # Longest match wins; Latin names only match whole words
+    assert index.resolve("超微電腦 vs 超微")[0] == ["SMCI", "AMD"]
+    assert index.resolve("metaverse stocks")[0] == []
+    assert index.resolve("分析2330")[0] == ["2330.TW"]
+
+    tickers, unknown, remainder = index.resolve("Analyze AAPL and XYZQ")
+    assert tickers == ["AAPL"] and unknown == ["XYZQ"]
+    assert is_simple_query(index.resolve("Analyze AAPL and MSFT")[2])
+    assert not is_simple_query(index.resolve("Is NVDA overvalued given Blackwell delays?")[2])
+
+def test_aho_corasick_reports_overlapping_matches():
+    from src.tools.symbols import AhoCorasick
+
+    matcher = AhoCorasick({"he": "he", "she": "she", "his": "his", "hers": "hers"})
+    assert sorted(value for _, _, value in matcher.find("ushers")) == ["he", "hers", "she"]
+
+def test_validate_tickers_maps_names_and_drops_bad_symbols(monkeypatch):
+    from src.tools.symbols import validate_tickers
+
+    assert validate_tickers(["nvidia", "AAPL", "aapl", "bad ticker!", "2330", ""]) == ["NVDA", "AAPL", "2330.TW"]
+    # Crypto, index, FX and futures symbols are valid Yahoo symbols too
+    assert validate_tickers(["BTC-USD", "^gspc", "EURUSD=X", "GC=F", "BRK-B"]) == ["BTC-USD", "^GSPC", "EURUSD=X", "GC=F", "BRK-B"]
+    assert validate_tickers(["^", "EUR=F=X", "BTC-"]) == []
+    monkeypatch.setenv("SYMBOL_VALIDATION", "strict")
+    assert validate_tickers(["MSFT", "ZZZZ"]) == ["MSFT"]
+
+def test_run_scope_memoizes_results_but_not_errors():
+    from src.tools.run_scope import memoize_in_run, run_scope
+
+    calls = []
+
+    @memoize_in_run(key=lambda ticker: ticker.upper())
+    def flaky(ticker):
+        calls.append(ticker)
+        if len(calls) == 1:
+            raise RuntimeError("upstream down")
+        return f"data {ticker}"
+
+    with run_scope():
+        try:
+            flaky("nvda")
+        except RuntimeError:
+            pass
+        assert flaky("nvda") == "data nvda"
+        assert flaky("NVDA") == "data nvda"
+    assert calls == ["nvda", "nvda"]
+
+    with run_scope():
+        assert flaky("NVDA") == "data NVDA"
+    assert len(calls) == 3
+
+    # Tools report failures as "Error ..." strings; those are not memoized either
+    attempts = []
+
+    @memoize_in_run()
+    def tool_body(ticker):
+        attempts.append(ticker)
+        return f"Error fetching data for {ticker}: timeout" if len(attempts) == 1 else f"data {ticker}"
+
+    with run_scope():
+        assert tool_body("AMD").startswith("Error")
+        assert tool_body("AMD") == tool_body("AMD") == "data AMD"
+    assert attempts == ["AMD", "AMD"]
+
+def test_dedup_news_collapses_syndicated_copies_and_ranks_by_recency():
+    from datetime import datetime, timezone
+    from src.tools.news_dedup import dedup_news
+
+    story = ("Nvidia shares rose on Thursday after quarterly results beat expectations as data center revenue "
+             "jumped on strong demand for Blackwell chips, the company said, adding that supply would improve")
+    items = [
+        {"title": "Nvidia beats estimates - Reuters", "summary": story, "publisher": "Reuters", "published": "2025-06-05T10:00:00Z"},
+        {"title": "UPDATE 1-Nvidia beats estimates", "summary": story[:150], "publisher": "Yahoo", "published": "2025-06-05T11:00:00Z"},
+        {"title": "Nvidia beats estimates | MarketWatch", "summary": story, "publisher": "MarketWatch", "published": "2025-06-05T12:00:00Z"},
+        {"title": "Apple unveils new iPhone lineup", "summary": "Apple unveiled its new iPhones with bigger batteries and a thinner design at its annual event in Cupertino on Tuesday.",
+         "publisher": "AP", "published": "2025-06-06T09:00:00Z"},
+        {"title": "Old chip story", "summary": "Semiconductor stocks were mixed last month as investors weighed tariffs, inventories and a slowing PC market.",
+         "publisher": "CNBC", "published": "2025-05-01T00:00:00Z"},
+    ]
+
+    ranked = dedup_news(items, terms=["NVDA", "Nvidia"], now=datetime(2025, 6, 6, 12, tzinfo=timezone.utc))
+
+    assert len(ranked) == 3
+    top = ranked[0]
+    assert top["sources"] == 3 and top["publishers"] == ["Reuters", "Yahoo", "MarketWatch"]
+    assert top["summary"] == story
+    assert [item["title"] for item in ranked[1:]] == ["Apple unveils new iPhone lineup", "Old chip story"]
+
+def test_web_search_returns_deduplicated_items(monkeypatch, news_index):
+    from src.tools import search_tools
+
+    class FakeSearch:
+        def __init__(self, **kwargs):
+            assert kwargs["output_format"] == "list"
+
+        def run(self, query):
+            snippet = "TSMC said 2nm production is on track for the second half, with Apple and Nvidia among the first customers for the new node."
+            return [
+                {"title": "TSMC 2nm on track", "link": f"https://site{i}.com/tsmc", "snippet": snippet, "source": f"Site {i}", "date": "2025-06-01T00:00:00+00:00"}
+                for i in range(4)
+            ]
+
+    monkeypatch.setattr(search_tools, "DuckDuckGoSearchResults", FakeSearch)
+
+    result = search_tools.web_search.invoke({"query": "TSMC 2nm progress"})
+    assert result.splitlines()[0] == "- TSMC 2nm on track (Site 0, 2025-06-01, 4 sources) https://site0.com/tsmc"
+    assert result.count("TSMC 2nm on track") == 1
+
+def test_ticker_news_is_served_from_the_local_index_while_fresh(monkeypatch, news_index):
+    import yfinance
+    from src.tools import search_tools
+
+    fetched = []
+
+    class FakeTicker:
+        def __init__(self, ticker, session=None):
+            self.ticker = ticker
+
+        @property
+        def news(self):
+            fetched.append(self.ticker)
+            return [{"content": {"title": "Nvidia Blackwell ramp on track", "summary": "Supply of Blackwell GPUs improves.",
+                                 "pubDate": "2025-06-01T00:00:00Z", "clickThroughUrl": {"url": "https://example.com/nvda"}}}]
+
+    monkeypatch.setattr(yfinance, "Ticker", FakeTicker)
+    monkeypatch.setenv("NEWS_INDEX_WINDOW_DAYS", "100000")
+
+    first = search_tools.fetch_ticker_news("NVDA")
+    second = search_tools.fetch_ticker_news("NVDA")
+    assert fetched == ["NVDA"] and first == second
+
+    # Stale: the remote source is asked again
+    monkeypatch.setenv("NEWS_INDEX_TTL", "0")
+    search_tools.fetch_ticker_news("NVDA")
+    assert fetched == ["NVDA", "NVDA"]
+    assert news_index.stats()["items"] == 1
+
+def test_local_news_search_by_keyword_ticker_and_time_window(news_index):
+    from datetime import datetime, timezone
+    from src.tools.search_tools import search_local_news
+
+    news_index.add([
+        {"title": "台積電法說會釋出樂觀展望", "link": "https://example.com/1", "summary": "2奈米需求強勁", "published": "2025-06-01T00:00:00Z"},
+        {"title": "TSMC raises capex", "link": "https://example.com/2", "summary": "AI demand lifts spending", "published": "2025-05-01T00:00:00Z"},
+    ], tickers=["2330.TW"])
+    news_index.add([{"title": "Nvidia AI chips sell out", "link": "https://example.com/3", "summary": "AI demand", "published": "2025-06-02T00:00:00Z"}], tickers=["NVDA"])
+
+    assert [i["link"] for i in news_index.search("法說會")] == ["https://example.com/1"]
+    assert [i["link"] for i in news_index.search("AI demand")] == ["https://example.com/3", "https://example.com/2"]
+    assert [i["link"] for i in news_index.search("AI", tickers=["2330.TW"])] == ["https://example.com/2"]
+    since = datetime(2025, 5, 15, tzinfo=timezone.utc)
+    assert [i["link"] for i in news_index.search(tickers=["2330.TW"], since=since)] == ["https://example.com/1"]
+
+    result = search_local_news.invoke({"query": "capex", "tickers": ["2330.TW"], "days": 0})
+    assert "TSMC raises capex" in result and "法說會" not in result
+
+def test_cassette_records_responses_and_replays_them_offline(tmp_path, monkeypatch, news_index):
+    import pandas as pd
+    import yfinance
+    from src.tools import cassette, market_data, price_store, search_tools
+    from src.tools.run_scope import run_scope
+
+    bars = _daily_bars("2024-01-01", 300)
+
+    class FakeTicker:
+        def __init__(self, ticker, session=None):
+            self.info = {"symbol": ticker, "currentPrice": 123.4, "pegRatio": None}
+            self.news = [{"content": {"title": "Nvidia Blackwell ramp on track", "summary": "Supply of Blackwell GPUs improves.",
+                                      "pubDate": "2025-06-01T00:00:00Z", "clickThroughUrl": {"url": "https://example.com/nvda"}}}]
+
+        def history(self, period=None, start=None, interval="1d"):
+            return bars.iloc[:-5] if start is None else bars.iloc[-10:]
+
+    monkeypatch.setattr(yfinance, "Ticker", FakeTicker)
+    monkeypatch.setattr(cassette, "_cassette", cassette.Cassette(root=str(tmp_path / "cassettes"), mode="record"))
+    monkeypatch.setenv("NEWS_INDEX_TTL", "0")
+    info = market_data.fetch_info("NVDA")
+    news = search_tools.fetch_ticker_news("NVDA")
+    price_store.download_history("NVDA", period="max")
+    price_store.download_history("NVDA", start=bars.index[-10])
+
+    class Offline:
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("replay must not call yfinance")
+
+    monkeypatch.setattr(yfinance, "Ticker", Offline)
+    replay = cassette.Cassette(root=str(tmp_path / "cassettes"), mode="replay")
+    monkeypatch.setattr(cassette, "_cassette", replay)
+
+    with run_scope() as scope:
+        assert market_data.fetch_info("NVDA") == info
+        assert search_tools.fetch_ticker_news("NVDA") == news
+        # Replayed responses are not upstream requests
+        assert scope.stats() == {}
+    # Both recorded windows are merged; periods end at the last recorded bar
+    history = price_store.download_history("NVDA", period="max")
+    assert list(history.index) == list(bars.index) and (history["Close"] == bars["Close"]).all()
+    one_month = price_store.download_history("NVDA", period="1mo")
+    assert one_month.index[-1] == bars.index[-1] and one_month.index[0] >= bars.index[-1] - pd.Timedelta(days=30)
+    assert len(price_store.download_history("NVDA", start=bars.index[-3])) == 3
+    assert replay.stats()["replayed"] == 5
+
+    with pytest.raises(cassette.CassetteMiss, match="MARKET_DATA_MODE=record"):
+        market_data.fetch_info("AMD")
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+def test_upstream_retries_rate_limits_with_backoff_and_paces_requests():
+    from yfinance.exceptions import YFRateLimitError
+    from src.tools.upstream import Upstream
+
+    clock = FakeClock()
+    client = Upstream("finance.yahoo.com", rate=2, burst=1, retries=3, backoff=0.5, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now)
+        if len(attempts) < 3:
+            raise YFRateLimitError()
+        return "info"
+
+    assert client.call(flaky) == "info"
+    assert len(attempts) == 3
+    # Every attempt waits for a token: at most 2 requests per second after the burst
+    assert all(b - a >= 0.5 for a, b in zip(attempts, attempts[1:]))
+    assert client.stats()["retries"] == 2 and client.stats()["breaker"] == "closed"
+
+    # Non-transient errors are raised at once
+    with pytest.raises(KeyError):
+        client.call(lambda: {}["regularMarketPrice"])
+    assert client.stats()["calls"] == 4
+
+def test_upstream_circuit_breaker_fails_fast_then_recovers():
+    import requests
+    from src.tools.upstream import Upstream, UpstreamUnavailable
+
+    clock = FakeClock()
+    client = Upstream("duckduckgo.com", rate=0, burst=1, retries=1, breaker_threshold=2, breaker_reset=30,
+                      clock=clock, sleep=clock.sleep)
+    calls = []
+
+    def down():
+        calls.append(clock.now)
+        raise requests.ConnectionError("connection refused")
+
+    # The breaker counts failed calls, not attempts: each call here makes two attempts
+    with pytest.raises(requests.ConnectionError):
+        client.call(down)
+    assert len(calls) == 2 and client.stats()["breaker"] == "closed"
+    with pytest.raises(requests.ConnectionError):
+        client.call(down)
+    assert client.stats()["breaker"] == "open"
+    with pytest.raises(UpstreamUnavailable):
+        client.call(down)
+    assert len(calls) == 4
+
+    # A failed trial call is not retried and re-opens the breaker
+    clock.now += 30
+    with pytest.raises(requests.ConnectionError):
+        client.call(down)
+    assert len(calls) == 5 and client.stats()["breaker"] == "open"
+    with pytest.raises(UpstreamUnavailable):
+        client.call(down)
+
+    # After the reset period one trial call goes through and closes the breaker
+    clock.now += 30
+    assert client.call(lambda: "results") == "results"
+    assert client.stats()["breaker"] == "closed"
@@ -0,0 +1,64 @@
+import json
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+@pytest.fixture
+def exporter():
+    class Collect:
+        def __init__(self):
+            self.batches = []
+
+        def export(self, spans):
+            self.batches.append(spans)
+
+    return Collect()
+
+def test_graph_run_is_traced_with_node_tool_and_llm_spans(monkeypatch, exporter):
+    from src import graph, tracing
+    from src.tools import search_tools
+    from src.tools.run_scope import run_scope
+    from src.tools.search_tools import search_news
+
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    monkeypatch.setattr(search_tools, "fetch_ticker_news", lambda query: f"news {query}")
+    llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content="ok", usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})]),
+        callbacks=[tracing.LLMTraceHandler("gpt-5-mini")],
+    )
+    monkeypatch.setattr(graph, "router_node", lambda state: {"tickers": ["NVDA"]})
+    monkeypatch.setattr(graph, "data_analyst_node", lambda state: {"data_analysis": llm.invoke("data").content})
+    monkeypatch.setattr(graph, "news_analyst_node", lambda state: {"news_analysis": search_news.invoke({"query": "NVDA"})})
+    monkeypatch.setattr(graph, "quant_metrics_node", lambda state: {"risk_metrics": {}})
+    monkeypatch.setattr(graph, "risk_manager_node", lambda state: {"risk_assessment": "risk"})
+    monkeypatch.setattr(graph, "editor_node", lambda state: {"final_report": "report"})
+
+    with run_scope(), tracing.trace("research", query="NVDA") as root:
+        graph.create_graph("react").invoke(graph.initial_state("NVDA"))
+
+    # The whole run is exported as one batch when the root span ends
+    [spans] = exporter.batches
+    by_name = {span.name: span for span in spans}
+    assert {span.trace_id for span in spans} == {root.trace_id}
+    nodes = ["router", "data_analyst", "news_analyst", "quant_metrics", "risk_manager", "editor"]
+    assert all(by_name[node].parent_id == root.span_id for node in nodes)
+    assert by_name["tool search_news"].parent_id == by_name["news_analyst"].span_id
+    assert by_name["llm gpt-5-mini"].parent_id == by_name["data_analyst"].span_id
+    assert by_name["llm gpt-5-mini"].attributes["llm.prompt_tokens"] == 10
+    # The critical path: the editor starts after both analysts ended
+    assert by_name["editor"].start_ns >= max(by_name["data_analyst"].end_ns, by_name["news_analyst"].end_ns)
+
+    payload = tracing.otlp_payload(spans)
+    otlp_spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp_spans) == len(spans) and "parentSpanId" not in otlp_spans[-1]
+    json.dumps(payload)
+
+def test_trace_headers_are_validated():
+    from src.tracing import parse_trace_headers
+
+    assert parse_trace_headers({"traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"}) == (
+        "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7",
+    )
+    assert parse_trace_headers({"x-trace-id": "4BF92F3577B34DA6A3CE929D0E0E4736"}) == ("4bf92f3577b34da6a3ce929d0e0e4736", None)
+    assert parse_trace_headers({"traceparent": "00-" + "0" * 32 + "-00f067aa0ba902b7-01"}) == (None, None)
+    assert parse_trace_headers({}) == (None, None)